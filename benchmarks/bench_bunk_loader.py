@@ -0,0 +1,120 @@
+"""Микробенчмарк разбора строк отчета по койкам.
+
+Сравнивает текущий BunkReport.validate_data_for_filepath (карта столбцов
+строится один раз на лист) с прежним вариантом, где check_index вызывался
+для каждой строки.
+
+Запуск из корня проекта: python -m benchmarks.bench_bunk_loader [строк]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import report_bunk_50  # noqa: E402
+from validators import (  # noqa: E402
+    validate_column_with_data,
+    validate_count_days,
+    validate_department,
+    validate_number_history,
+    validate_numbers,
+)
+
+TITLE = (
+    '№ п/п', 'Отделение', 'ФИО пациента', 'Дата рождения', 'Серия полиса',
+    'Номер полиса', 'Страховая компания', 'Номер истории болезни',
+    'Номер палаты', 'Профиль коек', 'Врач', 'Код диагноза', 'Диагноз',
+    'КСГ', 'Диета', 'Дата поступления', 'Дата выписки', 'Кол-во \nк/дней',
+    'Исход\nгоспитали\nзации')
+DEPARTMENTS = (
+    "1025. Гинекологическое отделение",
+    "1070. Терапевтическое отделение №1",
+    "2001. Хирургическое отделение ДС",
+)
+REPEAT = 5
+
+
+class ListSheet:
+    """Лист из готовых строк, чтобы измерять только разбор."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def iter_rows(self, values_only=True):
+        return iter(self.rows)
+
+
+def create_rows(count_rows: int) -> list:
+    rows = [("Список пациентов",), TITLE, tuple(str(number) for number in range(1, len(TITLE) + 1))]
+    for number in range(count_rows):
+        rows.append((
+            number, DEPARTMENTS[number % len(DEPARTMENTS)], "Иванов И.И.", "01.01.1950", "s", "n", "СК",
+            f"И-{number}", 1, "п", "в", "A00", "д", "к", "д", "01.01.2024", None, number % 80, "и"))
+    return rows
+
+
+def legacy_check_index(lst, column_name):
+    upper_list = [element.upper() if isinstance(element, str) else element for element in lst]
+    return upper_list.index(column_name.upper())
+
+
+def legacy_validate(works_sheet, data_bunks: dict, data_50: list):
+    """Прежний цикл: индексы столбцов ищутся для каждой строки."""
+    department_column = None
+    is_title = True
+    title = []
+    for row in works_sheet.iter_rows(values_only=True):
+        if validate_column_with_data(row, report_bunk_50.EXPECTED_MIN_COLUMN_VALUES):
+            continue
+        if validate_numbers(row):
+            continue
+        if is_title:
+            upper_row = set(element.upper() if type(element) is str else element for element in row if element is not None)
+            if report_bunk_50.TITLE_VALUES[0].upper() in upper_row:
+                is_title = False
+                title = row
+                department_column = legacy_check_index(title, "Отделение")
+            continue
+        if data_bunks.get(row[department_column]):
+            data_bunks[row[department_column]] += 1
+        else:
+            if not validate_department(row[department_column]):
+                continue
+            data_bunks[row[department_column]] = 1
+        count_days = validate_count_days(row[legacy_check_index(title, "Кол-во \nк/дней")])
+        if count_days >= report_bunk_50.COUNT_DAYS:
+            number_history = validate_number_history(row[legacy_check_index(title, "Номер истории болезни")])
+            data_50.append([row[department_column], number_history, count_days])
+
+
+def best_time(function, sheet) -> float:
+    times = []
+    for _ in range(REPEAT):
+        data_bunks, data_50 = {}, []
+        start = time.perf_counter()
+        function(sheet, data_bunks, data_50)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(count_rows: int = 100_000):
+    sheet = ListSheet(create_rows(count_rows))
+    report = report_bunk_50.BunkReport("benchmark.xlsx", workers=1)
+
+    expected = ({}, [])
+    legacy_validate(sheet, *expected)
+    result = ({}, [])
+    report.validate_data_for_filepath(sheet, *result)
+    assert result == expected, "Результаты разбора отличаются"
+
+    legacy = best_time(legacy_validate, sheet)
+    current = best_time(report.validate_data_for_filepath, sheet)
+    print(f"Строк: {count_rows}")
+    print(f"check_index на каждой строке: {legacy:.3f} с")
+    print(f"ColumnMap на лист:            {current:.3f} с")
+    print(f"Ускорение: {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
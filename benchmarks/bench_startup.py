@@ -0,0 +1,64 @@
+"""Время импорта при запуске окна: что загружается до показа окна и что лениво.
+
+Каждый набор модулей импортируется в новом интерпретаторе с -X importtime,
+выводится общее время и самые долгие пакеты (накопительно, по верхнему уровню),
+чтобы сравнивать холодный старт между версиями.
+
+Запуск из корня проекта: python -m benchmarks.bench_startup [повторов]
+"""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Что импортирует interface_project до показа окна (без заставки pyi_splash).
+WINDOW_MODULES = ("lazy_import", "tkinter", "tkinter.ttk", "tkinter.filedialog", "tkinter.messagebox", "jobs", "progress", "validators")
+# Что загружается лениво: раньше импортировалось до показа окна.
+LAZY_MODULES = (
+    "report_emk", "report_bunk_50", "report_phone_adress", "report_operations",
+    "report_services", "report_writer", "tkcalendar")
+REPEAT = 3
+TOP = 8
+
+
+def import_times(modules: tuple) -> dict:
+    """Пакет верхнего уровня -> накопительное время импорта, мкс."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+    times = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Вложенные импорты выводятся с дополнительным отступом.
+        if name.startswith("  "):
+            continue
+        times[name.strip()] += int(cumulative)
+    return times
+
+
+def best(modules: tuple, repeat: int) -> dict:
+    """Лучшее из повторов: меньше всего влияние кэша диска."""
+    runs = [import_times(modules) for _ in range(repeat)]
+    return min(runs, key=lambda times: sum(times.values()))
+
+
+def show(title: str, times: dict):
+    print(f"{title}: {sum(times.values()) / 1000:.0f} мс")
+    for name, micro in sorted(times.items(), key=lambda item: -item[1])[:TOP]:
+        print(f"    {name:<32} {micro / 1000:7.1f} мс")
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else REPEAT
+    window = best(WINDOW_MODULES, repeat)
+    eager = best(WINDOW_MODULES + LAZY_MODULES, repeat)
+    show("До показа окна сейчас", window)
+    show("До показа окна при загрузке всех модулей сразу", eager)
+    print(f"Выигрыш холодного старта: {(sum(eager.values()) - sum(window.values())) / 1000:.0f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Замеры отчетов на синтетических выгрузках: загрузка, обработка и запись.
+
+Каждый отчет формируется так же, как в morning_batch (для ЭМК - вместе с
+индикаторами ЛИС, инструментальных услуг и консультаций), на выгрузках из
+benchmarks.synthetic_exports нескольких размеров. Время этапов берется из
+записей metrics: загрузка - open_file_return_data, обработка - processing*,
+запись - save* и wb.save. Каждый прогон идет в новом процессе, поэтому пиковая
+память процесса (RSS) относится только к этому отчету; из REPEAT прогонов
+берется лучший.
+
+Результат сравнивается с BASELINE_FILE: если этап стал медленнее или
+тяжелее по памяти больше чем на THRESHOLD, выводится список и код возврата 1.
+База зависит от машины, поэтому не хранится в репозитории: ее записывают
+с --save-baseline на машине, где идут замеры. С --require-baseline (для
+автоматических прогонов) отсутствие базы - код возврата 2, а не успех.
+
+Запуск из корня проекта:
+python -m benchmarks.run_benchmarks [--sizes 1000 10000 100000] [--reports EmkReport ...]
+    [--repeat N] [--threshold 0.25] [--baseline файл] [--save-baseline] [--require-baseline] [--json файл]
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import synthetic_exports  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000)
+REPEAT = 3
+# Допустимое ухудшение относительно базы: 0.25 - на 25%.
+THRESHOLD = 0.25
+# Меньшие разницы считаются шумом, а не ухудшением.
+MIN_DELTA_SECONDS = 0.05
+MIN_DELTA_MB = 20
+WORKERS = 1
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baseline.json")
+DATA_DIR = os.path.join(ROOT, "benchmarks", "data")
+PHASES = ("ingest", "process", "write")
+# Этап metrics верхнего уровня -> фаза замера.
+STAGE_PHASES = {
+    "open_file_return_data": "ingest",
+    "processing": "process",
+    "processing_report": "process",
+    "processing_and_save": "process",
+    "save_files": "write",
+    "save_in_files": "write",
+    "save_file": "write",
+}
+
+
+def exports(rows: int, data_dir: str = DATA_DIR) -> Dict[str, str]:
+    """Выгрузки на rows строк: отчет -> файл. Уже созданные берутся с диска."""
+    directory = os.path.join(data_dir, f"rows_{rows}")
+    paths = {
+        report: os.path.join(directory, filename)
+        for report, (_, filename) in synthetic_exports.WRITERS.items()}
+    missing = [report for report, path in paths.items() if not os.path.exists(path)]
+    if missing or not os.path.exists(os.path.join(directory, synthetic_exports.BUNKS_FILE)):
+        synthetic_exports.write_all(directory, synthetic_exports.ExportOptions(rows=rows), missing or ["BunkReport"])
+    return paths
+
+
+def run_once(kind: str, filepath: str, workers: int) -> List[dict]:
+    """Один прогон отчета в этом процессе. Возвращает записи metrics."""
+    import bunk_history
+    import error_log
+    import metrics
+    import morning_batch
+    import parallel_sheets
+    import parsed_cache
+    import report_bunk_50
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        metrics.METRICS_FILE = os.path.join(out_dir, "metrics.jsonl")
+        metrics.ENABLED = True
+        metrics.PROFILE = False
+        # Пустой кэш: замеряется первый разбор файла, а не чтение из кэша.
+        parsed_cache.CACHE_DIR = os.path.join(out_dir, "cache")
+        parallel_sheets.WORKERS = workers
+        error_log.LOG_FILE = os.path.join(out_dir, "log_any_error.txt")
+        bunk_history.HISTORY_FILE = os.path.join(out_dir, "bunk_history.sqlite3")
+        report_bunk_50.BASE_DIR = os.path.dirname(filepath)
+        cwd = os.getcwd()
+        os.chdir(out_dir)
+        try:
+            morning_batch.RUNNERS[kind](filepath)
+        finally:
+            os.chdir(cwd)
+            error_log.flush()
+        with open(metrics.METRICS_FILE, encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+
+
+def phases(records: List[dict]) -> Dict[str, Dict[str, dict]]:
+    """Отчет -> фаза -> {"seconds", "peak_rss_mb"} по записям metrics.
+
+    wb.save внутри processing_and_save переносится из обработки в запись.
+    """
+    result = {}
+    for record in records:
+        report = record["report"]
+        phase = None
+        if record["parent"] is None:
+            phase = STAGE_PHASES.get(record["stage"])
+        elif record["stage"] == "wb.save" and STAGE_PHASES.get(record["parent"]) == "process":
+            phase = "write"
+            moved = result.setdefault(report, {}).setdefault("process", {"seconds": 0.0, "peak_rss_mb": None})
+            moved["seconds"] -= record["seconds"]
+        if phase is None:
+            continue
+        current = result.setdefault(report, {}).setdefault(phase, {"seconds": 0.0, "peak_rss_mb": None})
+        current["seconds"] += record["seconds"]
+        # Каждый прогон - новый процесс, поэтому пик процесса - пик этого отчета.
+        current["peak_rss_mb"] = max(filter(None, (current["peak_rss_mb"], record["process_peak_rss_mb"])), default=None)
+    return result
+
+
+def best(runs: List[Dict[str, Dict[str, dict]]]) -> Dict[str, Dict[str, dict]]:
+    """Лучшее время и наименьшая пиковая память каждой фазы из прогонов."""
+    result = {}
+    for run in runs:
+        for report, report_phases in run.items():
+            for phase, values in report_phases.items():
+                current = result.setdefault(report, {}).setdefault(phase, dict(values))
+                current["seconds"] = min(current["seconds"], values["seconds"])
+                if values["peak_rss_mb"] is not None:
+                    current["peak_rss_mb"] = min(filter(None, (current["peak_rss_mb"], values["peak_rss_mb"])))
+    return result
+
+
+def measure(kind: str, filepath: str, rows: int, repeat: int = REPEAT, workers: int = WORKERS) -> Dict[str, Dict[str, dict]]:
+    """Лучшее из repeat прогонов, каждый в новом процессе, со скоростью строк/с."""
+    runs = []
+    for _ in range(repeat):
+        # spawn: без памяти родителя, чтобы пиковый RSS был только от отчета.
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            runs.append(phases(executor.submit(run_once, kind, filepath, workers).result()))
+    result = best(runs)
+    for report_phases in result.values():
+        for values in report_phases.values():
+            values["seconds"] = round(max(values["seconds"], 0.0), 4)
+            values["rows_per_sec"] = round(rows / values["seconds"]) if values["seconds"] else None
+    return result
+
+
+def run(sizes=SIZES, reports=None, repeat: int = REPEAT, workers: int = WORKERS, data_dir: str = DATA_DIR) -> dict:
+    """Замеры всех отчетов: {"results": {отчет: {строк: {фаза: значения}}}, ...}."""
+    results = {}
+    for rows in sizes:
+        paths = exports(rows, data_dir)
+        for kind in reports or synthetic_exports.WRITERS:
+            started = time.perf_counter()
+            measured = measure(kind, paths[kind], rows, repeat, workers)
+            for report, report_phases in measured.items():
+                results.setdefault(report, {})[str(rows)] = report_phases
+            print(f"{kind:<16} {rows:>9} строк  {time.perf_counter() - started:6.1f} с", file=sys.stderr)
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "workers": workers,
+        "results": results,
+    }
+
+
+def table(current: dict) -> str:
+    lines = [f"{'Отчет':<20} {'Строк':>9} {'Фаза':<8} {'Секунд':>9} {'Строк/с':>11} {'RSS, МБ':>9}"]
+    for report, sizes in current["results"].items():
+        for rows, report_phases in sizes.items():
+            for phase in PHASES:
+                if phase not in report_phases:
+                    continue
+                values = report_phases[phase]
+                lines.append(
+                    f"{report:<20} {rows:>9} {phase:<8} {values['seconds']:>9.3f} "
+                    f"{values['rows_per_sec'] or 0:>11} {values['peak_rss_mb'] or 0:>9.0f}")
+    return "\n".join(lines)
+
+
+def compare(current: dict, baseline: dict, threshold: float = THRESHOLD) -> List[str]:
+    """Ухудшения относительно базы больше threshold. Чего нет в базе - не сравнивается."""
+    regressions = []
+    for report, sizes in current["results"].items():
+        for rows, report_phases in sizes.items():
+            for phase, values in report_phases.items():
+                base = baseline["results"].get(report, {}).get(rows, {}).get(phase)
+                if base is None:
+                    continue
+                for key, unit, min_delta in (("seconds", "с", MIN_DELTA_SECONDS), ("peak_rss_mb", "МБ", MIN_DELTA_MB)):
+                    now, before = values.get(key), base.get(key)
+                    if now is None or before is None:
+                        continue
+                    if now > before * (1 + threshold) and now - before > min_delta:
+                        regressions.append(
+                            f"{report} {rows} строк, {phase}: {before:.3f} -> {now:.3f} {unit} "
+                            f"(+{(now / before - 1) * 100 if before else float('inf'):.0f}%)")
+    return regressions
+
+
+def read_baseline(filepath: str) -> Optional[dict]:
+    try:
+        with open(filepath, encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_json(filepath: str, data: dict):
+    with open(filepath, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=2)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Замеры отчетов и сравнение с базой.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="строк в выгрузках")
+    parser.add_argument("--reports", nargs="+", choices=list(synthetic_exports.WRITERS), help="какие отчеты (по умолчанию все)")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help=f"прогонов, берется лучший (по умолчанию {REPEAT})")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="процессов на листы выгрузки")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help=f"допустимое ухудшение (по умолчанию {THRESHOLD})")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="файл базы для сравнения")
+    parser.add_argument("--save-baseline", action="store_true", help="записать результат как новую базу")
+    parser.add_argument("--require-baseline", action="store_true", help="без базы - ошибка (код 2)")
+    parser.add_argument("--json", help="записать результат в файл")
+    parser.add_argument("--data", default=DATA_DIR, help="папка синтетических выгрузок")
+    args = parser.parse_args(argv)
+
+    current = run(args.sizes, args.reports, args.repeat, args.workers, args.data)
+    print(table(current))
+    if args.json:
+        write_json(args.json, current)
+    if args.save_baseline:
+        write_json(args.baseline, current)
+        print(f"База записана: {args.baseline}")
+        return 0
+    baseline = read_baseline(args.baseline)
+    if baseline is None:
+        print(f"Базы {args.baseline} нет - сравнивать не с чем. Записать: --save-baseline")
+        return 2 if args.require_baseline else 0
+    regressions = compare(current, baseline, args.threshold)
+    if regressions:
+        print(f"Ухудшения больше {args.threshold:.0%} относительно {args.baseline}:")
+        for line in regressions:
+            print(f"    {line}")
+        return 1
+    print(f"Ухудшений больше {args.threshold:.0%} относительно базы нет.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""Синтетические выгрузки из МИС для всех отчетов, без персональных данных.
+
+Файлы повторяют разметку настоящих выгрузок: строка lpu_name и столбцы
+HEADINGS у ЭМК, строка нумерации "1", "2" у коечного фонда, двухуровневые
+заголовки у телефонов и операций, список направлений у услуг. Число строк,
+отделений и доля "грязных" строк задаются, содержимое - из random.Random(seed),
+поэтому один и тот же запуск дает одинаковые файлы.
+
+Грязные строки - то, что встречается в выгрузках и что отчеты должны
+пропустить или записать в лог: полупустые строки, нечисловое количество
+койко-дней, пустой номер истории, короткий адрес или пустой телефон, пустой код
+операции, отделение, которого нет в "Отделения и койки.xlsx".
+
+Запуск из корня проекта:
+python -m benchmarks.synthetic_exports <папка> [--rows N] [--departments N]
+    [--dirty доля] [--sheets N] [--seed N] [--reports EmkReport BunkReport ...]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook  # noqa: E402
+
+import report_emk  # noqa: E402
+import report_services  # noqa: E402
+
+ROWS = 10_000
+DEPARTMENTS = 40
+DIRTY = 0.02
+SHEETS = 1
+SEED = 1
+# Строк данных на листе: предел Excel 1 048 576 минус заголовки.
+MAX_SHEET_ROWS = 1_048_000
+PERIOD_START = datetime.datetime(2024, 5, 20)
+PERIOD_DAYS = 7
+BUNKS_FILE = "Отделения и койки.xlsx"
+
+PROFILES = (
+    "Терапевтическое", "Хирургическое", "Кардиологическое", "Неврологическое",
+    "Гинекологическое", "Урологическое", "Травматологическое", "Пульмонологическое",
+    "Эндокринологическое", "Гастроэнтерологическое", "Нефрологическое", "Офтальмологическое",
+)
+# Признаки дневного стационара из departments.DAY_STAY_MARKERS*.
+DAY_STAY_SUFFIXES = ("ДС", "дн.стац.")
+PDO_DEPARTMENT = "1000. Приемное отделение"
+
+BUNK_TITLE = [
+    '№ п/п', 'Отделение', 'ФИО пациента', 'Дата рождения', 'Серия полиса',
+    'Номер полиса', 'Страховая компания', 'Номер истории болезни',
+    'Номер палаты', 'Профиль коек', 'Врач', 'Код диагноза', 'Диагноз',
+    'КСГ', 'Диета', 'Дата поступления', 'Дата выписки', 'Кол-во \nк/дней',
+    'Исход\nгоспитали\nзации']
+PHONE_TITLE_UP = (
+    ['№ \nп/п', 'Ф.И.О. пациента', 'Дата рождения', 'Возраст', 'Номер карты',
+     'Дата \nи время \nгоспитали-\nзации'] + [None] * 14
+    + ['Серия и номер полиса', 'Страховая компания', 'Адрес проживания/ регистрации', 'Телефон', 'Документ'])
+PHONE_TITLE_DOWN = (
+    [None] * 6
+    + ['Кем доставлен', 'Кем направлен', 'Тип госпитализации', 'Диагноз приемного отделения',
+       'Переведен', 'Диагноз при переводе', 'Порядковый номер', 'Дата поступления', 'Время поступления',
+       'Отделение', 'Врач', 'Диагноз отделения', 'Профиль коек', 'Палата']
+    + [None] * 5)
+OPERATION_TITLE_LEFT = (
+    ['№ п/п', 'ФИО пациента', 'Дата рождения', 'Возраст, лет', 'Пол', 'Адрес',
+     'Тип адреса', '№ КВС', 'Тип госпитализации', 'Профильное отделение'] + [None] * 42)
+OPERATION_TITLE_RIGHT = (
+    [None] * 10
+    + ['Наименова-\nние\nотделения', 'Профиль коек', 'Состояние', 'Дата поступле-ния', 'Время поступле-ния']
+    + [f"Показатель {number}" for number in range(1, 28)]
+    + ['Дата проведения операции', 'Время начала операции', 'Тип\nоперации', 'Код операции',
+       'Наименова-ние операции', 'Наличие эпикриза', 'Наличие\nпротокола\nоперации', 'Осложне-\nния',
+       'ФИО хирурга', 'Количество\nопераций'])
+OPERATIONS = (
+    ("A16.18.009", "Аппендэктомия"),
+    ("A16.14.009", "Холецистэктомия"),
+    ("A16.30.002", "Оперативное лечение пупочной грыжи"),
+    ("A16.20.011", "Резекция яичника"),
+    ("A11.12.001", "Катетеризация подключичной вены"),
+    ("A16.09.011", "Искусственная вентиляция легких"),
+)
+SERVICES = (
+    ("A09.05.003", "Исследование уровня гемоглобина в крови"),
+    ("A08.30.046", "Гистологическое исследование препарата"),
+    ("B03.016.003", "Общий (клинический) анализ крови развернутый"),
+    ("A12.05.005", "Определение основных групп крови"),
+    ("A26.08.027", "Определение РНК вируса гриппа"),
+    ("A06.09.007", "Рентгенография легких"),
+    ("A04.14.001", "Ультразвуковое исследование печени"),
+    ("B01.047.001", "Прием врача-терапевта"),
+)
+
+
+class ExportOptions(NamedTuple):
+    rows: int = ROWS
+    departments: int = DEPARTMENTS
+    dirty: float = DIRTY
+    sheets: int = SHEETS
+    seed: int = SEED
+
+
+def department_names(count: int, seed: int = SEED) -> List[str]:
+    """Отделения вида "1025. Терапевтическое отделение №2", первое - приемное, часть - ДС."""
+    rnd = random.Random(seed)
+    names = [PDO_DEPARTMENT]
+    for number in range(1, max(count, 1)):
+        name = f"{1000 + number}. {PROFILES[number % len(PROFILES)]} отделение"
+        if number >= len(PROFILES):
+            name += f" №{number // len(PROFILES) + 1}"
+        if rnd.random() < 0.2:
+            name += f" {rnd.choice(DAY_STAY_SUFFIXES)}"
+        names.append(name)
+    return names[:max(count, 1)]
+
+
+def sheet_sizes(rows: int, sheets: int) -> List[int]:
+    """Строки по листам поровну; листов не меньше, чем нужно для предела Excel."""
+    sheets = max(sheets, 1, -(-rows // MAX_SHEET_ROWS))
+    size, rest = divmod(rows, sheets)
+    return [size + (number < rest) for number in range(sheets)]
+
+
+def moment(rnd: random.Random) -> datetime.datetime:
+    """Время внутри периода выгрузки, с точностью до минуты."""
+    return PERIOD_START + datetime.timedelta(minutes=rnd.randrange(PERIOD_DAYS * 24 * 60))
+
+
+def dirty_row(rnd: random.Random, width: int) -> list:
+    """Полупустая строка: итоги, подписи, обрывки. Отчеты ее пропускают."""
+    row = [None] * width
+    for index in rnd.sample(range(width), min(3, width)):
+        row[index] = rnd.choice(("Итого", "-", 0, "Страница 2"))
+    return row
+
+
+def save_sheets(filepath: str, options: ExportOptions, titles: List[list], make_row: Callable, width: int):
+    """Пишет листы с заголовками titles и строками make_row(rnd, номер, лист).
+
+    Доля options.dirty строк заменяется полупустыми, остальные грязные
+    значения make_row добавляет сама. В режиме write_only пустые ячейки не
+    пишутся, и строка при чтении обрезается по последнему значению, а в
+    выгрузках МИС строки полной ширины - поэтому последний столбец заполнен.
+    """
+    rnd = random.Random(options.seed)
+    wb = Workbook(write_only=True)
+    number = 0
+    for sheet_number, size in enumerate(sheet_sizes(options.rows, options.sheets)):
+        sheet = wb.create_sheet(f"Лист{sheet_number + 1}")
+        for title in titles:
+            sheet.append(title)
+        for _ in range(size):
+            number += 1
+            if rnd.random() < options.dirty / 2:
+                sheet.append(dirty_row(rnd, width))
+            else:
+                sheet.append(make_row(rnd, number, sheet_number))
+    wb.save(filepath)
+
+
+def write_emk(filepath: str, options: ExportOptions = ExportOptions()):
+    """Выгрузка для отчета по ЭМК: строка lpu_name, столбцы HEADINGS и нумерация.
+
+    Отчет читает только активный лист, поэтому листов всегда один.
+    """
+    if options.rows > MAX_SHEET_ROWS:
+        raise ValueError(f"Для ЭМК не больше {MAX_SHEET_ROWS} строк: отчет читает один лист")
+    departments = department_names(options.departments, options.seed)
+    title = ["Наименование Медицинской организации", "Код МО"] + list(report_emk.HEADINGS.values())
+    # Движение и КВС: на одну КВС приходится в среднем два движения.
+    kvs_count = max(options.rows // 2, 1)
+
+    def make_row(rnd: random.Random, number: int, sheet_number: int) -> list:
+        dirty = rnd.random() < options.dirty
+        out = moment(rnd)
+        needed = rnd.randint(0, 10)
+        operations = rnd.randint(0, 2) if rnd.random() < 0.3 else 0
+        lab = rnd.randint(0, 12)
+        inst = rnd.randint(0, 4)
+        cons = rnd.randint(0, 3)
+        rean = rnd.randint(0, 5) if rnd.random() < 0.1 else 0
+        return [
+            "ГБУЗ МО Синтетическая больница", "000001",
+            f"{rnd.randrange(kvs_count):07d}", out, out - datetime.timedelta(hours=rnd.randint(0, 48)),
+            rnd.randint(0, 95), rnd.choice(("Да", "Да", "Да", "Нет")), rnd.choice(("Да", "Да", "Нет")),
+            rnd.choice(("Да", "Да", "Нет")), "Россия", rnd.choice(departments),
+            None if dirty else rnd.choice(("Да", "Да", "Нет")),
+            needed, None if dirty else max(needed - rnd.randint(0, 2), 0),
+            rnd.choice(("Да", "Нет", None)),
+            "Операция" if operations else None, operations, max(operations - rnd.randint(0, 1), 0),
+            rnd.choice(("Да", "Да", "Нет")),
+            lab, max(lab - rnd.randint(0, 3), 0), inst, max(inst - rnd.randint(0, 1), 0),
+            cons, max(cons - rnd.randint(0, 1), 0), rean, max(rean - rnd.randint(0, 1), 0),
+        ]
+
+    save_sheets(
+        filepath, options,
+        [["lpu_name"] + [None] * (len(title) - 1), title, [str(number) for number in range(1, len(title) + 1)]],
+        make_row, len(title))
+
+
+def write_bunk(filepath: str, options: ExportOptions = ExportOptions()):
+    """Выгрузка для отчета по койкам: список пациентов со строкой нумерации.
+
+    Грязные значения: количество койко-дней текстом и пустой номер истории.
+    """
+    departments = department_names(options.departments, options.seed)
+    titles = [["Список пациентов, находящихся на лечении"], BUNK_TITLE, [str(number) for number in range(1, len(BUNK_TITLE) + 1)]]
+
+    def make_row(rnd: random.Random, number: int, sheet_number: int) -> list:
+        dirty = rnd.random() < options.dirty
+        count_days = rnd.choice(("н/д", "")) if dirty and rnd.random() < 0.5 else int(rnd.expovariate(1 / 12)) + 1
+        number_history = None if dirty else f"{number:07d}/{PERIOD_START:%y}"
+        income = PERIOD_START - datetime.timedelta(days=count_days if isinstance(count_days, int) else 0)
+        return [
+            number, rnd.choice(departments[1:] or departments), f"Пациент {number}", "01.01.1950",
+            "", f"{number:016d}", "СМО", number_history, rnd.randint(1, 40), "Койки", "Врач",
+            "I10", "Диагноз", "st00.000", "ОВД", income.strftime("%d.%m.%Y"), None, count_days, "Лечится",
+        ]
+
+    save_sheets(filepath, options, titles, make_row, len(BUNK_TITLE))
+
+
+def write_bunks_file(filepath: str, options: ExportOptions = ExportOptions()):
+    """"Отделения и койки.xlsx" к выгрузке по койкам. Доля dirty отделений пропущена."""
+    rnd = random.Random(options.seed)
+    wb = Workbook(write_only=True)
+    sheet = wb.create_sheet("Койки")
+    sheet.append(["Отделение", "Количество коек"])
+    for department in department_names(options.departments, options.seed)[1:]:
+        if rnd.random() >= options.dirty:
+            sheet.append([department, rnd.randint(10, 60)])
+    wb.save(filepath)
+
+
+def write_phone(filepath: str, options: ExportOptions = ExportOptions()):
+    """Выгрузка для отчета по адресам и телефонам: заголовки в две строки.
+
+    Сверх dirty - обычная для МИС доля пустых и коротких адресов и телефонов.
+    """
+    departments = department_names(options.departments, options.seed)
+    titles = [PHONE_TITLE_UP, PHONE_TITLE_DOWN, [str(number) for number in range(1, len(PHONE_TITLE_UP) + 1)]]
+
+    def make_row(rnd: random.Random, number: int, sheet_number: int) -> list:
+        dirty = rnd.random() < options.dirty
+        income = moment(rnd)
+        adress = rnd.choice((None, "нет", "МО")) if dirty or rnd.random() < 0.05 else f"Московская обл., г. Мытищи, ул. Мира, д. {number % 200 + 1}"
+        phone = None if dirty or rnd.random() < 0.1 else f"+7900{number % 10_000_000:07d}"
+        return (
+            [number, f"Пациент {number}", "01.01.1950", rnd.randint(0, 95), f"{number:07d}", income,
+             "Самостоятельно", "Поликлиника", "Экстренная", "I10", None, None, 1, income.strftime("%d.%m.%Y"),
+             income.strftime("%H:%M"), rnd.choice(departments), "Врач", "I10", "Койки", rnd.randint(1, 40)]
+            + [f"{number:016d}", "СМО", adress, phone, "Паспорт"])
+
+    save_sheets(filepath, options, titles, make_row, len(PHONE_TITLE_UP))
+
+
+def write_operations(filepath: str, options: ExportOptions = ExportOptions()):
+    """Выгрузка для отчета по операциям: заголовки слева и справа в две строки.
+
+    Грязные значения: пустой код операции. Вентиляция легких и коды не A16
+    встречаются и в чистых строках - отчет их отбрасывает.
+    """
+    departments = department_names(options.departments, options.seed)
+    titles = [OPERATION_TITLE_LEFT, OPERATION_TITLE_RIGHT, [str(number) for number in range(1, len(OPERATION_TITLE_LEFT) + 1)]]
+
+    def make_row(rnd: random.Random, number: int, sheet_number: int) -> list:
+        dirty = rnd.random() < options.dirty
+        income = moment(rnd)
+        operation_date = income + datetime.timedelta(hours=rnd.randint(1, 72))
+        code, name = rnd.choice(OPERATIONS)
+        return (
+            [number, f"Пациент{number} П.П.", "01.01.1950", rnd.randint(18, 95), rnd.choice(("м", "ж")),
+             "Московская обл.", "Регистрации", f"{number:07d}", "Экстренная", "Хирургия",
+             rnd.choice(departments[1:] or departments), "Койки", "Средней тяжести", income, income.strftime("%H:%M")]
+            + [None] * 27
+            + [operation_date, operation_date.strftime("%H:%M"), rnd.choice(("Плановая", "Экстренная")),
+               None if dirty else code, name, rnd.choice(("Да", "Нет")), rnd.choice((0, 1, 1, 1)),
+               "Нет", "Хирург Х.Х.", rnd.randint(1, 2)])
+
+    save_sheets(filepath, options, titles, make_row, len(OPERATION_TITLE_LEFT))
+
+
+def write_services(filepath: str, options: ExportOptions = ExportOptions()):
+    """Выгрузка для отчета по услугам: список направлений.
+
+    Примерно треть услуг не оказана (пустая дата оказания).
+    """
+    departments = department_names(options.departments, options.seed)
+    headings = list(report_services.HEADINGS.values())
+    title = (
+        headings[:6] + ['Коли\nчество услуг'] + headings[6:8]
+        + ['СНИЛС', 'Документ', None, None, 'Полис', None] + headings[8:] + ["Примечание"])
+    subtitle = [None] * 10 + ['Тип', 'Серия', 'Номер', 'СМО', 'Серия/номер', None, None]
+
+    def make_row(rnd: random.Random, number: int, sheet_number: int) -> list:
+        direct = moment(rnd)
+        code, name = rnd.choice(SERVICES)
+        complete = None if rnd.random() < 0.3 else direct + datetime.timedelta(hours=rnd.randint(1, 48))
+        return [
+            rnd.choice(departments), "Врач В.В.", direct, number, code, name, 1, f"Пациент {number}",
+            datetime.datetime(1950, 1, 1), "000-000-000 00", "Паспорт", "4600", "000000", "СМО",
+            f"{number:016d}", complete, "Направление из МИС"]
+
+    save_sheets(filepath, options, [["Список направлений на услуги"], title, subtitle], make_row, len(title))
+
+
+# Отчет (как в morning_batch.RUNNERS) -> (функция, имя файла). Имена файлов -
+# как у выгрузок МИС, чтобы watch_folder узнавал их по маске.
+WRITERS: Dict[str, tuple] = {
+    "EmkReport": (write_emk, "synthetic_emk.xlsx"),
+    "BunkReport": (write_bunk, "synthetic_hosp_EvnSection_List_pg.xlsx"),
+    "PhoneReport": (write_phone, "synthetic_han_evnps_timelist_new_pg.xlsx"),
+    "OperationReport": (write_operations, "synthetic_operations.xlsx"),
+    "ServicesReport": (write_services, "synthetic_pan_SpisokDirection_Usluga_pg.xlsx"),
+}
+
+
+def write_all(directory: str, options: ExportOptions = ExportOptions(), reports=None) -> List[str]:
+    """Пишет выгрузки в directory и возвращает пути. К койкам - файл коечного фонда."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for report in reports or WRITERS:
+        write, filename = WRITERS[report]
+        filepath = os.path.join(directory, filename)
+        started = time.perf_counter()
+        write(filepath, options)
+        print(f"{report:<16} {filepath} ({time.perf_counter() - started:.1f} с)")
+        paths.append(filepath)
+        if report == "BunkReport":
+            write_bunks_file(os.path.join(directory, BUNKS_FILE), options)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Синтетические выгрузки из МИС для проверки отчетов на объеме.")
+    parser.add_argument("directory", help="папка для файлов")
+    parser.add_argument("--rows", type=int, default=ROWS, help=f"строк в каждой выгрузке (по умолчанию {ROWS})")
+    parser.add_argument("--departments", type=int, default=DEPARTMENTS, help=f"отделений (по умолчанию {DEPARTMENTS})")
+    parser.add_argument("--dirty", type=float, default=DIRTY, help=f"доля грязных строк (по умолчанию {DIRTY})")
+    parser.add_argument("--sheets", type=int, default=SHEETS, help="листов в выгрузке (кроме ЭМК)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--reports", nargs="+", choices=list(WRITERS), help="какие выгрузки писать (по умолчанию все)")
+    args = parser.parse_args(argv)
+    if not 0 <= args.dirty <= 1:
+        parser.error("--dirty - доля от 0 до 1")
+    write_all(args.directory, ExportOptions(args.rows, args.departments, args.dirty, args.sheets, args.seed), args.reports)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""История коечного фонда по дням в SQLite.
+
+Каждый сохраненный отчет по койкам записывает по отделениям коечный фонд,
+число госпитализированных и свободные койки на дату выгрузки из имени файла
+МИС; если даты в имени нет, снимок не записывается. Повторный отчет за
+ту же дату обновляет записи отделений этой даты. Динамика за несколько
+недель читается из базы по ключу (дата, отделение), без повторного открытия
+старых выгрузок.
+"""
+import datetime
+import os
+import re
+import sqlite3
+import sys
+from typing import Iterable, List, NamedTuple, Optional
+
+from error_log import log_any_error
+
+if getattr(sys, "frozen", False):
+    BASE_DIR = os.path.dirname(sys.executable)
+elif __file__:
+    BASE_DIR = os.path.dirname(__file__)
+
+HISTORY_FILE = os.path.join(BASE_DIR, "bunk_history.sqlite3")
+# Записывать историю при формировании отчета по койкам.
+ENABLED = True
+# Недель в динамике за период по умолчанию.
+WEEKS = 4
+# Выгрузки МИС называются "<unix-время>_hosp_EvnSection_List_pg.xlsx".
+EXPORT_TIME = re.compile(r"^(\d{10})_")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    date TEXT NOT NULL,
+    department TEXT NOT NULL,
+    day_stay INTEGER NOT NULL,
+    capacity INTEGER NOT NULL,
+    occupied INTEGER NOT NULL,
+    free INTEGER NOT NULL,
+    source TEXT,
+    updated TEXT NOT NULL,
+    PRIMARY KEY (date, department)
+) WITHOUT ROWID
+"""
+
+
+class Snapshot(NamedTuple):
+    date: datetime.date
+    department: str
+    day_stay: bool
+    capacity: int
+    occupied: int
+    free: int
+
+
+def snapshot_date(filepath: str) -> Optional[datetime.date]:
+    """Дата выгрузки по времени в имени файла МИС или None."""
+    match = EXPORT_TIME.match(os.path.basename(filepath or ""))
+    if match:
+        return datetime.date.fromtimestamp(int(match.group(1)))
+    return None
+
+
+class BunkHistory:
+    """База истории. Соединение открывается на каждую операцию."""
+
+    def __init__(self, filepath: str = None):
+        self.filepath = filepath or HISTORY_FILE
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.filepath)
+        connection.execute(SCHEMA)
+        return connection
+
+    def save(self, date: datetime.date, rows: Iterable[tuple], source: str = None) -> int:
+        """Добавляет или обновляет строки (отделение, ДС, коечный фонд, занято, свободно) на дату."""
+        updated = datetime.datetime.now().isoformat(timespec="seconds")
+        records = [
+            (date.isoformat(), department, int(day_stay), capacity, occupied, free, source, updated)
+            for department, day_stay, capacity, occupied, free in rows]
+        connection = self.connect()
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (date, department) DO UPDATE SET "
+                    "day_stay = excluded.day_stay, capacity = excluded.capacity, "
+                    "occupied = excluded.occupied, free = excluded.free, "
+                    "source = excluded.source, updated = excluded.updated",
+                    records)
+        finally:
+            connection.close()
+        return len(records)
+
+    def period(self, start: datetime.date, end: datetime.date) -> List[Snapshot]:
+        """Записи с start по end включительно, по отделениям и датам."""
+        connection = self.connect()
+        try:
+            rows = connection.execute(
+                "SELECT date, department, day_stay, capacity, occupied, free FROM snapshots "
+                "WHERE date BETWEEN ? AND ? ORDER BY department, date",
+                (start.isoformat(), end.isoformat())).fetchall()
+        finally:
+            connection.close()
+        return [
+            Snapshot(datetime.date.fromisoformat(date), department, bool(day_stay), capacity, occupied, free)
+            for date, department, day_stay, capacity, occupied, free in rows]
+
+    def last_weeks(self, weeks: int = WEEKS, end: datetime.date = None) -> List[Snapshot]:
+        end = end or datetime.date.today()
+        return self.period(end - datetime.timedelta(weeks=weeks) + datetime.timedelta(days=1), end)
+
+
+def record(filepath: str, rows: Iterable[tuple]) -> Optional[int]:
+    """Сохраняет снимок отчета. Ошибки базы не мешают построению отчета.
+
+    Без даты выгрузки в имени файла снимок не сохраняется: дата отчета не
+    обязательно совпадает с датой выгрузки.
+    """
+    if not ENABLED:
+        return None
+    date = snapshot_date(filepath)
+    if date is None:
+        log_any_error(f"[ERR] По имени файла {filepath} не определить дату выгрузки, история коек не сохранена.")
+        return None
+    try:
+        return BunkHistory().save(date, rows, os.path.basename(filepath or ""))
+    except (sqlite3.Error, OSError) as e:
+        log_any_error(f"[ERR] Не удалось сохранить историю коек в {HISTORY_FILE}. \n{e}")
+        return None
@@ -0,0 +1,39 @@
+"""Разбор строки заголовков в неизменяемую карту столбцов.
+
+Заголовок нормализуется один раз на лист, дальше индексы берутся из словаря.
+"""
+from types import MappingProxyType
+
+from error_log import log_any_error
+
+
+class ColumnMap:
+    """Название столбца (без учета регистра) -> индекс первого такого столбца."""
+    __slots__ = ("title", "indexes")
+
+    def __init__(self, title):
+        indexes = {}
+        for index, element in enumerate(title):
+            if isinstance(element, str):
+                indexes.setdefault(element.upper(), index)
+        object.__setattr__(self, "title", tuple(title))
+        object.__setattr__(self, "indexes", MappingProxyType(indexes))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ColumnMap нельзя изменить")
+
+    def __contains__(self, column_name: str) -> bool:
+        return column_name.upper() in self.indexes
+
+    def __len__(self):
+        return len(self.title)
+
+    def index(self, column_name: str, class_name: str = None):
+        """Индекс столбца или None с записью в лог, как check_index."""
+        index_el = self.indexes.get(column_name.upper())
+        if index_el is None:
+            if class_name:
+                log_any_error(f'Не найден столбец "{column_name}" в классе {class_name}')
+            else:
+                log_any_error(f'Не найден столбец "{column_name}"')
+        return index_el
@@ -0,0 +1,104 @@
+"""Классификация отделений: круглосуточный (КС) или дневной (ДС) стационар.
+
+Отделений около сотни, а строк в выгрузках сотни тысяч, поэтому каждое
+название проверяется один раз и результат запоминается. Признаки ДС и
+отделения-исключения можно задать в файле departments.json рядом с программой:
+
+    {
+        "markers": ["ДС"],
+        "markers_lower": ["днев", "дн.стац.", "дн. стац."],
+        "day_stay": ["1234. Отделение, которое всегда ДС"],
+        "round_the_clock": ["5678. Отделение, которое всегда КС"]
+    }
+
+Любой ключ можно не указывать, тогда берется значение по умолчанию.
+"""
+import json
+import os
+import sys
+from typing import Iterable
+
+from error_log import log_any_error
+
+if getattr(sys, "frozen", False):
+    BASE_DIR = os.path.dirname(sys.executable)
+elif __file__:
+    BASE_DIR = os.path.dirname(__file__)
+
+CONFIG_FILE = os.path.join(BASE_DIR, "departments.json")
+# Ищутся в названии как есть.
+DAY_STAY_MARKERS = ("ДС",)
+# Ищутся в названии в нижнем регистре.
+DAY_STAY_MARKERS_LOWER = ("днев", "дн.стац.", "дн. стац.")
+
+
+class DepartmentRegistry:
+    """Признак ДС для каждого встреченного названия отделения, с запоминанием."""
+
+    def __init__(
+        self,
+        markers: Iterable[str] = DAY_STAY_MARKERS,
+        markers_lower: Iterable[str] = DAY_STAY_MARKERS_LOWER,
+        day_stay: Iterable[str] = (),
+        round_the_clock: Iterable[str] = ()):
+        self.markers = tuple(markers)
+        self.markers_lower = tuple(marker.lower() for marker in markers_lower)
+        self.known = dict.fromkeys(round_the_clock, False)
+        self.known.update(dict.fromkeys(day_stay, True))
+
+    @classmethod
+    def from_file(cls, filepath: str = None) -> "DepartmentRegistry":
+        """Настройки из JSON-файла. Если файла нет или он неверный - настройки по умолчанию."""
+        filepath = filepath or CONFIG_FILE
+        try:
+            with open(filepath, encoding="utf-8") as file:
+                config = json.load(file)
+            return cls(
+                config.get("markers", DAY_STAY_MARKERS),
+                config.get("markers_lower", DAY_STAY_MARKERS_LOWER),
+                config.get("day_stay", ()),
+                config.get("round_the_clock", ()))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            log_any_error(f'[ERR] Ошибка в файле настроек отделений "{filepath}", используются настройки по умолчанию. \n{e}')
+        return cls()
+
+    def classify(self, department: str) -> bool:
+        """Проверка названия без запоминания."""
+        if any(marker in department for marker in self.markers):
+            return True
+        lower = department.lower()
+        return any(marker in lower for marker in self.markers_lower)
+
+    def is_day_stay(self, department: str) -> bool:
+        """Отделение дневного стационара."""
+        try:
+            return self.known[department]
+        except KeyError:
+            result = self.known[department] = self.classify(department)
+            return result
+
+    def split(self, rows: Iterable, department: int = 0) -> tuple:
+        """Строки КС и ДС по столбцу department, порядок строк сохраняется."""
+        rows_kc = []
+        rows_dc = []
+        for row in rows:
+            (rows_dc if self.is_day_stay(row[department]) else rows_kc).append(row)
+        return rows_kc, rows_dc
+
+
+REGISTRY = None
+
+
+def registry() -> DepartmentRegistry:
+    """Общий справочник, настройки читаются при первом обращении."""
+    global REGISTRY
+    if REGISTRY is None:
+        REGISTRY = DepartmentRegistry.from_file()
+    return REGISTRY
+
+
+def is_day_stay(department: str) -> bool:
+    """Отделение дневного стационара."""
+    return registry().is_day_stay(department)
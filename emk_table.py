@@ -0,0 +1,220 @@
+"""Данные ЭМК по столбцам для групповых подсчетов.
+
+Категориальный столбец (отделение, дата, "Да"/"Нет") хранится списком
+уникальных значений в порядке первого появления и целочисленным кодом для
+каждой строки. Условия проверяются один раз на значение, а суммы по отделениям
+считаются одной групповой редукцией (numpy.bincount). NumPy входит в
+requirements.txt; если его нет в сборке, используются массивы array и тот же
+алгоритм в чистом Python (медленнее, результат тот же, тесты проверяют оба).
+"""
+from array import array
+from operator import itemgetter
+from typing import Callable, List, Sequence
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Точные суммы через bincount (float64) гарантированы до 2**53.
+EXACT_FLOAT_LIMIT = 2 ** 53
+
+
+class Categorical:
+    """Коды строк и уникальные значения столбца в порядке первого появления."""
+    __slots__ = ("codes", "categories")
+
+    def __init__(self, values):
+        values = tuple(values)
+        lookup = dict.fromkeys(values)
+        self.categories = list(lookup)
+        for code, value in enumerate(self.categories):
+            lookup[value] = code
+        codes = list(map(lookup.__getitem__, values))
+        self.codes = numpy.array(codes, dtype=numpy.intp) if numpy is not None else array("l", codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+
+def int_column(values: tuple):
+    """Массив, если в столбце только целые числа, иначе исходный кортеж."""
+    if not values or not set(map(type, values)) <= {int, bool}:
+        return values
+    try:
+        if numpy is not None:
+            return numpy.array(values, dtype=numpy.int64)
+        return array("q", values)
+    except OverflowError:
+        return values
+
+
+def is_int_array(values) -> bool:
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return True
+    return isinstance(values, array)
+
+
+class EmkTable:
+    """Столбцовое представление строк ЭМК.
+
+    Строки не копируются: столбцы собираются при первом обращении и хранятся
+    как коды категорий или массивы целых чисел.
+    """
+
+    def __init__(
+        self,
+        title: Sequence,
+        records: Sequence,
+        categorical: Sequence = (),
+        numeric: Sequence = ()):
+        self.title = list(title)
+        self.records = records
+        self.size = len(records)
+        self.categoricals = {}
+        self.numbers = {}
+        self.groups = {}
+        self.mapped_columns = {}
+        self.load(categorical, numeric)
+
+    def load(self, categorical: Sequence = (), numeric: Sequence = ()):
+        """Собирает нужные столбцы за один проход по строкам."""
+        indexes = list(dict.fromkeys(list(categorical) + list(numeric)))
+        if not indexes:
+            return
+        if self.size:
+            values = zip(*map(itemgetter(*indexes), self.records)) if len(indexes) > 1 else [self.column(indexes[0])]
+        else:
+            values = [() for _ in indexes]
+        for index, column in zip(indexes, values):
+            if index in categorical:
+                self.categoricals[index] = Categorical(column)
+            if index in numeric:
+                self.numbers[index] = int_column(column)
+
+    def __len__(self):
+        return self.size
+
+    def column(self, index: int) -> tuple:
+        return tuple(map(itemgetter(index), self.records))
+
+    def categorical(self, index: int) -> Categorical:
+        column = self.categoricals.get(index)
+        if column is None:
+            column = self.categoricals[index] = Categorical(map(itemgetter(index), self.records))
+        return column
+
+    def numeric(self, index: int):
+        column = self.numbers.get(index)
+        if column is None:
+            column = self.numbers[index] = int_column(self.column(index))
+        return column
+
+    def rows(self, check: Callable = None, index: int = None, rows: Sequence[int] = None) -> List[int]:
+        """Номера строк (из rows или всех) по порядку, где check(значение столбца index) истинно.
+
+        check вызывается один раз на каждое встреченное значение.
+        """
+        if check is None:
+            return list(range(self.size)) if rows is None else list(rows)
+        column = self.categorical(index)
+        if numpy is not None:
+            selected = numpy.arange(self.size) if rows is None else numpy.asarray(rows, dtype=numpy.intp)
+            codes = column.codes[selected]
+            present = numpy.unique(codes)
+            flags = numpy.zeros(len(column.categories), dtype=bool)
+            flags[present] = [bool(check(column.categories[code])) for code in present.tolist()]
+            return selected[flags[codes]].tolist()
+        flags = {}
+        result = []
+        for row in (range(self.size) if rows is None else rows):
+            code = column.codes[row]
+            flag = flags.get(code)
+            if flag is None:
+                flag = flags[code] = bool(check(column.categories[code]))
+            if flag:
+                result.append(row)
+        return result
+
+    def index_by(self, index: int, key: Callable) -> dict:
+        """key(значение столбца index) -> номера строк по порядку. Строится один раз.
+
+        key вызывается один раз на каждое уникальное значение столбца.
+        """
+        groups = self.groups.get((index, key))
+        if groups is not None:
+            return groups
+        column = self.categorical(index)
+        keys = [key(value) for value in column.categories]
+        groups = {}
+        if numpy is not None:
+            key_codes = {name: code for code, name in enumerate(dict.fromkeys(keys))}
+            row_keys = numpy.array([key_codes[name] for name in keys], dtype=numpy.intp)[column.codes]
+            order = numpy.argsort(row_keys, kind="stable")
+            bounds = numpy.cumsum(numpy.bincount(row_keys, minlength=len(key_codes)))
+            start = 0
+            for name, end in zip(key_codes, bounds.tolist()):
+                groups[name] = order[start:end].tolist()
+                start = end
+        else:
+            for row, code in enumerate(column.codes):
+                groups.setdefault(keys[code], []).append(row)
+        self.groups[(index, key)] = groups
+        return groups
+
+    def mapped(self, index: int, convert: Callable) -> list:
+        """convert(значение столбца index) для каждой строки. Строится один раз.
+
+        convert вызывается один раз на каждое уникальное значение столбца.
+        """
+        values = self.mapped_columns.get((index, convert))
+        if values is not None:
+            return values
+        column = self.categorical(index)
+        converted = [convert(value) for value in column.categories]
+        codes = column.codes.tolist()
+        values = self.mapped_columns[(index, convert)] = list(map(converted.__getitem__, codes))
+        return values
+
+    def categories_in(self, index: int, rows: Sequence[int]) -> set:
+        """Значения категориального столбца, встречающиеся в строках rows."""
+        column = self.categorical(index)
+        if numpy is not None:
+            codes = numpy.unique(column.codes[numpy.asarray(rows, dtype=numpy.intp)]).tolist()
+        else:
+            codes = set(column.codes[row] for row in rows)
+        return {column.categories[code] for code in codes}
+
+    def group_sum(self, index: int, group_index: int) -> list:
+        """Суммы столбца index по категориям столбца group_index, в порядке категорий."""
+        return self.group_sums([index], group_index)[0]
+
+    def group_sums(self, indexes: Sequence[int], group_index: int) -> List[list]:
+        """Суммы нескольких столбцов по категориям group_index одной редукцией."""
+        groups = self.categorical(group_index)
+        count_groups = len(groups.categories)
+        columns = [self.numeric(index) for index in indexes]
+        if all(map(is_int_array, columns)):
+            if (
+                numpy is not None and self.size and columns
+                and max(int(numpy.abs(column).max()) for column in columns) * self.size < EXACT_FLOAT_LIMIT
+            ):
+                count_columns = len(columns)
+                # Строка i, столбец j попадает в ячейку code * count_columns + j.
+                cells = (groups.codes[:, None] * count_columns + numpy.arange(count_columns)).ravel()
+                weights = numpy.stack(columns, axis=1).ravel()
+                sums = numpy.bincount(cells, weights=weights, minlength=count_groups * count_columns)
+                sums = sums.astype(numpy.int64).reshape(count_groups, count_columns)
+                return sums.T.tolist()
+            sums = [[0] * count_groups for _ in columns]
+            for code, *values in zip(groups.codes, *columns):
+                for column, value in enumerate(values):
+                    sums[column][code] += value
+            return [[int(value) for value in column] for column in sums]
+        # Не только целые числа: складываем ненулевые значения, как при обходе строк.
+        sums = [[0] * count_groups for _ in columns]
+        for code, *values in zip(groups.codes, *columns):
+            for column, value in enumerate(values):
+                if value != 0:
+                    sums[column][code] += value
+        return sums
@@ -0,0 +1,199 @@
+"""Журнал ошибок log_any_error.txt с записью в фоновом потоке.
+
+log_any_error только кладет сообщение в очередь, поэтому его можно вызывать
+в циклах по строкам. Фоновый поток пишет сообщения пачками, одним открытием
+файла на пачку. Одинаковое сообщение пишется не чаще раза в DEDUP_SECONDS
+секунд, число пропущенных повторов дописывается отдельной строкой. Файл
+ротируется по размеру (MAX_BYTES, BACKUP_COUNT копий), как в logging.
+
+Поток не демон: при выходе программы он дописывает очередь и завершается сам,
+в том числе в процессах пула разбора листов.
+"""
+import datetime
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Callable
+
+if getattr(sys, "frozen", False):
+    BASE_DIR = os.path.dirname(sys.executable)
+elif __file__:
+    BASE_DIR = os.path.dirname(__file__)
+
+LOG_FILE = os.path.join(BASE_DIR, "log_any_error.txt")
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+# Одно и то же сообщение пишется не чаще раза в DEDUP_SECONDS секунд.
+DEDUP_SECONDS = 60.0
+# Как часто поток проверяет, не завершилась ли программа, с.
+FLUSH_INTERVAL = 0.25
+# Сообщений в одной пачке записи.
+BATCH_SIZE = 1000
+# Сколько разных сообщений помнится для отсева повторов.
+MAX_TRACKED = 10000
+
+
+def stamp(moment: float) -> str:
+    return datetime.datetime.fromtimestamp(moment).strftime("%d.%m %H_%M_%S")
+
+
+class BatchFileHandler(RotatingFileHandler):
+    """Ротация как у RotatingFileHandler, но файл открыт только на время записи пачки,
+    чтобы другие процессы могли ротировать его в Windows."""
+
+    def emit(self, record):
+        super().emit(record)
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+
+class ErrorLog:
+    """Очередь сообщений и фоновый поток записи в файл."""
+
+    def __init__(
+        self,
+        filepath: str = None,
+        max_bytes: int = None,
+        backup_count: int = None,
+        dedup_seconds: float = None,
+        clock: Callable[[], float] = time.time):
+        self.filepath = filepath
+        self.max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+        self.backup_count = BACKUP_COUNT if backup_count is None else backup_count
+        self.dedup_seconds = DEDUP_SECONDS if dedup_seconds is None else dedup_seconds
+        self.clock = clock
+        self.handler = None
+        self.reset()
+
+    def reset(self):
+        """Новое состояние; вызывается и в дочернем процессе после fork."""
+        self.queue = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.thread = None
+        # Сообщение -> [время последней записи, пропущено повторов, время последнего повтора].
+        self.recent = {}
+
+    def put(self, text: str):
+        self.queue.put((self.clock(), text))
+        if self.thread is None or not self.thread.is_alive():
+            self.start()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                thread = threading.Thread(target=self.run, name="error_log")
+                try:
+                    thread.start()
+                except RuntimeError:
+                    # Завершение интерпретатора: новые потоки запрещены, пишем сразу.
+                    self.run(wait=False)
+                    return
+                self.thread = thread
+
+    def flush(self, timeout: float = None):
+        """Ждет записи всех сообщений, отправленных до вызова, включая счетчики повторов."""
+        done = threading.Event()
+        self.queue.put(done)
+        self.start()
+        done.wait(timeout)
+
+    def close(self):
+        """Дописывает очередь и останавливает поток."""
+        self.queue.put(None)
+        thread = self.thread
+        if thread is not None:
+            thread.join()
+
+    def run(self, wait: bool = True):
+        """Цикл записи. wait=False - только дописать то, что уже в очереди."""
+        main_thread = threading.main_thread()
+        stop = False
+        while not stop:
+            try:
+                item = self.queue.get(timeout=FLUSH_INTERVAL) if wait else self.queue.get_nowait()
+            except queue.Empty:
+                if wait and main_thread.is_alive():
+                    continue
+                break
+            batch = [item]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            self.write(batch)
+        self.write([None])
+
+    def write(self, batch: list):
+        """Пишет пачку: сообщения из очереди, события flush и None (остановка)."""
+        lines = []
+        events = []
+        summaries = False
+        for item in batch:
+            if item is None:
+                summaries = True
+            elif isinstance(item, threading.Event):
+                summaries = True
+                events.append(item)
+            else:
+                lines.extend(self.accept(*item))
+        if summaries or len(self.recent) > MAX_TRACKED:
+            lines.extend(self.repeats())
+        try:
+            if lines:
+                self.emit("\n".join(lines))
+        finally:
+            for event in events:
+                event.set()
+
+    def accept(self, moment: float, text: str) -> list:
+        """Строки журнала для сообщения: пусто, если это повтор в пределах DEDUP_SECONDS."""
+        known = self.recent.get(text)
+        if known is not None and moment - known[0] < self.dedup_seconds:
+            known[1] += 1
+            known[2] = moment
+            return []
+        lines = []
+        if known is not None and known[1]:
+            lines.append(self.repeat_line(text, known))
+        self.recent[text] = [moment, 0, moment]
+        lines.append(f"[{stamp(moment)}] {text}")
+        return lines
+
+    @staticmethod
+    def repeat_line(text: str, known: list) -> str:
+        return f"[{stamp(known[2])}] Повторялось еще {known[1]} раз: {text}"
+
+    def repeats(self) -> list:
+        """Строки о пропущенных повторах; забывает все сообщения."""
+        lines = [self.repeat_line(text, known) for text, known in self.recent.items() if known[1]]
+        self.recent = {}
+        return lines
+
+    def emit(self, text: str):
+        if self.handler is None:
+            self.handler = BatchFileHandler(
+                self.filepath or LOG_FILE, maxBytes=self.max_bytes, backupCount=self.backup_count,
+                encoding="utf-8", delay=True)
+        self.handler.handle(logging.makeLogRecord({"msg": text, "levelno": logging.ERROR}))
+
+
+_log = ErrorLog()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_log.reset)
+
+
+def log_any_error(*texts):
+    """Функция для записи ошибок в файл."""
+    _log.put("\n".join(str(text) for text in texts))
+
+
+def flush(timeout: float = None):
+    """Ждет записи отправленных сообщений в файл."""
+    _log.flush(timeout)
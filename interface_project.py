@@ -1,21 +1,58 @@
+import lazy_import  # первым: от него отсчитывается время запуска
 from os import getcwd
+import multiprocessing
 import os
 import sys
 import tkinter as tk
 from tkinter import ttk
 import tkinter.filedialog as fd
 import tkinter.messagebox as mb
+from typing import TYPE_CHECKING
 
-from tkcalendar import Calendar
-
-import report_emk
-import report_bunk_50
-import report_phone_adress
-import report_operations
-import report_services
+import jobs
+from progress import ProgressInfo
 from validators import ValidateError
 import loading_window
 
+if TYPE_CHECKING:
+    # Явные импорты нужны PyInstaller, чтобы модули попали в сборку.
+    import tkcalendar
+    import report_emk
+    import report_bunk_50
+    import report_phone_adress
+    import report_operations
+    import report_services
+    import report_writer
+
+# Модули отчетов с openpyxl и календарь загружаются при первом обращении
+# или в фоне после показа окна (App.warm_up).
+tkcalendar = lazy_import.LazyModule("tkcalendar")
+report_emk = lazy_import.LazyModule("report_emk")
+report_bunk_50 = lazy_import.LazyModule("report_bunk_50")
+report_phone_adress = lazy_import.LazyModule("report_phone_adress")
+report_operations = lazy_import.LazyModule("report_operations")
+report_services = lazy_import.LazyModule("report_services")
+report_writer = lazy_import.LazyModule("report_writer")
+WARM_UP_MODULES = (
+    report_emk, report_bunk_50, report_phone_adress, report_operations, report_services, report_writer, tkcalendar)
+# Через сколько мс после запуска цикла окна начинается фоновая загрузка.
+WARM_UP_DELAY_MS = 200
+lazy_import.mark("импорт модулей окна")
+
+if getattr(sys, "frozen", False):
+    BASE_DIR = os.path.dirname(sys.executable)
+elif __file__:
+    BASE_DIR = os.path.dirname(__file__)
+
+# Запуск с --startup-times дописывает время запуска в этот файл.
+STARTUP_TIMES_FILE = os.path.join(BASE_DIR, "startup_times.txt")
+# Запуск с --metrics пишет замеры этапов отчетов в metrics.jsonl, с --profile -
+# еще и профилирует их (metrics.PROFILE), в том числе в процессах разбора.
+if "--metrics" in sys.argv:
+    os.environ["REPORTS_METRICS"] = "1"
+if "--profile" in sys.argv:
+    os.environ["REPORTS_PROFILE"] = "1"
+
 __version__ = "2.1.0"
 __author__ = "DinoWithPython"
 __copyright__ = "2024, ГБУЗ Мытищинская ОКБ"
@@ -32,13 +69,86 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+def write_startup_times():
+    """Дописывает время запуска в STARTUP_TIMES_FILE."""
+    try:
+        lazy_import.write_report(STARTUP_TIMES_FILE, __version__)
+    except OSError as e:
+        print(f"Не удалось записать время запуска: {e}", file=sys.stderr)
+
+
 class Pathfile:
     """Объект для сохранения пути."""
 
     path = None
 
 
-class Emk(ttk.Frame):
+class ReportTab:
+    """Запуск отчета вкладки в фоне (jobs.JobRunner окна App).
+
+    На время работы кнопка "Сформировать" отменяет отчет. Вкладка определяет
+    delete_panel_errors() и report_failed(container, e). Отчеты вкладки делят
+    одну строку состояния и панель ошибок, поэтому пока идет один, остальные
+    кнопки из report_buttons недоступны.
+    """
+
+    report_buttons = ()
+
+    def start_report(self, container, window, button, name: str, task):
+        """Запускает task(job) и показывает этапы, результат или ошибку на вкладке."""
+        self.delete_panel_errors()
+        self.file_processing = tk.Label(
+            window,
+            font=("Microsoft Sans Serif", 16),
+            text="Файл обрабатывается, пожалуйста, подождите...",
+        )
+        self.file_processing.place(x=10, y=110)
+        progress_bar = ttk.Progressbar(window, length=600, maximum=1.0)
+        progress_bar.place(x=10, y=150)
+        text = button["text"]
+        command = button["command"]
+        others = [other for other in self.report_buttons if other is not button]
+        for other in others:
+            other.config(state="disabled")
+
+        def finish():
+            progress_bar.destroy()
+            button.config(text=text, command=command, state="normal")
+            for other in others:
+                other.config(state="normal")
+
+        def cancel():
+            job.cancel()
+            button.config(state="disabled")
+            self.file_processing["text"] = "Отмена, дождитесь окончания этапа..."
+
+        def progress(step):
+            self.file_processing["text"] = str(step)
+            if not isinstance(step, ProgressInfo):
+                return
+            if step.fraction is None:
+                progress_bar.config(mode="indeterminate")
+                progress_bar.step(0.05)
+            else:
+                progress_bar.config(mode="determinate", value=step.fraction)
+
+        def done(result):
+            finish()
+            self.file_processing["text"] = "Файл успешно обработан и сохранён в текущей папке."
+            self.file_processing["fg"] = "LimeGreen"
+
+        def failed(e):
+            finish()
+            if isinstance(e, jobs.JobCancelled):
+                self.file_processing["text"] = "Формирование отчета отменено."
+                return
+            self.report_failed(container, e)
+
+        job = container.jobs.submit(name, task, progress, done, failed)
+        button.config(text="Отменить", command=cancel)
+
+
+class Emk(ReportTab, ttk.Frame):
     def __init__(self, container):
         super().__init__(container)
         self.filepath_emk = Pathfile()
@@ -146,6 +256,45 @@ class Emk(ttk.Frame):
             offvalue=0,
         )
         button_need_cons.pack(anchor="w")
+        self.need_days = tk.BooleanVar()
+        self.need_days.set(0)
+        button_need_days = tk.Checkbutton(
+            frame_reports,
+            text="Своды по дням",
+            font=("Microsoft Sans Serif", 16),
+            variable=self.need_days,
+            onvalue=1,
+            offvalue=0,
+        )
+        button_need_days.pack(anchor="w")
+        self.days_separate = tk.BooleanVar()
+        self.days_separate.set(0)
+        button_days_separate = tk.Checkbutton(
+            frame_reports,
+            text="↑ файл на день",
+            font=("Microsoft Sans Serif", 16),
+            variable=self.days_separate,
+            onvalue=1,
+            offvalue=0,
+        )
+        button_days_separate.pack(anchor="w")
+        self.conditional_formatting = tk.BooleanVar()
+        # Как report_writer.CONDITIONAL_FORMATTING, но без загрузки openpyxl при запуске.
+        self.conditional_formatting.set(0)
+        button_conditional_formatting = tk.Checkbutton(
+            frame_reports,
+            text="Цвета правилами",
+            font=("Microsoft Sans Serif", 16),
+            variable=self.conditional_formatting,
+            onvalue=1,
+            offvalue=0,
+            command=self.set_conditional_formatting,
+        )
+        button_conditional_formatting.pack(anchor="w")
+
+    def set_conditional_formatting(self):
+        """Цвета проверок условным форматированием Excel во всех отчетах."""
+        report_writer.CONDITIONAL_FORMATTING = bool(self.conditional_formatting.get())
 
     def helping_emk(self):
         link = "http://bi.mz.mosreg.ru/#form/oformlen_emk_al_23f"
@@ -157,6 +306,13 @@ class Emk(ttk.Frame):
         Отчеты по ЛИС и Инструментальным исследованиям формируются по всем датам в файле,
         без привязки к выбранной дате.
 
+        "Своды по дням" - свод на каждую дату выписки из файла: листы в одной книге
+        или отдельный файл на каждый день.
+
+        "Цвета правилами" - красные и зеленые ячейки задаются условным форматированием
+        Excel на столбец: файлы меньше и сохраняются быстрее, цвета обновляются
+        при правке значений. Действует для всех отчетов.
+
         Скопировать ссылку в буфер обмена?
         """.format(
             link
@@ -220,15 +376,62 @@ class Emk(ttk.Frame):
             self.error_panel.destroy()
         except AttributeError:
             pass
+        path = self.filepath_emk.path
+        if path is None:
+            self.show_calendar([])
+            return
+        need_pdo = bool(self.need_pdo.get())
+        text = self.date_button_emk["text"]
+        self.date_button_emk.config(text="Чтение дат...", state="disabled")
+
+        def task(job):
+            # Разбор файла в фоне: окно не замирает, а разобранные строки
+            # остаются в кэше для самого отчета.
+            return report_emk.EmkReport(path, need_pdo).discharge_days(job.step)
+
+        def done(days):
+            self.date_button_emk.config(text=text, state="normal")
+            self.show_calendar(days)
+
+        def failed(e):
+            self.date_button_emk.config(text=text, state="normal")
+            report_emk.log_any_error(f"[ERR] Не удалось получить даты из файла для календаря. \n{e}")
+            self.show_calendar([])
+
+        container.jobs.submit("Даты ЭМК", task, None, done, failed)
+
+    def show_calendar(self, available_days: list):
+        """Календарь, ограниченный датами выписки из файла (если они известны)."""
+        self.available_days = available_days
         self.calend = tk.Toplevel(self)
 
-        self.cal = Calendar(self.calend, font="Arial 14")
+        if self.available_days:
+            # Календарь ограничен датами выписки, которые есть в выбранном файле.
+            last_day = self.available_days[-1]
+            self.cal = tkcalendar.Calendar(
+                self.calend,
+                font="Arial 14",
+                mindate=self.available_days[0],
+                maxdate=last_day,
+                year=last_day.year,
+                month=last_day.month,
+                day=last_day.day,
+            )
+            for day in self.available_days:
+                self.cal.calevent_create(day, "Есть данные", "data")
+            self.cal.tag_config("data", background="LimeGreen")
+        else:
+            self.cal = tkcalendar.Calendar(self.calend, font="Arial 14")
         self.cal.pack(fill="both", expand=True)
         ttk.Button(self.calend, text="Выбрать", command=self.check_date).pack()
 
     def check_date(self):
         """Меняет лейбл, записывая туда дату."""
-        date = self.cal.selection_get().strftime("%d.%m.%Y")
+        selected = self.cal.selection_get()
+        if self.available_days and selected not in self.available_days:
+            mb.showwarning("Нет данных", "В выбранном файле нет пациентов, выписанных в этот день.", parent=self.calend)
+            return
+        date = selected.strftime("%d.%m.%Y")
         self.text_date_emk.config(text=f"Отчет на дату: {date}")
         self.calend.destroy()
         self.date_button_emk["bg"] = "LimeGreen"
@@ -244,71 +447,72 @@ class Emk(ttk.Frame):
 
     def read_and_create_summary_emk(self, container):
         """Формирует отчет по отсутсвию осмотров и детально по заполнению КВС."""
-        self.delete_panel_errors()
-        self.file_processing = tk.Label(
-            container.window_emk,
-            font=("Microsoft Sans Serif", 16),
-            text="Файл обрабатывается, пожалуйста, подождите...",
-        )
-        self.file_processing.place(x=10, y=110)
-        self.update()
-
-        try:
-            if self.filepath_emk.path is None:
+        path = self.filepath_emk.path
+        need_pdo = self.need_pdo.get()
+        get_data = self.text_date_emk.cget("text").split(": ")[1]
+        need_days = self.need_days.get()
+        days_separate = self.days_separate.get()
+        need_lis = self.need_lis.get()
+        need_instrumental = self.need_instrumental.get()
+        need_cons = self.need_cons.get()
+
+        def task(job):
+            job.step("Чтение файла, пожалуйста, подождите...")
+            if path is None:
                 raise ValidateError("Выберите файл с отчетом!")
-            need_pdo = self.need_pdo.get()
             if need_pdo:
-                excel_document = report_emk.EmkReport(self.filepath_emk.path, True)
+                excel_document = report_emk.EmkReport(path, True)
             else:
-                excel_document = report_emk.EmkReport(self.filepath_emk.path)
-            data_excel = excel_document.open_file_return_data()
-            get_data = self.text_date_emk.cget("text").split(": ")[1]
+                excel_document = report_emk.EmkReport(path)
+            data_excel = excel_document.open_file_return_data(job.step)
+            job.step("Формирование свода...")
             if get_data != "<Дата не выбрана>":
                 input_date = get_data
                 datas = excel_document.processing_report(data_excel, input_date)
-                excel_document.save_files(*datas)
             else:
                 datas = excel_document.processing_report(data_excel)
-                excel_document.save_files(*datas)
-            need_lis = self.need_lis.get()
+            job.step("Сохранение свода...")
+            excel_document.save_files(*datas)
+            if need_days:
+                job.step("Своды по дням...")
+                days = excel_document.processing_by_days(data_excel)
+                excel_document.save_days(days, days_separate)
+            indicators = []
             if need_lis:
                 lis = report_emk.LisIdentificator(report_emk.HEADINGS[17], report_emk.HEADINGS[18])
-                data = lis.processing()
-                lis.save_file(data,"Отчет по ЛИС в ЭМК", "ЛИС по выписанным пациентам", "ЛИС")
-            need_inst = self.need_instrumental.get()
-            if need_inst:
+                indicators.append((lis, ("Отчет по ЛИС в ЭМК", "ЛИС по выписанным пациентам", "ЛИС")))
+            if need_instrumental:
                 ins = report_emk.InstIdentificator(report_emk.HEADINGS[19], report_emk.HEADINGS[20])
-                data_ins = ins.processing()
-                ins.save_file(data_ins, "Отчет по Инстр.напр. в ЭМК", "Инструментальная диагностика по выписанным пациентам", "Инструм на")
-            need_cons = self.need_cons.get()
+                indicators.append((ins, ("Отчет по Инстр.напр. в ЭМК", "Инструментальная диагностика по выписанным пациентам", "Инструм на")))
             if need_cons:
                 cons = report_emk.ConsIdentificator(report_emk.HEADINGS[21], report_emk.HEADINGS[22])
-                data_cons = cons.processing()
-                cons.save_file(data_cons, "Отчет по Конс. в ЭМК", "Оформление консультативных услуг по выписанным пациентам", "Консультации на")
-            
-        except Exception as e:
-            print(type(e))
-            if isinstance(e, ValueError) or isinstance(e, ValidateError):
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = "Ошибка валидации файла!"
-            else:
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = f"Неизвестная ошибка. {type(e)}"
-            self.error_panel = tk.Text(
-                container.window_emk, bg="#FFCCCC", width=80, height=7
-            )
-            self.error_panel.insert(tk.INSERT, str(e))
-            self.error_panel.place(x=10, y=180)
-            return
+                indicators.append((cons, ("Отчет по Конс. в ЭМК", "Оформление консультативных услуг по выписанным пациентам", "Консультации на")))
+            if indicators:
+                job.step("Дополнительные отчеты...")
+                aggregator = report_emk.IndicatorAggregator([indicator for indicator, _ in indicators])
+                for (indicator, names), data in zip(indicators, aggregator.processing()):
+                    job.step(f"Сохранение: {names[0]}...")
+                    indicator.save_file(data, *names)
+
+        self.start_report(container, container.window_emk, self.btn_start_emk, "ЭМК", task)
+
+    def report_failed(self, container, e):
+        """Показывает ошибку формирования отчета."""
+        print(type(e))
+        if isinstance(e, ValueError) or isinstance(e, ValidateError):
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = "Ошибка валидации файла!"
         else:
-            self.file_processing[
-                "text"
-            ] = "Файл успешно обработан и сохранён в текущей папке."
-            self.file_processing["fg"] = "LimeGreen"
-            self.update()
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = f"Неизвестная ошибка. {type(e)}"
+        self.error_panel = tk.Text(
+            container.window_emk, bg="#FFCCCC", width=80, height=7
+        )
+        self.error_panel.insert(tk.INSERT, str(e))
+        self.error_panel.place(x=10, y=180)
 
 
-class Bunk(ttk.Frame):
+class Bunk(ReportTab, ttk.Frame):
     def __init__(self, container):
         super().__init__(container)
         self.filepath_bunks = Pathfile()
@@ -352,7 +556,8 @@ class Bunk(ttk.Frame):
         self.count_days.place(x=10, y=50)
 
         var = tk.IntVar()
-        var.set(report_bunk_50.COUNT_DAYS)
+        # Как report_bunk_50.COUNT_DAYS, но без загрузки отчета при запуске.
+        var.set(50)
         check = (self.register(self.validate_days), "%P")
         self.spin_50 = tk.Spinbox(
             container.window_bunks,
@@ -366,6 +571,36 @@ class Bunk(ttk.Frame):
         )
         self.spin_50.place(x=600, y=60)
 
+        self.btn_dynamics = tk.Button(
+            container.window_bunks,
+            text="Динамика за период",
+            font=("Microsoft Sans Serif", 16),
+            pady=2,
+            command=lambda: self.create_dynamics(container),
+        )
+        self.btn_dynamics.place(x=700, y=110)
+        self.count_weeks = tk.Label(
+            container.window_bunks,
+            text="Недель:",
+            font=("Microsoft Sans Serif", 16),
+        )
+        self.count_weeks.place(x=700, y=160)
+        weeks = tk.IntVar()
+        # Как bunk_history.WEEKS.
+        weeks.set(4)
+        self.spin_weeks = tk.Spinbox(
+            container.window_bunks,
+            from_=1,
+            to=104,
+            width=3,
+            textvariable=weeks,
+            validate="key",
+            validatecommand=check,
+            font=("Microsoft Sans Serif", 16),
+        )
+        self.spin_weeks.place(x=800, y=160)
+        self.report_buttons = (self.btn_start_bunks, self.btn_dynamics)
+
     def file_not_found_bunks(self):
         msg = """
         Программа не нашла информацию о коечном фонде. 
@@ -387,6 +622,10 @@ class Bunk(ttk.Frame):
 
         Наименование отделения необходимо указывать как в отчете.
 
+        Каждый отчет сохраняет койки по отделениям в историю (bunk_history.sqlite3 в папке с .exe)
+        на дату выгрузки из имени файла МИС; если файл переименован, в историю он не попадет.
+        "Динамика за период" собирает из нее свободные и занятые койки по дням за указанное число недель.
+
         Сформировать образец сейчас(заменит файл, если он есть в текущей папке)?
         """.format(report)
 
@@ -444,50 +683,55 @@ class Bunk(ttk.Frame):
 
     def read_and_create_summary_bunks(self, container):
         """Формирует отчет по разнице коек и пациентов более 50 дней."""
-        self.delete_panel_errors()
-        self.file_processing = tk.Label(
-            container.window_bunks,
-            font=("Microsoft Sans Serif", 16),
-            text="Файл обрабатывается, пожалуйста, подождите...",
-        )
-        self.file_processing.place(x=10, y=110)
-        self.update()
+        path = self.filepath_bunks.path
+        days = self.spin_50.get()
 
-        try:
-            if self.filepath_bunks.path is None:
+        def task(job):
+            job.step("Чтение файла, пожалуйста, подождите...")
+            if path is None:
                 raise ValidateError("Выберите файл с отчетом!")
-            bunk = report_bunk_50.BunkReport(self.filepath_bunks.path)
-            days = int(self.spin_50.get())
-            report_bunk_50.COUNT_DAYS = days
-            data_bunks, data_50 = bunk.open_file_return_data()
+            bunk = report_bunk_50.BunkReport(path)
+            report_bunk_50.COUNT_DAYS = int(days)
+            data_bunks, data_50 = bunk.open_file_return_data(job.step)
+            job.step("Обработка и сохранение...")
             data_after_processing = bunk.processing(data_bunks, data_50)
             bunk.save_in_files(*data_after_processing)
-        except Exception as e:
-            print(type(e))
-            if isinstance(e, FileNotFoundError):
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = 'Заполните файл "Отделения и койки.xlsx!"'
-            elif isinstance(e, ValueError) or isinstance(e, ValidateError):
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = "Ошибка валидации файла!"
-            else:
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = f"Неизвестная ошибка. {type(e)}"
-            self.error_panel = tk.Text(
-                container.window_bunks, bg="#FFCCCC", width=80, height=7
-            )
-            self.error_panel.insert(tk.INSERT, str(e))
-            self.error_panel.place(x=10, y=180)
-            return
+
+        self.start_report(container, container.window_bunks, self.btn_start_bunks, "Койки и 50+", task)
+
+    def create_dynamics(self, container):
+        """Формирует динамику коек за период из истории прошлых отчетов."""
+        weeks = self.spin_weeks.get()
+
+        def task(job):
+            job.step("Чтение истории коек...")
+            if not weeks:
+                raise ValidateError("Укажите количество недель!")
+            bunk = report_bunk_50.BunkReport(None)
+            bunk.save_dynamics(*bunk.processing_dynamics(int(weeks)))
+
+        self.start_report(container, container.window_bunks, self.btn_dynamics, "Динамика коек", task)
+
+    def report_failed(self, container, e):
+        """Показывает ошибку формирования отчета."""
+        print(type(e))
+        if isinstance(e, FileNotFoundError):
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = 'Заполните файл "Отделения и койки.xlsx!"'
+        elif isinstance(e, ValueError) or isinstance(e, ValidateError):
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = "Ошибка валидации файла!"
         else:
-            self.file_processing[
-                "text"
-            ] = "Файл успешно обработан и сохранён в текущей папке."
-            self.file_processing["fg"] = "LimeGreen"
-            self.update()
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = f"Неизвестная ошибка. {type(e)}"
+        self.error_panel = tk.Text(
+            container.window_bunks, bg="#FFCCCC", width=80, height=7
+        )
+        self.error_panel.insert(tk.INSERT, str(e))
+        self.error_panel.place(x=10, y=180)
 
 
-class Phone(ttk.Frame):
+class Phone(ReportTab, ttk.Frame):
     def __init__(self, container):
         super().__init__(container)
         self.filepath_phone = Pathfile()
@@ -573,46 +817,39 @@ class Phone(ttk.Frame):
 
     def read_and_create_summary_phone(self, container):
         """Формирует отчет по отсутсвию телефона и адреса."""
-        self.delete_panel_errors()
-        self.file_processing = tk.Label(
-            container.window_phone,
-            font=("Microsoft Sans Serif", 16),
-            text="Файл обрабатывается, пожалуйста, подождите...",
-        )
-        self.file_processing.place(x=10, y=110)
-        self.update()
-        try:
-            if self.filepath_phone.path is None:
+        path = self.filepath_phone.path
+
+        def task(job):
+            job.step("Чтение файла, пожалуйста, подождите...")
+            if path is None:
                 raise ValidateError("Выберите файл с отчетом!")
-            excel_document = report_phone_adress.PhoneReport(self.filepath_phone.path)
-            data_phone_excel, data_adress_excel = excel_document.open_file_return_data()
+            excel_document = report_phone_adress.PhoneReport(path)
+            data_phone_excel, data_adress_excel = excel_document.open_file_return_data(job.step)
+            job.step("Обработка и сохранение...")
             excel_document.processing_and_save(data_phone_excel, data_adress_excel)
-        except Exception as e:
-            print(type(e))
-            if isinstance(e, ValueError) or isinstance(e, ValidateError):
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = "Ошибка валидации файла!"
-            elif isinstance(e, TypeError):
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = "Ошибка при открытии файла!"
-            else:
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = f"Неизвестная ошибка. {type(e)}"
-            self.error_panel = tk.Text(
-                container.window_phone, bg="#FFCCCC", width=80, height=7
-            )
-            self.error_panel.insert(tk.INSERT, str(e))
-            self.error_panel.place(x=10, y=180)
-            return
+
+        self.start_report(container, container.window_phone, self.btn_start_phone, "Телефоны и адреса", task)
+
+    def report_failed(self, container, e):
+        """Показывает ошибку формирования отчета."""
+        print(type(e))
+        if isinstance(e, ValueError) or isinstance(e, ValidateError):
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = "Ошибка валидации файла!"
+        elif isinstance(e, TypeError):
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = "Ошибка при открытии файла!"
         else:
-            self.file_processing[
-                "text"
-            ] = "Файл успешно обработан и сохранён в текущей папке."
-            self.file_processing["fg"] = "LimeGreen"
-            self.update()
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = f"Неизвестная ошибка. {type(e)}"
+        self.error_panel = tk.Text(
+            container.window_phone, bg="#FFCCCC", width=80, height=7
+        )
+        self.error_panel.insert(tk.INSERT, str(e))
+        self.error_panel.place(x=10, y=180)
 
 
-class Operation(ttk.Frame):
+class Operation(ReportTab, ttk.Frame):
     def __init__(self, container):
         super().__init__(container)
         self.filepath_operation = Pathfile()
@@ -715,48 +952,40 @@ class Operation(ttk.Frame):
 
     def read_and_create_summary_operation(self, container):
         """Формирует отчет по отсутсвию телефона и адреса."""
-        self.delete_panel_errors()
-        self.file_processing = tk.Label(
-            container.window_operation,
-            font=("Microsoft Sans Serif", 16),
-            text="Файл обрабатывается, пожалуйста, подождите...",
-        )
-        self.file_processing.place(x=10, y=110)
-        self.update()
+        path = self.filepath_operation.path
+        only_a16 = self.only_a16.get()
 
-        try:
-            if self.filepath_operation.path is None:
+        def task(job):
+            job.step("Чтение файла, пожалуйста, подождите...")
+            if path is None:
                 raise ValidateError("Выберите файл с отчетом!")
-            excel_document = report_operations.OperationReport(self.filepath_operation.path)
-            only_a16 = self.only_a16.get()
-            data_excel = excel_document.open_file_return_data(only_a16)
+            excel_document = report_operations.OperationReport(path)
+            data_excel = excel_document.open_file_return_data(only_a16, job.step)
+            job.step("Обработка и сохранение...")
             excel_document.processing_and_save(data_excel)
-        except Exception as e:
-            print(type(e))
-            if isinstance(e, ValueError) or isinstance(e, ValidateError):
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = "Ошибка валидации файла!"
-            elif isinstance(e, TypeError):
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = "Ошибка при открытии файла!"
-            else:
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = f"Неизвестная ошибка. {type(e)}"
-            self.error_panel = tk.Text(
-                container.window_operation, bg="#FFCCCC", width=80, height=7
-            )
-            self.error_panel.insert(tk.INSERT, str(e))
-            self.error_panel.place(x=10, y=180)
-            return
+
+        self.start_report(container, container.window_operation, self.btn_start_operation, "Операции", task)
+
+    def report_failed(self, container, e):
+        """Показывает ошибку формирования отчета."""
+        print(type(e))
+        if isinstance(e, ValueError) or isinstance(e, ValidateError):
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = "Ошибка валидации файла!"
+        elif isinstance(e, TypeError):
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = "Ошибка при открытии файла!"
         else:
-            self.file_processing[
-                "text"
-            ] = "Файл успешно обработан и сохранён в текущей папке."
-            self.file_processing["fg"] = "LimeGreen"
-            self.update()
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = f"Неизвестная ошибка. {type(e)}"
+        self.error_panel = tk.Text(
+            container.window_operation, bg="#FFCCCC", width=80, height=7
+        )
+        self.error_panel.insert(tk.INSERT, str(e))
+        self.error_panel.place(x=10, y=180)
 
 
-class Service(ttk.Frame):
+class Service(ReportTab, ttk.Frame):
     """Отчет по услугам ЛИС и инст."""
     def __init__(self, container):
         super().__init__(container)
@@ -848,44 +1077,36 @@ class Service(ttk.Frame):
 
     def read_and_create_summary_operation(self, container):
         """Формирует отчет по отсутсвию телефона и адреса."""
-        self.delete_panel_errors()
-        self.file_processing = tk.Label(
-            container.window_services,
-            font=("Microsoft Sans Serif", 16),
-            text="Файл обрабатывается, пожалуйста, подождите...",
-        )
-        self.file_processing.place(x=10, y=110)
-        self.update()
+        path = self.filepath_services.path
 
-        try:
-            if self.filepath_services.path is None:
+        def task(job):
+            job.step("Чтение файла, пожалуйста, подождите...")
+            if path is None:
                 raise ValidateError("Выберите файл с отчетом!")
-            excel_document = report_services.ServicesReport(self.filepath_services.path)
-            inst_from_excel, lis_from_excel, svod_from_excel = excel_document.open_file_return_data()
+            excel_document = report_services.ServicesReport(path)
+            inst_from_excel, lis_from_excel, svod_from_excel = excel_document.open_file_return_data(job.step)
+            job.step("Обработка и сохранение...")
             excel_document.save_files(inst_from_excel, lis_from_excel, svod_from_excel)
-        except Exception as e:
-            print(type(e))
-            if isinstance(e, ValueError) or isinstance(e, ValidateError):
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = "Ошибка валидации файла!"
-            elif isinstance(e, TypeError):
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = "Ошибка при открытии файла!"
-            else:
-                self.file_processing["fg"] = "Crimson"
-                self.file_processing["text"] = f"Неизвестная ошибка. {type(e)}"
-            self.error_panel = tk.Text(
-                container.window_services, bg="#FFCCCC", width=80, height=7
-            )
-            self.error_panel.insert(tk.INSERT, str(e))
-            self.error_panel.place(x=10, y=180)
-            return
+
+        self.start_report(container, container.window_services, self.btn_start_services, "Напр.услуги", task)
+
+    def report_failed(self, container, e):
+        """Показывает ошибку формирования отчета."""
+        print(type(e))
+        if isinstance(e, ValueError) or isinstance(e, ValidateError):
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = "Ошибка валидации файла!"
+        elif isinstance(e, TypeError):
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = "Ошибка при открытии файла!"
         else:
-            self.file_processing[
-                "text"
-            ] = "Файл успешно обработан и сохранён в текущей папке."
-            self.file_processing["fg"] = "LimeGreen"
-            self.update()
+            self.file_processing["fg"] = "Crimson"
+            self.file_processing["text"] = f"Неизвестная ошибка. {type(e)}"
+        self.error_panel = tk.Text(
+            container.window_services, bg="#FFCCCC", width=80, height=7
+        )
+        self.error_panel.insert(tk.INSERT, str(e))
+        self.error_panel.place(x=10, y=180)
 
 
 class App(tk.Tk):
@@ -916,6 +1137,19 @@ class App(tk.Tk):
         )
         self.creator_text.place(x=10, y=370)
         self.tabs.pack(expand=1, fill="both")
+        self.jobs = jobs.JobRunner(self)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    def warm_up(self):
+        """Окно показано: загружает модули отчетов в фоне, чтобы первый отчет не ждал импорта."""
+        lazy_import.mark("окно показано")
+        on_done = write_startup_times if "--startup-times" in sys.argv else None
+        lazy_import.warm_up(WARM_UP_MODULES, on_done)
+
+    def close(self):
+        """Отменяет отчеты и закрывает окно."""
+        self.jobs.shutdown()
+        self.destroy()
 
     def delete_panel_errors(self):
         """Уничтожает панели с сошибками."""
@@ -992,12 +1226,15 @@ class App(tk.Tk):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = App()
     Emk(app)
     Bunk(app)
     Phone(app)
     Operation(app)
     Service(app)
+    lazy_import.mark("окно создано")
     import pyi_splash
     pyi_splash.close()
+    app.after(WARM_UP_DELAY_MS, app.warm_up)
     app.mainloop()
@@ -0,0 +1,116 @@
+"""Выполнение отчетов в фоне, без блокировки окна.
+
+Отчет выполняется в пуле потоков, окно опрашивает задачи через after() и само
+обновляет надписи: к виджетам Tk обращается только главный поток. Отчеты разных
+вкладок могут выполняться одновременно. Отмена кооперативная: задача проверяет
+флаг на каждом этапе (Job.step) и прерывается исключением JobCancelled.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+# Сколько отчетов может выполняться одновременно (по одному на вкладку).
+WORKERS = 5
+# Период опроса задач окном, мс.
+POLL_MS = 100
+
+
+class JobCancelled(Exception):
+    """Задача остановлена пользователем."""
+
+
+class Job:
+    """Задача отчета: флаг отмены и очередь сообщений о ходе выполнения."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.cancel_event = threading.Event()
+        self.messages = queue.Queue()
+        self.future = None
+
+    def cancel(self):
+        """Просит задачу остановиться на ближайшем этапе."""
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def step(self, text):
+        """Проверка отмены и сообщение для окна. Вызывается из задачи.
+
+        text - название этапа или progress.ProgressInfo (step передается
+        загрузчикам отчетов как on_progress, тогда отмена срабатывает и во время разбора).
+        """
+        if self.cancelled:
+            raise JobCancelled(f"Отчет {self.name} отменен.")
+        self.messages.put(text)
+
+
+class JobRunner:
+    """Пул фоновых задач окна. root - любой виджет Tk (нужен только after())."""
+
+    def __init__(self, root, workers: int = None, poll_ms: int = None):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=workers or WORKERS, thread_name_prefix="report")
+        self.poll_ms = POLL_MS if poll_ms is None else poll_ms
+        # Задача -> (on_progress, on_done, on_error).
+        self.jobs = {}
+        self.polling = False
+
+    def submit(
+        self,
+        name: str,
+        task: Callable,
+        on_progress: Callable = None,
+        on_done: Callable = None,
+        on_error: Callable = None) -> Job:
+        """Запускает task(job) в фоне.
+
+        Обработчики вызываются в главном потоке: on_progress(текст этапа),
+        on_done(результат task), on_error(исключение), в том числе JobCancelled.
+        """
+        job = Job(name)
+        self.jobs[job] = (on_progress, on_done, on_error)
+        job.future = self.executor.submit(task, job)
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_ms, self.poll)
+        return job
+
+    def poll(self):
+        """Передает сообщения и результаты задач обработчикам окна."""
+        try:
+            for job, (on_progress, on_done, on_error) in list(self.jobs.items()):
+                while True:
+                    try:
+                        text = job.messages.get_nowait()
+                    except queue.Empty:
+                        break
+                    if on_progress is not None:
+                        on_progress(text)
+                if not job.future.done():
+                    continue
+                del self.jobs[job]
+                error = job.future.exception()
+                if error is not None:
+                    if on_error is not None:
+                        on_error(error)
+                elif on_done is not None:
+                    on_done(job.future.result())
+        finally:
+            if self.jobs:
+                self.root.after(self.poll_ms, self.poll)
+            else:
+                self.polling = False
+
+    def running(self) -> list:
+        """Незавершенные задачи."""
+        return list(self.jobs)
+
+    def shutdown(self):
+        """Отменяет все задачи. Не ждет завершения текущих этапов."""
+        for job in self.jobs:
+            job.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,93 @@
+"""Отложенная загрузка тяжелых модулей и замер времени запуска.
+
+Модули отчетов тянут openpyxl, а календарь - tkcalendar и babel: вместе это
+основная часть времени до появления окна. LazyModule загружает модуль при
+первом обращении к атрибуту, а warm_up() загружает их заранее в фоновом потоке,
+когда окно уже показано. Время загрузки каждого модуля и этапы запуска
+(mark) собираются в TIMINGS; report() возвращает их текстом.
+"""
+import datetime
+import importlib
+import sys
+import threading
+import time
+from typing import Callable, Iterable
+
+# Начало отсчета этапов запуска: импорт этого модуля.
+START = time.perf_counter()
+# (этап или "import модуль", секунды). Этапы - от START, импорты - длительность.
+TIMINGS = []
+
+
+def mark(stage: str):
+    """Запоминает, сколько прошло от начала запуска до этапа stage."""
+    TIMINGS.append((stage, time.perf_counter() - START))
+
+
+class LazyModule:
+    """Модуль, который загружается при первом обращении к атрибуту.
+
+    Присваивание атрибута (настройки вида report_bunk_50.COUNT_DAYS = 30)
+    тоже загружает модуль и меняет значение в нем.
+    """
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+
+    def load(self):
+        module = self._module
+        if module is None:
+            loaded = self._name in sys.modules
+            started = time.perf_counter()
+            module = importlib.import_module(self._name)
+            if not loaded:
+                TIMINGS.append((f"import {self._name}", time.perf_counter() - started))
+            object.__setattr__(self, "_module", module)
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, name: str):
+        return getattr(self.load(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(self.load(), name, value)
+
+    def __repr__(self):
+        state = "загружен" if self.loaded else "не загружен"
+        return f"<LazyModule {self._name}, {state}>"
+
+
+def warm_up(modules: Iterable[LazyModule], on_done: Callable = None) -> threading.Thread:
+    """Загружает модули в фоновом потоке. on_done() вызывается из этого потока."""
+    def load_all():
+        for module in modules:
+            try:
+                module.load()
+            except Exception:
+                # Ошибка повторится и будет показана при обращении к модулю из окна.
+                pass
+        mark("фоновая загрузка модулей")
+        if on_done is not None:
+            on_done()
+
+    thread = threading.Thread(target=load_all, name="warm_up", daemon=True)
+    thread.start()
+    return thread
+
+
+def report(version: str = "") -> str:
+    """Этапы запуска и время загрузки модулей."""
+    lines = [f"Запуск {datetime.datetime.now():%d.%m.%Y %H:%M:%S} v{version}, frozen={getattr(sys, 'frozen', False)}"]
+    for stage, seconds in TIMINGS:
+        lines.append(f"  {stage:<40} {seconds * 1000:8.0f} мс")
+    return "\n".join(lines)
+
+
+def write_report(filepath: str, version: str = ""):
+    """Дописывает отчет о запуске в файл, чтобы сравнивать версии."""
+    with open(filepath, "a", encoding="utf-8") as file:
+        print(report(version), file=file)
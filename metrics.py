@@ -0,0 +1,240 @@
+"""Замеры этапов отчетов: время, строки и память в metrics.jsonl.
+
+Этап оборачивается декоратором timed() или контекстом stage(). По окончании
+этапа в METRICS_FILE дописывается строка JSON: отчет, этап, внешний этап,
+секунды, строки и process_peak_rss_mb - наибольшая память процесса с его
+запуска (МБ). Это не память этапа: после самого тяжелого этапа у всех
+следующих то же значение. Память именно этапа - peak_traced_mb при PROFILE.
+
+Замеры включаются по запросу: флаг --metrics или --profile, переменная
+окружения REPORTS_METRICS=1 (или REPORTS_PROFILE=1). Файл ротируется по
+размеру (MAX_BYTES, BACKUP_COUNT копий), как журнал ошибок.
+
+При PROFILE (флаг --profile или переменная окружения REPORTS_PROFILE=1)
+каждый этап верхнего уровня дополнительно выполняется под cProfile и
+tracemalloc: в PROFILE_DIR сохраняются статистика cProfile (.prof, открывается
+pstats/snakeviz) и самые затратные по памяти строки (.txt), а в записи этапа -
+пиковая память Python именно этого этапа. tracemalloc считает память всего
+процесса, поэтому профилируемые этапы разных потоков (задачи окна) идут по
+очереди. Профилирование замедляет отчет.
+"""
+import cProfile
+import datetime
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from error_log import BatchFileHandler
+
+if getattr(sys, "frozen", False):
+    BASE_DIR = os.path.dirname(sys.executable)
+elif __file__:
+    BASE_DIR = os.path.dirname(__file__)
+
+METRICS_FILE = os.path.join(BASE_DIR, "metrics.jsonl")
+PROFILE_DIR = os.path.join(BASE_DIR, "profiles")
+# Профилировать этапы верхнего уровня (cProfile и tracemalloc).
+PROFILE = os.environ.get("REPORTS_PROFILE", "") not in ("", "0")
+# Записывать замеры этапов.
+ENABLED = PROFILE or os.environ.get("REPORTS_METRICS", "") not in ("", "0")
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+# Строк в отчете tracemalloc.
+TOP_MEMORY_LINES = 30
+
+_local = threading.local()
+_write_lock = threading.Lock()
+# Профилируемый этап верхнего уровня в процессе идет один.
+_profile_lock = threading.Lock()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Пиковая память процесса с его запуска, МБ."""
+    try:
+        import resource
+    except ImportError:
+        return windows_peak_mb()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux - килобайты, macOS - байты.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def windows_peak_mb() -> Optional[float]:
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        if not kernel32.K32GetProcessMemoryInfo(
+                kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+    except (AttributeError, OSError, ImportError):
+        return None
+
+
+def count_rows(result) -> Optional[int]:
+    """Число строк в результате этапа: длина списка, сумма по кортежу списков."""
+    if isinstance(result, (list, dict)):
+        return len(result)
+    if isinstance(result, tuple):
+        counts = [count_rows(item) for item in result]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+class Stage:
+    """Идущий этап. rows можно задать внутри блока with."""
+
+    def __init__(self, name: str, report: str = None, rows: int = None):
+        self.name = name
+        self.report = report
+        self.rows = rows
+        self.parent = None
+        self.seconds = None
+        self.profile_files = []
+        self.peak_traced_mb = None
+
+
+def stages() -> list:
+    """Стек этапов текущего потока."""
+    stack = getattr(_local, "stages", None)
+    if stack is None:
+        stack = _local.stages = []
+    return stack
+
+
+def write(record: dict):
+    """Дописывает запись в METRICS_FILE. Ошибки записи handler выводит в stderr."""
+    with _write_lock:
+        handler = BatchFileHandler(
+            METRICS_FILE, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8", delay=True)
+        handler.handle(logging.makeLogRecord({"msg": json.dumps(record, ensure_ascii=False)}))
+
+
+def profile_name(current: Stage) -> str:
+    moment = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(PROFILE_DIR, f"{moment}_{os.getpid()}_{current.report or 'report'}_{current.name}")
+
+
+@contextmanager
+def stage(name: str, report: str = None, rows: int = None):
+    """Замер этапа. Вложенный этап записывается с parent - именем внешнего."""
+    if not ENABLED:
+        yield Stage(name, report, rows)
+        return
+    stack = stages()
+    current = Stage(name, report, rows)
+    if stack:
+        current.parent = stack[-1].name
+        if current.report is None:
+            current.report = stack[-1].report
+    profiler = None
+    tracing = False
+    profiling = PROFILE and not stack
+    if profiling:
+        _profile_lock.acquire()
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Уже идет профилирование в другом потоке (Python 3.12+).
+            profiler = None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            tracing = True
+        tracemalloc.reset_peak()
+    stack.append(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - started
+        stack.pop()
+        if profiling:
+            try:
+                finish_profile(current, profiler, tracing)
+            finally:
+                _profile_lock.release()
+        record = {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "report": current.report,
+            "stage": current.name,
+            "parent": current.parent,
+            "seconds": round(current.seconds, 4),
+            "rows": current.rows,
+            "process_peak_rss_mb": round(peak_rss_mb() or 0, 1) or None,
+        }
+        if current.peak_traced_mb is not None:
+            record["peak_traced_mb"] = round(current.peak_traced_mb, 1)
+            record["profile"] = current.profile_files
+        write(record)
+
+
+def finish_profile(current: Stage, profiler: Optional[cProfile.Profile], tracing: bool):
+    """Сохраняет профиль и отчет о памяти этапа."""
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = profile_name(current)
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(f"{base}.prof")
+            current.profile_files.append(f"{base}.prof")
+        if tracemalloc.is_tracing():
+            current.peak_traced_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            top = tracemalloc.take_snapshot().statistics("lineno")[:TOP_MEMORY_LINES]
+            with open(f"{base}.txt", "w", encoding="utf-8") as file:
+                print(f"{current.report} {current.name}: {current.seconds:.2f} с, "
+                      f"пик {current.peak_traced_mb:.1f} МБ", file=file)
+                for statistic in top:
+                    print(statistic, file=file)
+            current.profile_files.append(f"{base}.txt")
+    except OSError as e:
+        print(f"Не удалось сохранить профиль: {e}", file=sys.stderr)
+    finally:
+        if tracing:
+            tracemalloc.stop()
+
+
+def timed(name: str = None, rows: Callable = count_rows):
+    """Декоратор этапа. Для методов отчет - имя класса, строки - rows(результат)."""
+    def decorator(function):
+        stage_name = name or function.__name__
+        method = "." in function.__qualname__.replace("<locals>.", "")
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            report = type(args[0]).__name__ if method and args else None
+            with stage(stage_name, report) as current:
+                result = function(*args, **kwargs)
+                if rows is not None and current.rows is None:
+                    current.rows = rows(result)
+                return result
+        return wrapper
+    return decorator
@@ -0,0 +1,303 @@
+"""Утренние отчеты без окна: все выгрузки папки за один запуск.
+
+Вид каждой выгрузки определяется по заголовкам на первом листе или задается
+файлом-манифестом (JSON, пути относительно манифеста):
+
+    {
+        "emk.xlsx": "EmkReport",
+        "койки.xlsx": "BunkReport",
+        "телефоны.xlsx": "PhoneReport",
+        "операции.xlsx": "OperationReport",
+        "услуги.xlsx": "ServicesReport"
+    }
+
+Отчеты выполняются одновременно в отдельных процессах, поэтому весь запуск
+длится примерно как самый долгий отчет. Файлы сохраняются в папку
+"Отчеты дд.мм.гггг" рядом с выгрузками (или в --out), в конце выводится сводка.
+
+    python morning_batch.py <папка> [--manifest файл.json] [--out папка] [--workers N] [--progress] [--metrics] [--profile]
+"""
+import argparse
+import datetime
+import functools
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import metrics
+import parallel_sheets
+import progress
+import report_bunk_50
+import report_emk
+import report_operations
+import report_phone_adress
+import report_services
+from error_log import log_any_error
+import xlsx_reader
+
+# Сколько первых строк первого листа просматривается для определения вида выгрузки.
+SNIFF_ROWS = 50
+# Процессов на разбор листов внутри одного отчета: отчеты и так идут параллельно.
+SHEET_WORKERS = 1
+# Вид выгрузки -> заголовки, которые должны встретиться. Проверяются по порядку.
+TITLE_MARKERS = (
+    ("EmkReport", (report_emk.TITLE_VALUES[0],)),
+    ("ServicesReport", (report_services.TITLE_VALUES[0],)),
+    ("OperationReport", (report_operations.TITLE_VALUES_LEFT[0], report_operations.TITLE_VALUES_RIGHT[0])),
+    ("PhoneReport", (report_phone_adress.TITLE_VALUES_UP[0],)),
+    ("BunkReport", (report_bunk_50.TITLE_VALUES[0], "Кол-во \nк/дней")),
+)
+
+
+class JobResult(NamedTuple):
+    """Итог одного отчета."""
+    kind: str
+    filepath: str
+    seconds: float
+    files: List[str]
+    error: Optional[str] = None
+
+
+def run_emk(filepath: str, on_progress: Callable = None):
+    report = report_emk.EmkReport(filepath)
+    data = report.open_file_return_data(on_progress)
+    report.save_files(*report.processing_report(data))
+    indicators = [
+        (report_emk.LisIdentificator(report_emk.HEADINGS[17], report_emk.HEADINGS[18]),
+         ("Отчет по ЛИС в ЭМК", "ЛИС по выписанным пациентам", "ЛИС")),
+        (report_emk.InstIdentificator(report_emk.HEADINGS[19], report_emk.HEADINGS[20]),
+         ("Отчет по Инстр.напр. в ЭМК", "Инструментальная диагностика по выписанным пациентам", "Инструм на")),
+        (report_emk.ConsIdentificator(report_emk.HEADINGS[21], report_emk.HEADINGS[22]),
+         ("Отчет по Конс. в ЭМК", "Оформление консультативных услуг по выписанным пациентам", "Консультации на")),
+    ]
+    aggregator = report_emk.IndicatorAggregator([indicator for indicator, _ in indicators])
+    for (indicator, names), data in zip(indicators, aggregator.processing()):
+        indicator.save_file(data, *names)
+
+
+def run_bunk(filepath: str, on_progress: Callable = None, export_name: str = None):
+    report = report_bunk_50.BunkReport(filepath, export_name=export_name)
+    data_bunks, data_50 = report.open_file_return_data(on_progress)
+    report.save_in_files(*report.processing(data_bunks, data_50))
+
+
+def run_phone(filepath: str, on_progress: Callable = None):
+    report = report_phone_adress.PhoneReport(filepath)
+    report.processing_and_save(*report.open_file_return_data(on_progress))
+
+
+def run_operations(filepath: str, on_progress: Callable = None):
+    report = report_operations.OperationReport(filepath)
+    report.processing_and_save(report.open_file_return_data(True, on_progress))
+
+
+def run_services(filepath: str, on_progress: Callable = None):
+    report = report_services.ServicesReport(filepath)
+    report.save_files(*report.open_file_return_data(on_progress))
+
+
+# Вид выгрузки -> функция, которая формирует и сохраняет отчеты, как кнопка вкладки.
+RUNNERS: Dict[str, Callable] = {
+    "EmkReport": run_emk,
+    "BunkReport": run_bunk,
+    "PhoneReport": run_phone,
+    "OperationReport": run_operations,
+    "ServicesReport": run_services,
+}
+
+
+def detect_kind(filepath: str) -> Optional[str]:
+    """Вид выгрузки по заголовкам первого листа или None."""
+    values = set()
+    wb = xlsx_reader.load_workbook(filepath)
+    try:
+        for number, row in enumerate(wb.worksheets[0].iter_rows(values_only=True)):
+            if number >= SNIFF_ROWS:
+                break
+            values.update(value.upper() for value in row if type(value) is str)
+    finally:
+        wb.close()
+    for kind, markers in TITLE_MARKERS:
+        if all(marker.upper() in values for marker in markers):
+            return kind
+    return None
+
+
+def find_jobs(directory: str, manifest: str = None) -> List[tuple]:
+    """(вид, путь) для каждой выгрузки: из манифеста или по заголовкам файлов папки."""
+    if manifest is not None:
+        with open(manifest, encoding="utf-8") as file:
+            mapping = json.load(file)
+        base = os.path.dirname(os.path.abspath(manifest))
+        jobs = []
+        for filename, kind in mapping.items():
+            if kind not in RUNNERS:
+                raise ValueError(f'Неизвестный отчет "{kind}" для "{filename}". Возможные: {", ".join(RUNNERS)}')
+            jobs.append((kind, os.path.join(base, filename)))
+        return jobs
+    jobs = []
+    for filename in sorted(os.listdir(directory)):
+        filepath = os.path.join(directory, filename)
+        if not filename.lower().endswith(".xlsx") or filename.startswith("~$") or not os.path.isfile(filepath):
+            continue
+        try:
+            kind = detect_kind(filepath)
+        except Exception as e:
+            log_any_error(f'[ERR] Не удалось прочитать "{filepath}" при определении отчета. \n{e}')
+            kind = None
+        if kind is None:
+            print(f"Пропущен (неизвестная выгрузка): {filename}", file=sys.stderr)
+            continue
+        jobs.append((kind, filepath))
+    return jobs
+
+
+def reserve_name(directory: str, name: str) -> str:
+    """Создает пустой файл name или "name (2)" и т.д., если name уже занято.
+
+    Отчеты одного вида, закончившиеся в одну секунду, получают одинаковые имена;
+    файл создается атомарно, поэтому параллельные задачи не займут одно имя.
+    """
+    stem, ext = os.path.splitext(name)
+    candidate = name
+    number = 1
+    while True:
+        try:
+            os.close(os.open(os.path.join(directory, candidate), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return candidate
+        except FileExistsError:
+            number += 1
+            candidate = f"{stem} ({number}){ext}"
+
+
+def run_job(
+    kind: str,
+    filepath: str,
+    out_dir: str,
+    show_progress: bool = False,
+    profile: bool = False,
+    export_name: str = None) -> JobResult:
+    """Формирует отчеты одной выгрузки. Вызывается в отдельном процессе.
+
+    Отчеты сохраняются в текущую папку, поэтому задача работает в своей
+    временной папке (у каждой задачи своя, даже для выгрузок одного вида) и
+    переносит готовые файлы в out_dir. profile - см. metrics.PROFILE.
+    export_name - исходное имя выгрузки, если файл сохранен под другим: по нему
+    отчет по койкам определяет дату для истории.
+    """
+    parallel_sheets.WORKERS = SHEET_WORKERS
+    if profile:
+        metrics.PROFILE = metrics.ENABLED = True
+    os.makedirs(out_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{kind}_", dir=out_dir)
+    cwd = os.getcwd()
+    started = time.perf_counter()
+    error = None
+    files = []
+    try:
+        os.chdir(staging)
+        on_progress = progress.printer(prefix=f"[{kind}] ") if show_progress else None
+        runner = RUNNERS[kind]
+        if export_name and kind == "BunkReport":
+            runner = functools.partial(run_bunk, export_name=export_name)
+        runner(os.path.abspath(os.path.join(cwd, filepath)), on_progress)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        log_any_error(f"[ERR] Утренние отчеты, {kind} {filepath}: \n{traceback.format_exc()}")
+    finally:
+        os.chdir(cwd)
+        for name in sorted(os.listdir(staging)):
+            target = reserve_name(out_dir, name)
+            # Временная папка внутри out_dir: перенос без копирования, поверх пустого файла.
+            os.replace(os.path.join(staging, name), os.path.join(out_dir, target))
+            files.append(target)
+        shutil.rmtree(staging, ignore_errors=True)
+    return JobResult(kind, filepath, time.perf_counter() - started, files, error)
+
+
+def run_batch(
+    jobs: List[tuple],
+    out_dir: str,
+    workers: int = None,
+    show_progress: bool = False,
+    profile: bool = False) -> List[JobResult]:
+    """Выполняет отчеты одновременно. Результаты в порядке jobs."""
+    os.makedirs(out_dir, exist_ok=True)
+    if not jobs:
+        return []
+    workers = min(workers or len(jobs), len(jobs))
+    if workers < 2:
+        return [run_job(kind, filepath, out_dir, show_progress, profile) for kind, filepath in jobs]
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_job, kind, filepath, out_dir, show_progress, profile): number
+            for number, (kind, filepath) in enumerate(jobs)}
+        for future in as_completed(futures):
+            number = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # Процесс упал вне run_job (нехватка памяти и т.п.) - остальные отчеты продолжаются.
+                kind, filepath = jobs[number]
+                log_any_error(f"[ERR] Утренние отчеты, {kind} {filepath}: \n{e}")
+                result = JobResult(kind, filepath, 0.0, [], f"{type(e).__name__}: {e}")
+            status = "готово" if result.error is None else "ошибка"
+            print(f"{result.kind}: {status} за {result.seconds:.1f} с", file=sys.stderr, flush=True)
+            results[number] = result
+    return [results[number] for number in range(len(jobs))]
+
+
+def summary(results: List[JobResult], wall: float) -> str:
+    """Сводка запуска: по строке на отчет и общее время."""
+    lines = []
+    for result in results:
+        status = "OK" if result.error is None else f"ОШИБКА {result.error}"
+        lines.append(f"{result.kind:<16} {result.seconds:7.1f} с  {os.path.basename(result.filepath)}  {status}")
+        for name in result.files:
+            lines.append(f"{'':<16} -> {name}")
+    total = sum(result.seconds for result in results)
+    failed = sum(result.error is not None for result in results)
+    lines.append(
+        f"Отчетов: {len(results)}, с ошибкой: {failed}. "
+        f"Общее время {wall:.1f} с, сумма по отчетам {total:.1f} с.")
+    return "\n".join(lines)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Утренние отчеты по всем выгрузкам папки.")
+    parser.add_argument("directory", help="папка с выгрузками")
+    parser.add_argument("--manifest", help="JSON: файл -> EmkReport/BunkReport/PhoneReport/OperationReport/ServicesReport")
+    parser.add_argument("--out", help='папка для отчетов, по умолчанию "Отчеты дд.мм.гггг" в папке выгрузок')
+    parser.add_argument("--workers", type=int, help="процессов, по умолчанию по одному на отчет")
+    parser.add_argument("--progress", action="store_true", help="выводить ход разбора файлов")
+    parser.add_argument("--metrics", action="store_true", help="записывать замеры этапов в metrics.jsonl")
+    parser.add_argument("--profile", action="store_true", help="cProfile и tracemalloc по этапам, см. metrics.py")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        # Процессы пула (spawn) читают флаг из окружения.
+        os.environ["REPORTS_METRICS"] = "1"
+        metrics.ENABLED = True
+
+    started = time.perf_counter()
+    jobs = find_jobs(args.directory, args.manifest)
+    out_dir = args.out or os.path.join(
+        args.directory, f"Отчеты {datetime.date.today().strftime('%d.%m.%Y')}")
+    results = run_batch(jobs, os.path.abspath(out_dir), args.workers, args.progress, args.profile)
+    print(summary(results, time.perf_counter() - started))
+    if not jobs:
+        print("В папке не найдено выгрузок.", file=sys.stderr)
+        return 1
+    return 0 if all(result.error is None for result in results) else 1
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Параллельный разбор листов книги в отдельных процессах.
+
+Каждый лист читается своим процессом, результаты возвращаются в порядке
+листов, поэтому итог совпадает с последовательным разбором. Тот же пул
+используется для других независимых задач (например, записи книг по дням).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List
+
+WORKERS = min(4, os.cpu_count() or 1)
+MIN_FILE_SIZE = 2 * 1024 * 1024
+
+
+def count_workers(filepath: str, count_sheets: int, workers: int = None) -> int:
+    """Сколько процессов использовать. 1 - разбор в текущем процессе.
+
+    Для маленьких файлов запуск процессов дольше самого разбора.
+    """
+    workers = WORKERS if workers is None else workers
+    if count_sheets < 2 or workers < 2:
+        return 1
+    try:
+        if os.path.getsize(filepath) < MIN_FILE_SIZE:
+            return 1
+    except OSError:
+        return 1
+    return min(workers, count_sheets)
+
+
+def map_sheets(worker: Callable, filepath: str, sheets: list, workers: int, *args) -> List:
+    """Результаты worker(filepath, sheet, *args) по каждому листу в порядке листов."""
+    return map_tasks(worker, [(filepath, sheet) + args for sheet in sheets], workers)
+
+
+def map_tasks(worker: Callable, tasks: List[tuple], workers: int) -> List:
+    """Результаты worker(*task) по каждому набору аргументов в порядке tasks."""
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(worker, *task) for task in tasks]
+        return [future.result() for future in futures]
+    except BaseException:
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown(wait=True)
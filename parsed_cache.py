@@ -0,0 +1,241 @@
+"""Кэш разобранных данных из выгрузок на диске.
+
+Повторный запуск отчета по тому же файлу (другая дата, ПДО, ЛИС и т.п.)
+берет уже проверенные строки из кэша, а не разбирает книгу заново.
+Ключ кэша - хэш содержимого файла и отпечаток настроек разбора.
+
+Кэшем могут пользоваться несколько процессов сразу (окно, пакетный прогон,
+сервер): индекс перечитывается и записывается под файлом блокировки, а
+размер кэша считается по файлам записей в папке, а не по индексу.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+import zlib
+from typing import Any, Optional
+
+from error_log import log_any_error
+
+if getattr(sys, "frozen", False):
+    BASE_DIR = os.path.dirname(sys.executable)
+elif __file__:
+    BASE_DIR = os.path.dirname(__file__)
+
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+CACHE_MAX_SIZE = 256 * 1024 * 1024
+CACHE_FORMAT = 1
+INDEX_NAME = "index.json"
+LOCK_NAME = "index.lock"
+# Сколько ждать блокировку индекса, секунд.
+LOCK_TIMEOUT = 10
+# Индекс под блокировкой пишется за доли секунды: блокировка старше этого
+# осталась от упавшего процесса. Меньше LOCK_TIMEOUT, чтобы ее снимали, а не ждали.
+LOCK_STALE_SECONDS = 2
+# Временный файл записи старше этого остался от упавшего процесса.
+STALE_SECONDS = 60
+HASH_CHUNK_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 1
+
+
+def file_digest(filepath: str) -> str:
+    """Хэш содержимого файла."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_digest(settings: Any) -> str:
+    """Отпечаток настроек разбора: заголовков, фильтров и т.п."""
+    dump = repr((CACHE_FORMAT, settings)).encode("utf-8")
+    return hashlib.blake2b(dump, digest_size=8).hexdigest()
+
+
+class ParsedCache:
+    """Кэш с вытеснением давно не используемых записей по общему размеру."""
+
+    def __init__(self, directory: str = None, max_size: int = None):
+        self.directory = directory or CACHE_DIR
+        self.max_size = CACHE_MAX_SIZE if max_size is None else max_size
+        self.index_path = os.path.join(self.directory, INDEX_NAME)
+        self.lock_path = os.path.join(self.directory, LOCK_NAME)
+        self.index = self.read_index()
+
+    def read_index(self) -> dict:
+        try:
+            with open(self.index_path, encoding="utf-8") as file:
+                index = json.load(file)
+            if index.get("format") == CACHE_FORMAT:
+                return index
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            log_any_error(f"[ERR] Индекс кэша поврежден и будет создан заново. \n{e}")
+        return {"format": CACHE_FORMAT, "files": {}, "entries": {}}
+
+    def write_index(self):
+        # Свое имя временного файла у каждого процесса.
+        descriptor, temp_path = tempfile.mkstemp(prefix=f"{INDEX_NAME}.", suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                json.dump(self.index, file)
+            os.replace(temp_path, self.index_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+            raise
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Блокировка индекса между процессами: файл, созданный с O_EXCL."""
+        os.makedirs(self.directory, exist_ok=True)
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while True:
+            try:
+                os.close(os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                pass
+            try:
+                if time.time() - os.path.getmtime(self.lock_path) > LOCK_STALE_SECONDS:
+                    # Процесс, взявший блокировку, упал и не снял ее.
+                    os.remove(self.lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Индекс кэша занят другим процессом: {self.lock_path}")
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            with contextlib.suppress(OSError):
+                os.remove(self.lock_path)
+
+    def commit(self, change):
+        """Перечитывает индекс под блокировкой, применяет change(entries) и записывает.
+
+        Так изменения других процессов, сделанные после чтения индекса этим
+        процессом, не теряются.
+        """
+        with self.locked():
+            files = self.index["files"]
+            self.index = self.read_index()
+            self.index["files"].update(files)
+            change(self.index["entries"])
+            self.evict()
+            self.write_index()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def content_digest(self, filepath: str) -> str:
+        """Хэш файла. Если размер и время изменения не менялись, берем из индекса."""
+        stat = os.stat(filepath)
+        name = os.path.normcase(os.path.abspath(filepath))
+        known = self.index["files"].get(name)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+        digest = file_digest(filepath)
+        self.index["files"][name] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def key(self, filepath: str, settings: Any) -> str:
+        return f"{self.content_digest(filepath)}-{settings_digest(settings)}"
+
+    def get(self, filepath: str, settings: Any) -> Optional[Any]:
+        """Возвращает сохраненные данные или None, если их нет."""
+        key = None
+        try:
+            # Запись мог добавить или вытеснить другой процесс.
+            self.index["entries"] = self.read_index()["entries"]
+            key = self.key(filepath, settings)
+            if key not in self.index["entries"]:
+                return None
+            try:
+                with open(self.entry_path(key), "rb") as file:
+                    payload = pickle.loads(zlib.decompress(file.read()))
+            except FileNotFoundError:
+                self.index["entries"].pop(key)
+                return None
+        except Exception as e:
+            log_any_error(f"[ERR] Не удалось прочитать кэш для файла {filepath}. \n{e}")
+            self.index["entries"].pop(key, None)
+            return None
+        used = time.time()
+
+        def touch(entries):
+            if key in entries:
+                entries[key][1] = used
+
+        try:
+            self.commit(touch)
+        except Exception as e:
+            # Не отмечено время использования - данные из кэша все равно верные.
+            log_any_error(f"[ERR] Не удалось обновить индекс кэша для файла {filepath}. \n{e}")
+        return payload
+
+    def put(self, filepath: str, settings: Any, payload: Any):
+        """Сохраняет данные. Ошибки записи не мешают построению отчета."""
+        try:
+            key = self.key(filepath, settings)
+            data = zlib.compress(pickle.dumps(payload, pickle.HIGHEST_PROTOCOL), COMPRESS_LEVEL)
+            if len(data) > self.max_size:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, temp_path = tempfile.mkstemp(prefix=f"{key}.", suffix=".tmp", dir=self.directory)
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, self.entry_path(key))
+            entry = [len(data), time.time()]
+
+            def add(entries):
+                entries[key] = entry
+
+            self.commit(add)
+        except Exception as e:
+            log_any_error(f"[ERR] Не удалось сохранить кэш для файла {filepath}. \n{e}")
+
+    def evict(self):
+        """Удаляет самые старые по использованию записи, пока кэш больше лимита.
+
+        Размер считается по файлам .bin в папке: файлы, которых нет в индексе
+        (например, после сбоя записи индекса), тоже учитываются и удаляются
+        первыми по времени изменения. Из индекса убираются записи без файла.
+        """
+        entries = self.index["entries"]
+        now = time.time()
+        found = {}
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                name, extension = os.path.splitext(item.name)
+                try:
+                    stat = item.stat()
+                    if extension == ".bin":
+                        used = entries[name][1] if name in entries else stat.st_mtime
+                        found[name] = (stat.st_size, used)
+                    elif extension == ".tmp" and now - stat.st_mtime > STALE_SECONDS:
+                        os.remove(item.path)
+                except OSError:
+                    pass
+        for key in set(entries) - set(found):
+            del entries[key]
+        total = sum(size for size, _ in found.values())
+        for key in sorted(found, key=lambda name: found[name][1]):
+            if total <= self.max_size:
+                break
+            total -= found[key][0]
+            entries.pop(key, None)
+            try:
+                os.remove(self.entry_path(key))
+            except OSError:
+                pass
+        digests = {key.split("-")[0] for key in entries}
+        self.index["files"] = {
+            name: known for name, known in self.index["files"].items() if known[2] in digests}
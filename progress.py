@@ -0,0 +1,133 @@
+"""Ход разбора файла: просмотрено строк, скорость и оставшееся время.
+
+Циклы validate_data_* получают строки листа через Progress.rows(). Строки
+считаются пачками по CHUNK_ROWS, а callback вызывается не чаще одного раза
+в INTERVAL секунд, поэтому разбор почти не замедляется.
+"""
+import sys
+import time
+from itertools import islice
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+CHUNK_ROWS = 1024
+# Не чаще, чем раз в INTERVAL секунд.
+INTERVAL = 0.5
+
+
+class ProgressInfo(NamedTuple):
+    """Состояние разбора для callback."""
+    sheet: int
+    sheets: int
+    rows: int
+    accepted: int
+    total: Optional[int]
+    rows_per_sec: float
+    eta: Optional[float]
+    done: bool = False
+
+    @property
+    def fraction(self) -> Optional[float]:
+        """Доля просмотренных строк, если известно число строк."""
+        if self.done:
+            return 1.0
+        if not self.total:
+            return None
+        return min(self.rows / self.total, 1.0)
+
+    def __str__(self):
+        text = f"Лист {self.sheet}/{self.sheets}: {self.rows}"
+        if self.total:
+            text += f" из {self.total}"
+        text += f" строк, отобрано {self.accepted}, {self.rows_per_sec:.0f} строк/с"
+        if self.eta is not None and not self.done:
+            text += f", осталось ~{self.eta:.0f} с"
+        return text
+
+
+class Progress:
+    """Счетчик строк разбора. total - строк во всех листах (по тегу dimension), если известно."""
+
+    def __init__(
+        self,
+        callback: Callable[[ProgressInfo], None],
+        sheets: int = 1,
+        total: int = None,
+        interval: float = INTERVAL,
+        clock: Callable[[], float] = time.perf_counter):
+        self.callback = callback
+        self.sheets = sheets
+        self.total = total
+        self.interval = interval
+        self.clock = clock
+        self.sheet = 0
+        self.scanned = 0
+        self.accepted = 0
+        self.accepted_getter = None
+        self.started = clock()
+        self.reported = self.started
+
+    def rows(self, rows: Iterable, accepted: Callable[[], int] = None) -> Iterator:
+        """Строки следующего листа. accepted() - сколько строк отобрано к этому моменту."""
+        self.sheet = min(self.sheet + 1, self.sheets)
+        self.accepted_getter = accepted
+        iterator = iter(rows)
+        while True:
+            chunk = list(islice(iterator, CHUNK_ROWS))
+            if not chunk:
+                break
+            yield from chunk
+            self.scanned += len(chunk)
+            if self.clock() - self.reported >= self.interval:
+                self.report()
+
+    def info(self, done: bool = False) -> ProgressInfo:
+        if self.accepted_getter is not None:
+            self.accepted = self.accepted_getter()
+        elapsed = self.clock() - self.started
+        rate = self.scanned / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total and rate > 0:
+            eta = max(self.total - self.scanned, 0) / rate
+        return ProgressInfo(self.sheet, self.sheets, self.scanned, self.accepted, self.total, rate, eta, done)
+
+    def report(self, done: bool = False):
+        self.reported = self.clock()
+        self.callback(self.info(done))
+
+    def finish(self, accepted: int = None):
+        """Последний вызов callback: все листы разобраны, в том числе в других процессах."""
+        self.sheet = self.sheets
+        self.scanned = max(self.scanned, self.total or 0)
+        if accepted is not None:
+            self.accepted_getter = None
+            self.accepted = accepted
+        self.report(done=True)
+
+
+def tracker(callback: Optional[Callable], sheets=(), **kwargs) -> Optional[Progress]:
+    """Progress для листов sheets книги xlsx_reader/openpyxl или None без callback.
+
+    Общее число строк известно, если у всех листов есть тег dimension.
+    """
+    if callback is None:
+        return None
+    sheets = list(sheets)
+    total = 0
+    for sheet in sheets:
+        max_row = getattr(sheet, "max_row", None)
+        # Без тега dimension или с "A1" на весь лист число строк неизвестно.
+        if not max_row or max_row < 2:
+            total = None
+            break
+        total += max_row
+    return Progress(callback, max(len(sheets), 1), total, **kwargs)
+
+
+def printer(file=None, prefix: str = "") -> Callable[[ProgressInfo], None]:
+    """Callback для запуска без окна: строка хода разбора в file (по умолчанию stderr).
+
+    prefix - начало строки, например название отчета, когда отчетов несколько.
+    """
+    def print_progress(info: ProgressInfo):
+        print(f"{prefix}{info}", file=file or sys.stderr, flush=True)
+    return print_progress
@@ -2,12 +2,10 @@
 import datetime
 import os
 import sys
-from typing import Optional, Tuple, Union
+from typing import Callable, Optional, Tuple, Union
 
 import openpyxl
 from openpyxl import Workbook
-from openpyxl.styles import Alignment, Color, Font, PatternFill
-from openpyxl.styles.borders import Border, Side
 
 from validators import (
     validate_department,
@@ -19,6 +17,16 @@ from validators import (
     validate_for_title,
     ValidateError
 )
+from error_log import log_any_error
+import bunk_history
+from columns import ColumnMap
+from departments import is_day_stay, registry
+import metrics
+import parallel_sheets
+from progress import Progress, tracker
+import report_styles as styles
+from report_writer import ReportBook
+import xlsx_reader
 
 if getattr(sys, "frozen", False):
     BASE_DIR = os.path.dirname(sys.executable)
@@ -37,32 +45,30 @@ def now() -> str:
     return datetime.datetime.now().strftime("%d.%m %H_%M_%S")
 
 
-def log_any_error(any_text):
-    """Функция для записи ошибок в файл."""
-    log = open(rf"{BASE_DIR}\log_any_error.txt", "a+", encoding='UTF-8')
-    text = str(any_text)
-    print(f"[{now()}] {text}", file=log)
-    log.close()
+def parse_sheet(filepath: str, sheet_name: str, count_days: int) -> Tuple[dict, list]:
+    """Разбор одного листа в отдельном процессе."""
+    global COUNT_DAYS
 
-
-def check_index(lst: list, column_name: str, class_name: str = None):
-    """Получает название столбца и возвращает индекс."""
+    COUNT_DAYS = count_days
+    data_bunks = {}
+    data_50 = []
+    wb = xlsx_reader.load_workbook(filepath)
     try:
-        upper_list = [element.upper() if isinstance(element, str) else element for element in lst]
-        index_el = upper_list.index(column_name.upper())
-        return index_el
-    except ValueError:
-        if class_name:
-            log_any_error(f'Не найден столбец "{column_name}" в классе {class_name}')
-            return
-        log_any_error(f'Не найден столбец "{column_name}"')
+        BunkReport(filepath).validate_data_for_filepath(wb[sheet_name], data_bunks, data_50)
+    finally:
+        wb.close()
+    return data_bunks, data_50
 
 
 class BunkReport:
     """Класс для создания отчетов по ЭМК. Принимает путь для файла."""
 
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, workers: int = None, export_name: str = None):
         self.filepath = filepath
+        self.workers = parallel_sheets.WORKERS if workers is None else workers
+        # Имя выгрузки МИС, если файл сохранен под другим (загрузки сервера отчетов):
+        # по нему определяется дата для истории коек.
+        self.export_name = export_name
 
     def open_file_with_bunks(self) -> bool:
         """Фукнция для открытия файла с койками для использования далее."""
@@ -81,17 +87,21 @@ class BunkReport:
             for row in sheet.iter_rows(min_row=2, values_only=True):
                 department = row[0]
                 validate_bunks_from_file(row[1], department, BUNKS)
-            wb._archive.close()
+            wb.close()
             return True
         self.create_sample()
         return False
 
-    def validate_data_for_filepath(self, works_sheet, data_bunks: dict, data_50: list):
+    def validate_data_for_filepath(self, works_sheet, data_bunks: dict, data_50: list, progress: Progress = None):
         """Функция валидации строк, при чтении файла."""
         department_column = None
+        count_days_index = None
+        number_history_index = None
         is_title = True
-        title = []
-        for row in works_sheet.iter_rows(values_only=True):
+        rows = works_sheet.iter_rows(values_only=True)
+        if progress is not None:
+            rows = progress.rows(rows, lambda: sum(data_bunks.values()))
+        for row in rows:
             if validate_column_with_data(row, EXPECTED_MIN_COLUMN_VALUES):
                 continue
             if validate_numbers(row):
@@ -99,11 +109,12 @@ class BunkReport:
             if is_title:
                 if validate_for_title(TITLE_VALUES, row):
                     is_title = False
-                    title = row
-                    department_column_ind = check_index(title, "Отделение")
-                    if department_column_ind is None:
+                    columns = ColumnMap(row)
+                    department_column = columns.index("Отделение")
+                    if department_column is None:
                         raise ValidateError("Не найден столбец 'Отделение'!")
-                    department_column = department_column_ind
+                    count_days_index = columns.index("Кол-во \nк/дней")
+                    number_history_index = columns.index("Номер истории болезни")
                 continue
             if data_bunks.get(row[department_column]):
                 data_bunks[row[department_column]] += 1
@@ -111,13 +122,11 @@ class BunkReport:
                 if not validate_department(row[department_column]):
                     continue
                 data_bunks[row[department_column]] = 1
-            count_days_index = check_index(title, "Кол-во \nк/дней")
             if count_days_index is None:
                 raise ValidateError("Не найден столбец 'Кол-во \nк/дней'!")
             count_days = validate_count_days(row[count_days_index])
             if count_days >= COUNT_DAYS:
                 department = row[department_column]
-                number_history_index = check_index(title, "Номер истории болезни")
                 if number_history_index is None:
                     raise ValidateError("Не найден столбец 'Номер истории болезни'!")
                 number_history = validate_number_history(row[number_history_index])
@@ -125,23 +134,34 @@ class BunkReport:
         if is_title:
             raise ValidateError("Скорее всего Вы выбрали не тот файл или в нём нет заголовков!")
 
-    def open_file_return_data(self) -> Tuple[dict, list]:
-        """Открыли файл и вернули истину и данные, либо ложь и ошибку."""
+    @metrics.timed()
+    def open_file_return_data(self, on_progress: Callable = None) -> Tuple[dict, list]:
+        """Открыли файл и вернули истину и данные, либо ложь и ошибку. on_progress - см. progress.Progress."""
         try:
-            wb = openpyxl.load_workbook(self.filepath, read_only=True, data_only=True)
+            wb = xlsx_reader.load_workbook(self.filepath)
             data_bunks = {}
             data_50 = []
             sheets = wb.sheetnames
+            progress = tracker(on_progress, wb.worksheets)
+            workers = parallel_sheets.count_workers(self.filepath, len(sheets), self.workers)
             if len(sheets) == 1:
                 ws = wb.active
-                self.validate_data_for_filepath(ws, data_bunks, data_50)
+                self.validate_data_for_filepath(ws, data_bunks, data_50, progress)
             elif len(sheets) == 0:
                 raise ValidateError('В файле отчета нет листов.')
+            elif workers > 1:
+                results = parallel_sheets.map_sheets(
+                    parse_sheet, self.filepath, sheets, workers, COUNT_DAYS)
+                for sheet_bunks, sheet_50 in results:
+                    for department, count in sheet_bunks.items():
+                        data_bunks[department] = data_bunks.get(department, 0) + count
+                    data_50.extend(sheet_50)
             else:
                 for sheet in sheets:
                     ws = wb[sheet]
-                    self.validate_data_for_filepath(ws, data_bunks, data_50)
-            
+                    self.validate_data_for_filepath(ws, data_bunks, data_50, progress)
+            if progress is not None:
+                progress.finish(sum(data_bunks.values()))
             return data_bunks, data_50
         except TypeError as e:
             log_any_error(f"[ERR] TypeError {e} в open_file_return_data")
@@ -151,76 +171,34 @@ class BunkReport:
             raise ValidateError(f"{e}")
         finally:
             try:
-                wb._archive.close()
+                wb.close()
             except Exception as e:
                 log_any_error(f"[ERR] Ошибка при закрытии файла. \n{e}")
 
     def dynamic_on_sheet(self, sheet, lst: list):
         """Обрабатывает лист с динамикой коек."""
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
-        red_color = Color(rgb="FF0000")
-        red_fill = PatternFill(patternType="solid", fgColor=red_color)
-
-        for row in range(0, len(lst)):
-            for column in range(0, len(lst[0])):
-                if row == 0:
-                    sheet.cell(row=row + 1, column=column + 1).value = lst[row][column]
-                    sheet.cell(row=row + 1, column=column + 1).border = thin_border
-                    sheet.cell(row=row + 1, column=column + 1).font = Font(bold=True)
-                    continue
-                sheet.cell(row=row + 1, column=column + 1).value = lst[row][column]
-                sheet.cell(row=row + 1, column=column + 1).border = thin_border
-                if column == 3 and int(lst[row][column]) < 0:
-                    sheet.cell(row=row + 1, column=column + 1).fill = red_fill
-                    sheet.cell(row=row + 1, column=column + 1).font = Font(
-                        color="FFFFFF"
-                    )
-        for r in sheet.iter_rows(max_row=1):
-            for col in r:
-                col.alignment = Alignment(
-                    vertical="center", horizontal="center", wrap_text=True
-                )
-
         width_3 = 15
-        sheet.column_dimensions["A"].width = 120
-        sheet.column_dimensions["B"].width = width_3
-        sheet.column_dimensions["C"].width = width_3
-        sheet.column_dimensions["D"].width = width_3
+        sheet.set_widths({"A": 120, "B": width_3, "C": width_3, "D": width_3})
+        count_columns = len(lst[0])
+        sheet.append(lst[0], styles.HEADER)
+        for row in lst[1:]:
+            values = row[:count_columns]
+            row_styles = [styles.BORDERED] * count_columns
+            if count_columns > 3 and int(values[3]) < 0:
+                row_styles[3] = styles.NEGATIVE
+            sheet.append(values, row_styles)
 
     def fifty_on_sheet(self, sheet, lst: list):
         """Более 50(COUNT_DAYS) дней на лист эксель."""
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
-        for row in range(0, len(lst)):
-            for column in range(0, len(lst[0])):
-                if row == 0:
-                    sheet.cell(row=row + 1, column=column + 1).value = lst[row][column]
-                    sheet.cell(row=row + 1, column=column + 1).border = thin_border
-                    sheet.cell(row=row + 1, column=column + 1).font = Font(bold=True)
-                    continue
-                sheet.cell(row=row + 1, column=column + 1).value = lst[row][column]
-                sheet.cell(row=row + 1, column=column + 1).border = thin_border
-
         width_2 = 15
-        sheet.auto_filter.ref = sheet.dimensions
-        sheet.column_dimensions["A"].width = 120
-        sheet.column_dimensions["B"].width = width_2
-        sheet.column_dimensions["C"].width = width_2
-        for r in sheet.iter_rows(max_row=1):
-            for col in r:
-                col.alignment = Alignment(
-                    vertical="center", horizontal="center", wrap_text=True
-                )
-
+        sheet.set_widths({"A": 120, "B": width_2, "C": width_2})
+        count_columns = len(lst[0])
+        sheet.append(lst[0], styles.HEADER)
+        for row in lst[1:]:
+            sheet.append(row[:count_columns], styles.BORDERED)
+        sheet.auto_filter()
+
+    @metrics.timed()
     def processing(
         self, data_for_bunks: dict, data_for_50: list
     ) -> Tuple[list, list, list, list]:
@@ -253,12 +231,7 @@ class BunkReport:
                     f'[ERR] Отделения {e} не оказалось в файле "Отделения и койки.xlsx"'
                 )
                 continue
-            if (
-                "ДС" in department
-                or "днев" in department.lower()
-                or "дн.стац." in department.lower()
-                or "дн. стац." in department.lower()
-            ):
+            if is_day_stay(department):
                 excel_bunks_dc.append(
                     [department, BUNKS[department], count, free_bunks]
                 )
@@ -271,18 +244,12 @@ class BunkReport:
         excel_50_dc = [
             ["Отделение", "№ КВС", "Время пребывания в стационаре, в днях"],
         ]
-        for row in data_for_50:
-            if (
-                "ДС" in row[0]
-                or "днев" in row[0].lower()
-                or "дн.стац." in row[0].lower()
-                or "дн. стац." in row[0].lower()
-            ):
-                excel_50_dc.append(row)
-                continue
-            excel_50_kc.append(row)
+        rows_kc, rows_dc = registry().split(data_for_50)
+        excel_50_kc.extend(rows_kc)
+        excel_50_dc.extend(rows_dc)
         return (excel_bunks_kc, excel_bunks_dc, excel_50_kc, excel_50_dc)
 
+    @metrics.timed()
     def save_in_files(
         self,
         excel_bunks_kc: list,
@@ -291,23 +258,81 @@ class BunkReport:
         excel_50_dc: list,
     ):
         """Сохраняем данные на 4 листах."""
-        wb = Workbook()
-        wb.create_sheet(f"Более {COUNT_DAYS} дней")
-        wb.create_sheet("Динамика коек ДС")
-        wb.create_sheet(f"Более {COUNT_DAYS} дней ДС")
-
-        sheet_bunks_kc = wb.active
-        sheet_bunks_kc.title = "Динамика коек"
+        wb = ReportBook()
+        sheet_bunks_kc = wb.create_sheet("Динамика коек")
         self.dynamic_on_sheet(sheet_bunks_kc, excel_bunks_kc)
-        sheet_bunks_dc = wb["Динамика коек ДС"]
-        self.dynamic_on_sheet(sheet_bunks_dc, excel_bunks_dc)
-
-        sheet_50_kc = wb[f"Более {COUNT_DAYS} дней"]
+        sheet_50_kc = wb.create_sheet(f"Более {COUNT_DAYS} дней")
         self.fifty_on_sheet(sheet_50_kc, excel_50_kc)
-        sheet_50_dc = wb[f"Более {COUNT_DAYS} дней ДС"]
+        sheet_bunks_dc = wb.create_sheet("Динамика коек ДС")
+        self.dynamic_on_sheet(sheet_bunks_dc, excel_bunks_dc)
+        sheet_50_dc = wb.create_sheet(f"Более {COUNT_DAYS} дней ДС")
         self.fifty_on_sheet(sheet_50_dc, excel_50_dc)
 
         wb.save(f"Койки и более {COUNT_DAYS} на {now()}.xlsx")
+        self.record_history(excel_bunks_kc, excel_bunks_dc)
+
+    def record_history(self, excel_bunks_kc: list, excel_bunks_dc: list):
+        """Снимок коек сохраненного отчета в историю (bunk_history)."""
+        snapshot = [
+            (department, day_stay, capacity, count, free_bunks)
+            for day_stay, table in ((False, excel_bunks_kc), (True, excel_bunks_dc))
+            for department, capacity, count, free_bunks in table[1:]]
+        bunk_history.record(self.export_name or self.filepath, snapshot)
+
+    @metrics.timed()
+    def processing_dynamics(
+        self, weeks: int = bunk_history.WEEKS, end: datetime.date = None
+    ) -> Tuple[list, list, list, list]:
+        """Свободные и занятые койки по дням за weeks недель из истории, КС и ДС."""
+        snapshots = bunk_history.BunkHistory().last_weeks(weeks, end)
+        if not snapshots:
+            raise ValidateError(
+                f"В истории коек нет данных за {weeks} нед. Сформируйте отчет по койкам."
+            )
+        dates = sorted(set(snapshot.date for snapshot in snapshots))
+        columns = {date: number for number, date in enumerate(dates, 2)}
+        title = ["Отделение", "Коечный фонд"] + [date.strftime("%d.%m") for date in dates]
+        tables = {}
+        for snapshot in snapshots:
+            for field in ("free", "occupied"):
+                rows = tables.setdefault((field, snapshot.day_stay), {})
+                row = rows.setdefault(snapshot.department, [snapshot.department, None] + [None] * len(dates))
+                # Коечный фонд - на последнюю дату, записи отделения идут по датам.
+                row[1] = snapshot.capacity
+                row[columns[snapshot.date]] = getattr(snapshot, field)
+        return tuple(
+            [title] + list(tables.get((field, day_stay), {}).values())
+            for field, day_stay in (("free", False), ("occupied", False), ("free", True), ("occupied", True)))
+
+    def period_on_sheet(self, sheet, lst: list, negative: bool = False):
+        """Таблица отделений по дням. negative - отрицательные выделяются."""
+        sheet.set_widths({"A": 120, "B": 15})
+        sheet.append(lst[0], styles.HEADER)
+        for row in lst[1:]:
+            row_styles = [styles.BORDERED] * len(row)
+            if negative:
+                for number, value in enumerate(row[2:], 2):
+                    if value is not None and value < 0:
+                        row_styles[number] = styles.NEGATIVE
+            sheet.append(row, row_styles)
+        sheet.auto_filter()
+
+    @metrics.timed()
+    def save_dynamics(
+        self,
+        free_kc: list,
+        occupied_kc: list,
+        free_dc: list,
+        occupied_dc: list,
+    ):
+        """Сохраняем динамику за период на 4 листах."""
+        wb = ReportBook()
+        self.period_on_sheet(wb.create_sheet("Свободные койки"), free_kc, negative=True)
+        self.period_on_sheet(wb.create_sheet("Госпитализированные"), occupied_kc)
+        self.period_on_sheet(wb.create_sheet("Свободные койки ДС"), free_dc, negative=True)
+        self.period_on_sheet(wb.create_sheet("Госпитализированные ДС"), occupied_dc)
+
+        wb.save(f"Динамика за период на {now()}.xlsx")
 
     @staticmethod
     def create_sample():
@@ -1,13 +1,9 @@
 ﻿import datetime
 from copy import deepcopy
+from operator import itemgetter
 import os
 import sys
-from typing import Any, Optional, Tuple, Union
-
-import openpyxl
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Color, Font, PatternFill
-from openpyxl.styles.borders import Border, Side
+from typing import Any, Callable, Optional, Tuple, Union
 
 from validators import (
     validate_column_with_data,
@@ -15,6 +11,19 @@ from validators import (
     validate_numbers,
     validate_not_pdo,
     ValidateError)
+from error_log import log_any_error
+from jobs import JobCancelled
+from columns import ColumnMap
+from departments import is_day_stay
+from emk_table import EmkTable
+import metrics
+import parallel_sheets
+import parsed_cache
+from progress import Progress, tracker
+import report_styles as styles
+import report_writer
+from report_writer import ReportBook
+import xlsx_reader
 
 if getattr(sys, "frozen", False):
     BASE_DIR = os.path.dirname(sys.executable)
@@ -26,6 +35,7 @@ BEGIN_INDICATORS_IN_ROW = 9
 EXPECTED_MIN_COLUMN_VALUES = 21
 TITLE_VALUES = ["Наименование Медицинской организации", ]
 PDO_NAMES = ["приемн", "приёмн", " ПДО "]
+PARSED_CACHE_VERSION = 2
 HEADINGS = {
     0: "Номер КВС",
     1: "Дата выписки из стац",
@@ -54,6 +64,37 @@ HEADINGS = {
     23: "Количество необходимых реанимационных дневников в указанном движении",
     24: "Количество оформленных реанимационных дневников в указанном движении",
 }
+# Столбцы листа персонально: даты пишутся строкой "дд.мм.гггг", счетчики - целыми числами.
+PERSONAL_DATE_COLUMNS = (1, 2)
+PERSONAL_COUNT_COLUMNS = (10, 11, 14, 15, 21, 22, 23, 24)
+# Атрибуты EmkReport с индексами столбцов в порядке HEADINGS.
+COLUMN_ATTRIBUTES = (
+    "kvs_number",
+    "date_out_from_hospital",
+    "date_out_from_stage",
+    "age",
+    "have_polis",
+    "have_dul",
+    "have_snils",
+    "citizenship",
+    "department",
+    "is_initial_exam",
+    "count_diary_needed",
+    "count_diary",
+    "epicrisis_with_ecp",
+    "surgical_operation_name",
+    "surgical_operation_count",
+    "surgical_operation_protocols",
+    "is_medicinal_purposes",
+    "count_lab_research",
+    "count_lab_research_complete",
+    "count_inst_research",
+    "count_inst_research_complete",
+    "count_cons",
+    "count_cons_complete",
+    "count_needed_rean",
+    "count_input_rean",
+)
 
 
 def now():
@@ -61,27 +102,6 @@ def now():
     return datetime.datetime.now().strftime("%d.%m %H_%M_%S")
 
 
-def log_any_error(any_text):
-    """Функция для записи ошибок в файл."""
-    log = open(rf"{BASE_DIR}\log_any_error.txt", "a+", encoding='UTF-8')
-    text = str(any_text)
-    print(f"[{now()}] {text}", file=log)
-    log.close()
-
-
-def check_index(lst: list, column_name: str, class_name: str = None):
-    """Получает название столбца и возвращает индекс."""
-    try:
-        upper_list = [element.upper() if isinstance(element, str) else element for element in lst]
-        index_el = upper_list.index(column_name.upper())
-        return index_el
-    except ValueError:
-        if class_name:
-            log_any_error(f'Не найден столбец "{column_name}" в классе {class_name}')
-            return
-        log_any_error(f'Не найден столбец "{column_name}"')
-
-
 def procent_is_none(lst: list) -> str:
     """Если нет процента в исходном файле, то считаем сами."""
     indicators = [0 if x is None else 1 for x in lst[BEGIN_INDICATORS_IN_ROW:]]
@@ -98,30 +118,27 @@ def date_conversion(date: Union[str, datetime.datetime]):
         raise ValueError("Попытка преобразовать дату из строки, а не datetime. Автор не был к такому готов. Нужна переработка скрипта. :)")
 
 
-def check_convert_type(variable: Any, type_variable: Any, name_variable: str):
-    """Проверяет возможность преобразования в переданный тип."""
-    try:
-        type_variable(variable)
-    except ValueError as e:
-        text_err = (
-            f"Ошибка в типе переменной. Типом '{variable}' является '{type(variable)}'."
-            f"\nОжидается преобразование {name_variable} в '{type_variable}'!")
-        log_any_error(f'{text_err}, {e}')
-        raise ValueError(text_err)
+def count_conversion(count: Any) -> Optional[int]:
+    """Счетчик к целому числу, пустое значение остается пустым."""
+    if count is None:
+        return None
+    return int(count)
 
 
 class EmkDataFromFile:
     """Класс для хранения данных под вложенные в ЭМК отчеты."""
     data = None
     title = None
+    table = None
 
 
 class EmkReport:
     """Класс для создания отчетов по ЭМК. Принимает путь для файла."""
-    period = set()
 
     def __init__(self, filepath: str, need_pdo: bool = False):
         self.filepath = filepath
+        # Даты выписки этого отчета; у каждого объекта свои (процессы пула переиспользуются).
+        self.period = set()
         self.need_pdo = need_pdo
         self.kvs_number = None
         self.date_out_from_hospital = None
@@ -153,9 +170,17 @@ class EmkReport:
     def __str__(self):
         return "EmkNewReport"
 
-    def validate_data_from_file(self, works_sheet, for_data: list, title_excel: list):
-        """Валидация данных из файла."""
-        for row in works_sheet.iter_rows(values_only=True):
+    def validate_data_from_file(self, works_sheet, for_data: list, title_excel: list, progress: Progress = None):
+        """Валидация данных из файла.
+
+        Из строк сохраняются только столбцы HEADINGS в их порядке, индексы
+        в атрибутах после заголовка указывают на позиции в этих кортежах.
+        """
+        projection = None
+        rows = works_sheet.iter_rows(values_only=True)
+        if progress is not None:
+            rows = progress.rows(rows, lambda: len(for_data))
+        for row in rows:
             if 'lpu_name' in row:
                 continue
             if validate_column_with_data(row, EXPECTED_MIN_COLUMN_VALUES):
@@ -164,41 +189,48 @@ class EmkReport:
                 continue
             if len(title_excel) == 0:
                 if validate_for_title(TITLE_VALUES, row):
-                    title_excel.extend(row)
-                    self.kvs_number = check_index(title_excel, HEADINGS[0], self)
-                    self.date_out_from_hospital = check_index(title_excel, HEADINGS[1], self)
-                    self.date_out_from_stage = check_index(title_excel, HEADINGS[2], self)
-                    self.age = check_index(title_excel, HEADINGS[3], self)
-                    self.have_polis = check_index(title_excel, HEADINGS[4], self)
-                    self.have_dul = check_index(title_excel, HEADINGS[5], self)
-                    self.have_snils = check_index(title_excel, HEADINGS[6], self)
-                    self.citizenship = check_index(title_excel, HEADINGS[7], self)
-                    self.department = check_index(title_excel, HEADINGS[8], self)
-                    self.is_initial_exam = check_index(title_excel, HEADINGS[9], self)
-                    self.count_diary_needed = check_index(title_excel, HEADINGS[10], self)
-                    self.count_diary = check_index(title_excel, HEADINGS[11], self)
-                    # self.is_epicrisis = check_index(title_excel, HEADINGS[12], self)
-                    self.epicrisis_with_ecp = check_index(title_excel, HEADINGS[12], self)
-                    self.surgical_operation_name = check_index(title_excel, HEADINGS[13], self)
-                    self.surgical_operation_count = check_index(title_excel, HEADINGS[14], self)
-                    self.surgical_operation_protocols = check_index(title_excel, HEADINGS[15], self)
-                    self.is_medicinal_purposes = check_index(title_excel, HEADINGS[16], self)
-                    self.count_lab_research = check_index(title_excel, HEADINGS[17], self)
-                    self.count_lab_research_complete = check_index(title_excel, HEADINGS[18], self)
-                    self.count_inst_research = check_index(title_excel, HEADINGS[19], self)
-                    self.count_inst_research_complete = check_index(title_excel, HEADINGS[20], self)
-                    self.count_cons = check_index(title_excel, HEADINGS[21], self)
-                    self.count_cons_complete = check_index(title_excel, HEADINGS[22], self)
-                    self.count_needed_rean = check_index(title_excel, HEADINGS[23], self)
-                    self.count_input_rean = check_index(title_excel, HEADINGS[24], self)
+                    columns = ColumnMap(row)
+                    self.kvs_number = columns.index(HEADINGS[0], self)
+                    self.date_out_from_hospital = columns.index(HEADINGS[1], self)
+                    self.date_out_from_stage = columns.index(HEADINGS[2], self)
+                    self.age = columns.index(HEADINGS[3], self)
+                    self.have_polis = columns.index(HEADINGS[4], self)
+                    self.have_dul = columns.index(HEADINGS[5], self)
+                    self.have_snils = columns.index(HEADINGS[6], self)
+                    self.citizenship = columns.index(HEADINGS[7], self)
+                    self.department = columns.index(HEADINGS[8], self)
+                    self.is_initial_exam = columns.index(HEADINGS[9], self)
+                    self.count_diary_needed = columns.index(HEADINGS[10], self)
+                    self.count_diary = columns.index(HEADINGS[11], self)
+                    # self.is_epicrisis = columns.index(HEADINGS[12], self)
+                    self.epicrisis_with_ecp = columns.index(HEADINGS[12], self)
+                    self.surgical_operation_name = columns.index(HEADINGS[13], self)
+                    self.surgical_operation_count = columns.index(HEADINGS[14], self)
+                    self.surgical_operation_protocols = columns.index(HEADINGS[15], self)
+                    self.is_medicinal_purposes = columns.index(HEADINGS[16], self)
+                    self.count_lab_research = columns.index(HEADINGS[17], self)
+                    self.count_lab_research_complete = columns.index(HEADINGS[18], self)
+                    self.count_inst_research = columns.index(HEADINGS[19], self)
+                    self.count_inst_research_complete = columns.index(HEADINGS[20], self)
+                    self.count_cons = columns.index(HEADINGS[21], self)
+                    self.count_cons_complete = columns.index(HEADINGS[22], self)
+                    self.count_needed_rean = columns.index(HEADINGS[23], self)
+                    self.count_input_rean = columns.index(HEADINGS[24], self)
                     if None in self.__dict__.values():
                         raise ValueError("Отсутвует необходимый столбец. Подробности в файле log_any_error.txt")
+                    projection = itemgetter(*(getattr(self, name) for name in COLUMN_ATTRIBUTES))
+                    title_excel.extend(projection(row))
+                    for position, name in enumerate(COLUMN_ATTRIBUTES):
+                        setattr(self, name, position)
                     continue
+            if projection is None:
+                continue
+            record = projection(row)
             if self.need_pdo:
-                for_data.append(row)
+                for_data.append(record)
                 continue
-            if validate_not_pdo(PDO_NAMES, row[self.department]):
-                for_data.append(row)
+            if validate_not_pdo(PDO_NAMES, record[self.department]):
+                for_data.append(record)
 
         if len(title_excel) == 0:
             log_any_error(f"Заголовки не были найдены! Ни в одной строке не было: \n{TITLE_VALUES}\n")
@@ -207,150 +239,162 @@ class EmkReport:
             log_any_error("Файл с данными пуст!")
             raise ValueError("Файл с данными пуст! Проверьте, что выбрали нужный файл.")
 
-    def open_file_return_data(self) -> list:
-        """Открыли файл и вернули истину и данные, либо ложь и ошибку."""
+    def parse_settings(self) -> tuple:
+        """Все, от чего зависит результат разбора файла. Меняется - кэш не подходит."""
+        return (
+            PARSED_CACHE_VERSION, self.need_pdo, HEADINGS, TITLE_VALUES,
+            PDO_NAMES, EXPECTED_MIN_COLUMN_VALUES)
+
+    def read_rows(self, on_progress: Callable = None) -> Tuple[list, list]:
+        """Проверенные строки и заголовок из файла или кэша разбора.
+
+        Индексы столбцов запоминаются в отчете, общие данные EmkDataFromFile не меняются.
+        """
+        wb = None
         try:
-            wb = openpyxl.load_workbook(self.filepath, read_only=True, data_only=True)
-            ws = wb.active
+            cache = parsed_cache.ParsedCache()
+            with metrics.stage("cache.get") as stage:
+                cached = cache.get(self.filepath, self.parse_settings())
+                stage.rows = None if cached is None else len(cached[0])
+            if cached is not None:
+                data_from_excel, title_excel, columns = cached
+                self.__dict__.update(columns)
+                return data_from_excel, title_excel
+            with metrics.stage("load_workbook"):
+                wb = xlsx_reader.load_workbook(self.filepath)
+                ws = wb.active
 
             data_from_excel = []
             title_excel = []
-            self.validate_data_from_file(ws, data_from_excel, title_excel)
+            progress = tracker(on_progress, [ws])
+            # Заголовок ищется в том же проходе по строкам, что и проверка данных.
+            with metrics.stage("validate_rows") as stage:
+                self.validate_data_from_file(ws, data_from_excel, title_excel, progress)
+                stage.rows = len(data_from_excel)
+            if progress is not None:
+                progress.finish(len(data_from_excel))
+            columns = {
+                name: value for name, value in self.__dict__.items()
+                if name not in ("filepath", "need_pdo")}
+            with metrics.stage("cache.put"):
+                cache.put(self.filepath, self.parse_settings(), (data_from_excel, title_excel, columns))
+            return data_from_excel, title_excel
+        finally:
+            try:
+                if wb is not None:
+                    wb.close()
+            except Exception as e:
+                log_any_error(f"[ERR] Ошибка при закрытии файла. \n{e}")
+
+    @metrics.timed()
+    def open_file_return_data(self, on_progress: Callable = None) -> list:
+        """Открыли файл и вернули истину и данные, либо ложь и ошибку. on_progress - см. progress.Progress."""
+        try:
+            data_from_excel, title_excel = self.read_rows(on_progress)
             EmkDataFromFile()
             EmkDataFromFile.data = data_from_excel
             EmkDataFromFile.title = title_excel
+            with metrics.stage("table", rows=len(data_from_excel)):
+                EmkDataFromFile.table = EmkTable(title_excel, data_from_excel, *self.table_columns())
+            try:
+                self.day_index(EmkDataFromFile.table)
+            except ValueError as e:
+                log_any_error(f"[ERR] Даты выписки не в формате даты, отчет на дату недоступен. \n{e}")
             return data_from_excel
+        except JobCancelled:
+            # Отмена из on_progress - не ошибка файла.
+            raise
         except TypeError as e:
             raise ValidateError(e)
         except Exception as e:
             raise ValidateError(e)
-        finally:
-            try:
-                wb._archive.close()
-            except Exception as e:
-                log_any_error(f"[ERR] Ошибка при закрытии файла. \n{e}")
 
-    def operation_with_data(self, record: list, data_summary: dict) -> list:
-        """Обрабатывает список и наполняет словарь."""
-        temp = [0] * len(HEADINGS)
-        temp[0] = record[self.kvs_number]
-        temp[1] = record[self.date_out_from_hospital]
-        self.period.add(temp[1])
-        temp[2] = record[self.date_out_from_stage]
-        temp[3] = record[self.age]
-        temp[4] = record[self.have_polis]
-        temp[5] = record[self.have_dul]
-        temp[6] = record[self.have_snils]
-        temp[7] = record[self.citizenship]
-        temp[8] = record[self.department]
-        if "Нет" in (temp[4], temp[5], temp[6]):
-            if temp[8] not in data_summary["Не указаны перс.данные"]:
-                data_summary["Не указаны перс.данные"][temp[8]] = {temp[0]: 1}
-            else:
-                if (temp[0] not in data_summary["Не указаны перс.данные"][temp[8]]):
-                    data_summary["Не указаны перс.данные"][temp[8]][temp[0]] = 1
-                else:
-                    data_summary["Не указаны перс.данные"][temp[8]][temp[0]] += 1
-        temp[9] = record[self.is_initial_exam]
-        if temp[9] is None:
-            if temp[8] not in data_summary["Нет первичного осмотра"]:
-                data_summary["Нет первичного осмотра"][temp[8]] = {temp[0]: 1}
-            else:
-                if temp[0] not in data_summary["Нет первичного осмотра"][temp[8]]:
-                    data_summary["Нет первичного осмотра"][temp[8]][temp[0]] = 1
-                else:
-                    data_summary["Нет первичного осмотра"][temp[8]][temp[0]] += 1
-        temp[10] = record[self.count_diary_needed]
-        temp[11] = record[self.count_diary]
-        if temp[11] is None:
-            if temp[8] not in data_summary["Нет оформленных дневниковых записей"]:
-                data_summary["Нет оформленных дневниковых записей"][temp[8]] = {
-                    temp[0]: 1
-                }
-            else:
-                if (
-                    temp[0]
-                    not in data_summary["Нет оформленных дневниковых записей"][
-                        temp[8]
-                    ]
-                ):
-                    data_summary["Нет оформленных дневниковых записей"][temp[8]][
-                        temp[0]
-                    ] = 1
-                else:
-                    data_summary["Нет оформленных дневниковых записей"][temp[8]][
-                        temp[0]
-                    ] += 1
-        # temp[12] = record[self.is_epicrisis]
-        # if temp[12] is None:
-        #     if temp[8] not in data_summary["Нет оформленных эпикризов"]:
-        #         data_summary["Нет оформленных эпикризов"][temp[8]] = {temp[0]: 1}
-        #     else:
-        #         if (
-        #             temp[0]
-        #             not in data_summary["Нет оформленных эпикризов"][temp[8]]
-        #         ):
-        #             data_summary["Нет оформленных эпикризов"][temp[8]][temp[0]] = 1
-        #         else:
-        #             data_summary["Нет оформленных эпикризов"][temp[8]][temp[0]] += 1
-
-        # Далее все заголовки были снижены на 1 после 12.
-        temp[12] = record[self.epicrisis_with_ecp]
-        if temp[12] is None or temp[12].upper() == "нет".upper():
-            if temp[8] not in data_summary["Выписной эпикриз не подписан ЭЦП"]:
-                data_summary["Выписной эпикриз не подписан ЭЦП"][temp[8]] = {
-                    temp[0]: 1
-                }
-            else:
-                if (
-                    temp[0]
-                    not in data_summary["Выписной эпикриз не подписан ЭЦП"][temp[8]]
-                ):
-                    data_summary["Выписной эпикриз не подписан ЭЦП"][temp[8]][
-                        temp[0]
-                    ] = 1
-                else:
-                    data_summary["Выписной эпикриз не подписан ЭЦП"][temp[8]][
-                        temp[0]
-                    ] += 1
-        temp[13] = record[self.surgical_operation_name]
-        temp[14] = record[self.surgical_operation_count]
-        temp[15] = record[self.surgical_operation_protocols]
-        temp[16] = record[self.is_medicinal_purposes]
-        if temp[16] is None:
-            if (
-                temp[8]
-                not in data_summary["Нет назначений лекарственных препаратов"]
-            ):
-                data_summary["Нет назначений лекарственных препаратов"][temp[8]] = {
-                    temp[0]: 1
-                }
-            else:
-                if (
-                    temp[0]
-                    not in data_summary["Нет назначений лекарственных препаратов"][
-                        temp[8]
-                    ]
-                ):
-                    data_summary["Нет назначений лекарственных препаратов"][
-                        temp[8]
-                    ][temp[0]] = 1
-                else:
-                    data_summary["Нет назначений лекарственных препаратов"][
-                        temp[8]
-                    ][temp[0]] += 1
-        temp[17] = record[self.count_lab_research]
-        temp[18] = record[self.count_lab_research_complete]
-        temp[19] = record[self.count_inst_research]
-        temp[20] = record[self.count_inst_research_complete]
-        temp[21] = record[self.count_cons]
-        temp[22] = record[self.count_cons_complete]
-        temp[23] = record[self.count_needed_rean]
-        temp[24] = record[self.count_input_rean]
-        return temp
-
-    def svod_on_sheet(self, sheet, data_summary: dict, lst: list):
-        """Добавляет данные и оформление для листа свода."""
+    def discharge_days(self, on_progress: Callable = None) -> list:
+        """Даты выписки из файла для календаря.
+
+        Не меняет EmkDataFromFile, поэтому безопасна, пока другой поток
+        формирует отчет. Разобранный файл остается в кэше для самого отчета.
+        """
+        try:
+            data_from_excel, _ = self.read_rows(on_progress)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            raise ValidateError(e)
+        days = set()
+        for row in data_from_excel:
+            value = row[self.date_out_from_hospital]
+            if isinstance(value, datetime.datetime):
+                days.add(value.date())
+        return sorted(days)
+
+    def operation_with_data(self, table: EmkTable, rows: list, data_summary: dict) -> list:
+        """Наполняет словарь свода по строкам rows и возвращает их для листа персонально.
+
+        Условия проверяются по кодам категорий столбцов, по строкам проходим
+        только для попавших в свод записей.
+        """
+        self.period.update(table.categories_in(self.date_out_from_hospital, rows))
+        self.fill_summary(table, self.checked_rows(table, rows), data_summary)
+        return self.personal_rows(table, rows)
+
+    def personal_rows(self, table: EmkTable, rows: list) -> list:
+        """Строки rows для листа персонально с приведенными датами и счетчиками.
+
+        Каждое значение столбца приводится один раз для всей таблицы.
+        """
+        columns = []
+        conversions = [(index, date_conversion) for index in PERSONAL_DATE_COLUMNS]
+        conversions.extend((index, count_conversion) for index in PERSONAL_COUNT_COLUMNS)
+        for index, conversion in conversions:
+            try:
+                columns.append((index, table.mapped(index, conversion)))
+            except (TypeError, ValueError) as e:
+                text_err = f'Ошибка в типе значения в столбце "{HEADINGS[index]}": {e}'
+                log_any_error(text_err)
+                raise ValueError(text_err)
+        records = table.records
+        result = []
+        for row in rows:
+            record = list(records[row])
+            for index, values in columns:
+                record[index] = values[row]
+            result.append(record)
+        return result
+
+    def checked_rows(self, table: EmkTable, rows: list = None) -> dict:
+        """Номера строк (из rows или всех), не прошедших каждую проверку свода."""
+        no_personal = sorted(
+            set(table.rows(lambda value: value == "Нет", self.have_polis, rows))
+            | set(table.rows(lambda value: value == "Нет", self.have_dul, rows))
+            | set(table.rows(lambda value: value == "Нет", self.have_snils, rows)))
+        checks = {
+            "Не указаны перс.данные": no_personal,
+            "Нет первичного осмотра": table.rows(
+                lambda value: value is None, self.is_initial_exam, rows),
+            "Нет оформленных дневниковых записей": table.rows(
+                lambda value: value is None, self.count_diary, rows),
+            # "Нет оформленных эпикризов": table.rows(lambda value: value is None, self.is_epicrisis, rows),
+            "Выписной эпикриз не подписан ЭЦП": table.rows(
+                lambda value: value is None or value.upper() == "нет".upper(), self.epicrisis_with_ecp, rows),
+            "Нет назначений лекарственных препаратов": table.rows(
+                lambda value: value is None, self.is_medicinal_purposes, rows),
+        }
+        return checks
+
+    def fill_summary(self, table: EmkTable, checks: dict, data_summary: dict):
+        """Отделение -> номер КВС -> количество по строкам каждой проверки."""
+        records = table.records
+        for name, flagged in checks.items():
+            summary = data_summary[name]
+            for row in flagged:
+                record = records[row]
+                by_kvs = summary.setdefault(record[self.department], {})
+                by_kvs[record[self.kvs_number]] = by_kvs.get(record[self.kvs_number], 0) + 1
+
+    def svod_on_sheet(self, sheet, data_summary: dict, lst: list, period: set = None):
+        """Добавляет данные и оформление для листа свода. period - даты для шапки, по умолчанию self.period."""
+        period = self.period if period is None else period
         for key1, value1 in data_summary.items():
             if len(value1) > 0:
                 lst.append([key1])
@@ -365,152 +409,40 @@ class EmkReport:
                 lst.append(["Итого:", count_all])
                 lst.append(None)
 
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
+        # Задаю ширину столбцев свода
+        width_column_svod = 80
+        sheet.set_widths({letter: width_column_svod for letter in ("A", "C", "E", "G", "I", "K")})
 
-        my_color = Color(rgb="AFEEEE")
-        my_fill = PatternFill(patternType="solid", fgColor=my_color)
         column = 0
         row = 0
-        if len(self.period) > 1:
-            date_min = date_conversion(min(self.period))
-            date_max = date_conversion(max(self.period))
+        if len(period) > 1:
+            date_min = date_conversion(min(period))
+            date_max = date_conversion(max(period))
         else:
-            date_min = date_max = date_conversion(self.period)
+            date_min = date_max = date_conversion(min(period, default=None))
+        # Блоки свода идут столбцами слева направо, поэтому ячейки собираются по координатам.
+        cells = {}
         for r in range(0, len(lst)):
             if lst[r] is None:
                 column += 2
                 row = 0
                 continue
             if len(lst[r]) > 1:
-                sheet.cell(row=row + 1, column=column + 1).value = lst[r][0]
-                sheet.cell(row=row + 1, column=column + 1).border = thin_border
-                sheet.cell(row=row + 1, column=column + 2).value = lst[r][1]
-                sheet.cell(row=row + 1, column=column + 2).border = thin_border
+                cells[(row + 1, column + 1)] = (lst[r][0], styles.BORDERED)
+                cells[(row + 1, column + 2)] = (lst[r][1], styles.BORDERED)
                 row += 1
                 continue
-            sheet.cell(row=row + 1, column=column + 1).value = lst[r][0]
-            sheet.cell(row=row + 1, column=column + 1).border = thin_border
-            sheet.cell(row=row + 1, column=column + 1).font = Font(bold=True)
-            sheet.cell(row=row + 1, column=column + 1).fill = my_fill
-            if len(self.period) > 1:
-                sheet.cell(row=row + 1, column=column + 2).value = f"{date_min}-{date_max}"
-                sheet.cell(row=row + 1, column=column + 2).border = thin_border
+            cells[(row + 1, column + 1)] = (lst[r][0], styles.HEADING)
+            if len(period) > 1:
+                cells[(row + 1, column + 2)] = (f"{date_min}-{date_max}", styles.BORDERED)
             else:
-                sheet.cell(row=row + 1, column=column + 2).value = f"{date_min}"
-                sheet.cell(row=row + 1, column=column + 2).border = thin_border
-            # sheet.merge_cells(
-            #     start_row=1, start_column=column+1, end_row=1, end_column=column+2
-            # )
+                cells[(row + 1, column + 2)] = (f"{date_min}", styles.BORDERED)
             row += 1
-
-        # Задаю ширину столбцев свода
-        width_column_svod = 80
-        sheet.column_dimensions["A"].width = width_column_svod
-        sheet.column_dimensions["C"].width = width_column_svod
-        sheet.column_dimensions["E"].width = width_column_svod
-        sheet.column_dimensions["G"].width = width_column_svod
-        sheet.column_dimensions["I"].width = width_column_svod
-        sheet.column_dimensions["K"].width = width_column_svod
+        sheet.append_grid(cells)
 
     def personal_on_sheet(self, lst: list, sheet):
-        """Для листа персонально."""
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
-
-        # Для высчитывания процента
-        for element in lst:
-            # if element[8] is None:
-            #     element[8] = procent_is_none(element)
-            sheet.append(element)
-        sheet.auto_filter.ref = sheet.dimensions
-
-        red_color = Color(rgb="FF0000")
-        red_fill = PatternFill(patternType="solid", fgColor=red_color)
-        green_color = Color(rgb="32CD32")
-        green_fill = PatternFill(patternType="solid", fgColor=green_color)
-        low_procent = Color(rgb="CD5C5C")
-        # low_fill = PatternFill(patternType="solid", fgColor=low_procent)
-        hign_procent = Color(rgb="F08080")
-        # hign_fill = PatternFill(patternType="solid", fgColor=hign_procent)
-        for r in sheet.iter_rows(max_row=1):
-            for column in r:
-                column.border = thin_border
-                column.alignment = Alignment(
-                    horizontal="center", vertical="center", wrap_text=True
-                )
-        indexes = {value: key for key, value in HEADINGS.items()}
-        for r in sheet.iter_rows(min_row=2):
-            date_out_from_hospital = date_conversion(r[
-                indexes["Дата выписки из стац"]
-                ].value)
-            r[indexes["Дата выписки из стац"]].value = date_out_from_hospital
-            date_out_from_stage = date_conversion(r[
-                indexes["Дата и время выписки из указанного движения"]
-                ].value)
-            r[
-                indexes["Дата и время выписки из указанного движения"]
-                ].value = date_out_from_stage
-
-            department = r[indexes["Отделение"]]
-            initial_exam = r[indexes["Наличие заполненного первичного осмотра  в указанном движении"]]
-            initial_exam.fill = red_fill if initial_exam.value is None else green_fill
-            count_dairy_need = r[indexes["Количество дневниковых записей, которое необходимо было завести в указанном движении"]]
-            count_dairy = r[indexes["Количество оформленных дневниковых записей  в указанном движении"]]
-            check_convert_type(count_dairy.value, int, "count_dairy")
-            check_convert_type(count_dairy_need.value if count_dairy_need.value is not None else 0, int, "count_dairy_need")
-            if int(count_dairy.value) < int(count_dairy_need.value if count_dairy_need.value is not None else 0):
-                count_dairy.fill = red_fill
-            else:
-                count_dairy.fill = green_fill
-            # epi = r[indexes["Наличие оформленного эпикриза в указанном движении"]]
-            epi_ecp = r[indexes["Эпикриз подписан ЭЦП в указанном движении"]]
-            # epi.fill = red_fill if epi.value is None else green_fill
-            epi_ecp.fill = red_fill if epi_ecp.value in (None, "Нет") else green_fill
-            have_polis = r[indexes["Наличие ПОЛИСА"]]
-            have_dul = r[indexes["Наличие ДУЛ"]]
-            have_snils = r[indexes["Наличие СНИЛС"]]
-            have_polis.fill = red_fill if have_polis.value == "Нет" else green_fill
-            have_dul.fill = red_fill if have_dul.value == "Нет" else green_fill
-            have_snils.fill = red_fill if have_snils.value == "Нет" else green_fill
-            count_operation = r[indexes["Хир активность (количество)"]]
-            count_input_operation = r[indexes["Хир активность (протоколы)"]]
-            check_convert_type(count_input_operation.value, int, "count_input_operation")
-            check_convert_type(count_operation.value, int, "count_operation")
-            if int(count_input_operation.value) < int(count_operation.value):
-                count_input_operation.fill = red_fill
-            else:
-                count_input_operation.fill = green_fill
-            count_consultation = r[indexes['Количество оформленных направлений на консультативные услуги в указанном движении']]
-            count_input_consultation = r[indexes['Количество оформленных  консультативных услуг в указанном движении']]
-            check_convert_type(count_consultation.value, int, "count_consultation")
-            check_convert_type(count_input_consultation.value, int, "count_input_consultation")
-            if int(count_input_consultation.value) < int(count_consultation.value):
-                count_input_consultation.fill = red_fill
-            count_reanim = r[indexes["Количество необходимых реанимационных дневников в указанном движении"]]
-            count_input_reanim = r[indexes["Количество оформленных реанимационных дневников в указанном движении"]]
-            check_convert_type(count_input_reanim.value, int, "count_input_reanim")
-            check_convert_type(count_reanim.value, int, "count_reanim")
-            if int(count_input_reanim.value) < int(count_reanim.value):
-                count_input_reanim.fill = red_fill
-            else:
-                count_input_reanim.fill = green_fill
-            for cell in r:
-                cell.border = thin_border
-            department.alignment = Alignment(wrap_text=True)
-
-        sheet.column_dimensions["A"].width = 15
-        sheet.column_dimensions["B"].width = 15
-        sheet.column_dimensions["C"].width = 15
-        sheet.column_dimensions["I"].width = 30
+        """Для листа персонально. Строки уже приведены (personal_rows), каждая пишется один раз со своим оформлением."""
+        widths = {"A": 15, "B": 15, "C": 15, "I": 30}
         columns_for_dimensions = [
             "J",
             "K",
@@ -532,13 +464,124 @@ class EmkReport:
             "AA",
         ]
         for letter in columns_for_dimensions:
-            sheet.column_dimensions[letter].width = 18
+            widths[letter] = 18
+        sheet.set_widths(widths)
 
+        indexes = {value: key for key, value in HEADINGS.items()}
+        department = indexes["Отделение"]
+        initial_exam = indexes["Наличие заполненного первичного осмотра  в указанном движении"]
+        count_dairy_need = indexes["Количество дневниковых записей, которое необходимо было завести в указанном движении"]
+        count_dairy = indexes["Количество оформленных дневниковых записей  в указанном движении"]
+        epi_ecp = indexes["Эпикриз подписан ЭЦП в указанном движении"]
+        have_polis = indexes["Наличие ПОЛИСА"]
+        have_dul = indexes["Наличие ДУЛ"]
+        have_snils = indexes["Наличие СНИЛС"]
+        count_operation = indexes["Хир активность (количество)"]
+        count_input_operation = indexes["Хир активность (протоколы)"]
+        count_consultation = indexes['Количество оформленных направлений на консультативные услуги в указанном движении']
+        count_input_consultation = indexes['Количество оформленных  консультативных услуг в указанном движении']
+        count_reanim = indexes["Количество необходимых реанимационных дневников в указанном движении"]
+        count_input_reanim = indexes["Количество оформленных реанимационных дневников в указанном движении"]
+
+        if lst:
+            sheet.append(lst[0], styles.HEADER_PLAIN)
+        conditional = sheet.conditional_formatting
+        column_styles = [styles.BORDERED] * len(lst[0]) if lst else []
+        if lst:
+            column_styles[department] = styles.WRAPPED
+        for values in lst[1:]:
+            if conditional:
+                sheet.append(values, column_styles)
+                continue
+            row_styles = list(column_styles)
+            row_styles[initial_exam] = styles.flag(values[initial_exam] is not None)
+            row_styles[count_dairy] = styles.flag((values[count_dairy] or 0) >= (values[count_dairy_need] or 0))
+            # row_styles[is_epicrisis] = styles.flag(values[is_epicrisis] is not None)
+            row_styles[epi_ecp] = styles.flag(values[epi_ecp] not in (None, "Нет"))
+            row_styles[have_polis] = styles.flag(values[have_polis] != "Нет")
+            row_styles[have_dul] = styles.flag(values[have_dul] != "Нет")
+            row_styles[have_snils] = styles.flag(values[have_snils] != "Нет")
+            row_styles[count_input_operation] = styles.flag(
+                (values[count_input_operation] or 0) >= (values[count_operation] or 0))
+            if (values[count_input_consultation] or 0) < (values[count_consultation] or 0):
+                row_styles[count_input_consultation] = styles.RED_FLAG
+            row_styles[count_input_reanim] = styles.flag(
+                (values[count_input_reanim] or 0) >= (values[count_reanim] or 0))
+            sheet.append(values, row_styles)
+        if conditional:
+            # Те же проверки, что и выше, правилами на столбец. "--" переводит число-текст и пустую ячейку в число.
+            styles.flag_rules(sheet, initial_exam, '{0}=""')
+            styles.flag_rules(sheet, count_dairy, "--{0}<--{1}", count_dairy_need)
+            styles.flag_rules(sheet, epi_ecp, 'OR({0}="",{0}="Нет")')
+            for column in (have_polis, have_dul, have_snils):
+                styles.flag_rules(sheet, column, '{0}="Нет"')
+            styles.flag_rules(sheet, count_input_operation, "--{0}<--{1}", count_operation)
+            sheet.add_rule(count_input_consultation, "--{0}<--{1}", styles.RED_RULE, count_consultation)
+            styles.flag_rules(sheet, count_input_reanim, "--{0}<--{1}", count_reanim)
+        sheet.auto_filter()
+
+    def table_for(self, data: list) -> EmkTable:
+        """Столбцовая таблица для строк из файла."""
+        if data is EmkDataFromFile.data and EmkDataFromFile.table is not None:
+            return EmkDataFromFile.table
+        return EmkTable(HEADINGS.values(), data, *self.table_columns())
+
+    def day_index(self, table: EmkTable) -> dict:
+        """Дата выписки в виде "дд.мм.гггг" -> номера строк. Строится один раз на таблицу."""
+        return table.index_by(self.date_out_from_hospital, date_conversion)
+
+    def available_days(self) -> list:
+        """Даты выписки, которые есть в загруженном файле."""
+        return sorted(
+            datetime.datetime.strptime(day, "%d.%m.%Y").date()
+            for day in self.day_index(self.table_for(EmkDataFromFile.data)) if day is not None)
+
+    def table_columns(self) -> Tuple[tuple, tuple]:
+        """Столбцы свода (категории) и счетчики индикаторов, собираемые за один проход."""
+        categorical = (
+            self.date_out_from_hospital,
+            self.department,
+            self.have_polis,
+            self.have_dul,
+            self.have_snils,
+            self.is_initial_exam,
+            self.count_diary,
+            self.epicrisis_with_ecp,
+            self.is_medicinal_purposes,
+        )
+        numeric = (
+            self.count_lab_research,
+            self.count_lab_research_complete,
+            self.count_inst_research,
+            self.count_inst_research_complete,
+            self.count_cons,
+            self.count_cons_complete,
+            self.count_needed_rean,
+            self.count_input_rean,
+        )
+        return categorical, numeric
+
+    @metrics.timed()
     def processing_report(
         self,
         data: list,
         selected_day: str = None) -> Tuple[list, list, list, list]:
         """Обрабатывает все или конкретную дату."""
+        data_summary_kc, data_summary_dc, data_personal_kc, data_personal_dc = self.empty_report()
+        table = self.table_for(data)
+        if selected_day is None:
+            rows = table.rows()
+        else:
+            rows = self.day_index(table).get(selected_day, [])
+        rows_dc = table.rows(is_day_stay, self.department, rows)
+        day_stay = set(rows_dc)
+        rows_kc = [row for row in rows if row not in day_stay]
+        data_personal_dc.extend(self.operation_with_data(table, rows_dc, data_summary_dc))
+        data_personal_kc.extend(self.operation_with_data(table, rows_kc, data_summary_kc))
+        return (data_summary_kc, data_summary_dc, data_personal_kc, data_personal_dc)
+
+    def empty_report(self) -> Tuple[dict, dict, list, list]:
+        """Пустые своды и списки КС и ДС с заголовком."""
         data_summary_kc = {
             "Не указаны перс.данные": {},
             "Нет первичного осмотра": {},
@@ -554,58 +597,100 @@ class EmkReport:
             [element for element in HEADINGS.values()],
         ]
         data_personal_dc = deepcopy(data_personal_kc)
+        return data_summary_kc, data_summary_dc, data_personal_kc, data_personal_dc
 
-        if selected_day is None:
-            for record in data:
-                if (
-                    "ДС" in record[self.department]
-                    or "дневн" in record[self.department].lower()
-                    or "дн.стац." in record[self.department].lower()
-                    or "дн. стац." in record[self.department].lower()
-                ):
-                    temp = self.operation_with_data(record, data_summary_dc)
-                    data_personal_dc.append(temp)
-                    continue
-                temp = self.operation_with_data(record, data_summary_kc)
-                data_personal_kc.append(temp)
-        else:
-            for record in data:
-                if date_conversion(record[self.date_out_from_hospital]) != selected_day:
-                    continue
-                if (
-                    "ДС" in record[self.department]
-                    or "дневн" in record[self.department].lower()
-                    or "дн.стац." in record[self.department].lower()
-                    or "дн. стац." in record[self.department].lower()
-                ):
-                    temp = self.operation_with_data(record, data_summary_dc)
-                    data_personal_dc.append(temp)
+    @metrics.timed()
+    def processing_by_days(self, data: list) -> dict:
+        """Своды и списки по каждой дате выписки по порядку дат: "дд.мм.гггг" -> то же, что processing_report на эту дату.
+
+        Строки делятся по датам индексом дат, проверки свода и деление на КС/ДС
+        выполняются один раз для всех строк.
+        """
+        table = self.table_for(data)
+        records = table.records
+        day_index = self.day_index(table)
+        day_of_row = [None] * len(table)
+        days = {}
+        for day in sorted(filter(None, day_index), key=lambda day: datetime.datetime.strptime(day, "%d.%m.%Y")):
+            days[day] = self.empty_report()
+            for row in day_index[day]:
+                day_of_row[row] = days[day]
+        day_stay = set(table.rows(is_day_stay, self.department))
+        for name, flagged in self.checked_rows(table).items():
+            for row in flagged:
+                report = day_of_row[row]
+                if report is None:
                     continue
-                temp = self.operation_with_data(record, data_summary_kc)
-                data_personal_kc.append(temp)
-        return (data_summary_kc, data_summary_dc, data_personal_kc, data_personal_dc)
+                record = records[row]
+                by_kvs = report[1 if row in day_stay else 0][name].setdefault(record[self.department], {})
+                by_kvs[record[self.kvs_number]] = by_kvs.get(record[self.kvs_number], 0) + 1
+        for day, (_, _, data_personal_kc, data_personal_dc) in days.items():
+            rows = day_index[day]
+            self.period.update(table.categories_in(self.date_out_from_hospital, rows))
+            data_personal_dc.extend(self.personal_rows(table, [row for row in rows if row in day_stay]))
+            data_personal_kc.extend(self.personal_rows(table, [row for row in rows if row not in day_stay]))
+        return days
+
+    def fill_workbook(self, wb: ReportBook, datas: tuple, period: set = None, suffix: str = ""):
+        """Листы свода и наполнения КС и ДС. suffix добавляется к названиям листов."""
+        data_summary_kc, data_summary_dc, data_personal_kc, data_personal_dc = datas
+        svod_kc = []
+        self.svod_on_sheet(wb.create_sheet(f"Свод{suffix}"), data_summary_kc, svod_kc, period)
+        self.personal_on_sheet(data_personal_kc, wb.create_sheet(f"Наполнение КВС{suffix}"))
+        svod_dc = []
+        self.svod_on_sheet(wb.create_sheet(f"Свод ДС{suffix}"), data_summary_dc, svod_dc, period)
+        self.personal_on_sheet(data_personal_dc, wb.create_sheet(f"Наполнение КВС ДС{suffix}"))
 
-    def save_files(self, data_summary_kc, data_summary_dc, data_personal_kc, data_personal_dc):
+    @metrics.timed()
+    def save_files(
+        self,
+        data_summary_kc,
+        data_summary_dc,
+        data_personal_kc,
+        data_personal_dc,
+        period: set = None,
+        file_name: str = None):
         """Функция для сохранения файлов."""
-        wb = Workbook()
-        wb.create_sheet("Наполнение КВС")
-        wb.create_sheet("Свод ДС")
-        wb.create_sheet("Наполнение КВС ДС")
+        wb = ReportBook()
+        self.fill_workbook(wb, (data_summary_kc, data_summary_dc, data_personal_kc, data_personal_dc), period)
+        wb.save(file_name or f"Свод на {now()}.xlsx")
 
-        sheet_svod_kc = wb.active
-        sheet_svod_kc.title = "Свод"
-        svod_kc = []
-        self.svod_on_sheet(sheet_svod_kc, data_summary_kc, svod_kc)
-        sheet_svod_dc = wb["Свод ДС"]
-        svod_dc = []
-        self.svod_on_sheet(sheet_svod_dc, data_summary_dc, svod_dc)
+    def day_periods(self, days: dict) -> dict:
+        """Дата выписки для шапки свода каждого дня."""
+        table = self.table_for(EmkDataFromFile.data)
+        day_index = self.day_index(table)
+        return {day: {min(table.categories_in(self.date_out_from_hospital, day_index[day]))} for day in days}
 
-        sheet_personal_kc = wb["Наполнение КВС"]
-        self.personal_on_sheet(data_personal_kc, sheet_personal_kc)
-        sheet_personal_dc = wb["Наполнение КВС ДС"]
-        self.personal_on_sheet(data_personal_dc, sheet_personal_dc)
+    @metrics.timed()
+    def save_days(self, days: dict, separate_files: bool = False, workers: int = None) -> list:
+        """Сохраняет своды по дням: одна книга с листами на каждый день или книга на день.
 
-        wb.save(f"Свод на {now()}.xlsx")
+        Книги на день пишутся параллельно в отдельных процессах. Возвращает имена файлов.
+        """
+        periods = self.day_periods(days)
+        stamp = now()
+        if not separate_files:
+            wb = ReportBook()
+            for day, datas in days.items():
+                self.fill_workbook(wb, datas, periods[day], f" {day}")
+            file_name = f"Свод по дням на {stamp}.xlsx"
+            wb.save(file_name)
+            return [file_name]
+        tasks = [
+            (self, datas, periods[day], f"Свод за {day} на {stamp}.xlsx", report_writer.CONDITIONAL_FORMATTING)
+            for day, datas in days.items()]
+        workers = min(parallel_sheets.WORKERS if workers is None else workers, len(tasks))
+        if workers < 2:
+            return [save_day_file(*task) for task in tasks]
+        return parallel_sheets.map_tasks(save_day_file, tasks, workers)
+
+
+def save_day_file(
+    report: EmkReport, datas: tuple, period: set, file_name: str, conditional_formatting: bool = False) -> str:
+    """Сохраняет свод одного дня. Вызывается в отдельном процессе."""
+    report_writer.CONDITIONAL_FORMATTING = conditional_formatting
+    report.save_files(*datas, period=period, file_name=file_name)
+    return file_name
 
 
 class CheckIdentificator:
@@ -641,30 +726,26 @@ class CheckIdentificator:
     def validate_date(self):
         """Присваиваем индексы и прочее."""
         EmkDataFromFile()
-        title = EmkDataFromFile.title
-        self.date_out = check_index(title, HEADINGS[1], self)
-        self.department = check_index(title, HEADINGS[8], self)
-        self.indicator_index = check_index(title, self.indicator, self)
-        self.check_indicator_index = check_index(title, self.check_indicator, self)
+        columns = ColumnMap(EmkDataFromFile.title)
+        self.date_out = columns.index(HEADINGS[1], self)
+        self.department = columns.index(HEADINGS[8], self)
+        self.indicator_index = columns.index(self.indicator, self)
+        self.check_indicator_index = columns.index(self.check_indicator, self)
 
     def processing(self):
         """Обработка данных и формирование листов с индикатором."""
-        self.validate_date()
-        researches = {}
-        data = EmkDataFromFile.data
+        return IndicatorAggregator([self]).processing()[0]
+
+    def summary(self, departments: list, mark_direction: list, mark_complete_direction: list) -> dict:
+        """Собирает таблицу индикатора из сумм по отделениям."""
         COLUMNS = {
             "mark_direction": 0,
             "mark_complete_direction": 1,
             "procent_direction": 2,
         }
-        for row in data:
-            if row[self.department] not in researches:
-                researches[row[self.department]] = [0] * len(COLUMNS)
-            self.period.add(row[self.date_out])
-            if row[self.indicator_index] != 0:
-                researches[row[self.department]][COLUMNS["mark_direction"]] += row[self.indicator_index]
-            if row[self.check_indicator_index] != 0:
-                researches[row[self.department]][COLUMNS["mark_complete_direction"]] += row[self.check_indicator_index]
+        researches = {
+            department: [mark, complete, 0]
+            for department, mark, complete in zip(departments, mark_direction, mark_complete_direction)}
 
         results = [0] * len(COLUMNS)
         for key in researches:
@@ -693,53 +774,25 @@ class CheckIdentificator:
 
     def data_in_sheet(self, sheet, header: list, title: list, lst: list):
         """Добавляет данные на лист."""
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
-
-        sheet.append(header)
-        sheet.append(title)
+        sheet.set_widths({"A": 100, "B": 15, "C": 15, "D": 15})
+        count_columns = max(len(row) for row in [header, title] + lst)
+        for row in (header, title):
+            sheet.append(list(row) + [None] * (count_columns - len(row)), styles.HEADER_FILLED)
         for row in lst:
-            sheet.append(row)
-
-        sheet.auto_filter.ref = "A2:D2"
-        sheet.merge_cells(start_row=1, start_column=1, end_row=1, end_column=4)
-
-        my_color = Color(rgb="AFEEEE")
-        my_fill = PatternFill(patternType="solid", fgColor=my_color)
-        for r in sheet.iter_rows(max_row=2):
-            for column in r:
-                column.border = thin_border
-                column.fill = my_fill
-                column.alignment = Alignment(
-                    horizontal="center", vertical="center", wrap_text=True
-                )
-
-        red_color = Color(rgb="FF0000")
-        red_fill = PatternFill(patternType="solid", fgColor=red_color)
-        green_color = Color(rgb="32CD32")
-        green_fill = PatternFill(patternType="solid", fgColor=green_color)
-        for r in sheet.iter_rows(min_row=3):
-            for column in range(len(r)):
-                r[column].border = thin_border
-                r[column].alignment = Alignment(horizontal="center", vertical="center")
-                if column == 1 or column == 2:
-                    if r[column].value == 0:
-                        r[column].value = None
-                if column == 3:
-                    r[column].fill = (
-                        red_fill if float(r[column].value) < 0.90 else green_fill
-                    )
-                    r[column].number_format = "0%"
-
-        sheet.column_dimensions["A"].width = 100
-        columns_for_dimensions = ["B", "C", "D"]
-        for letter in columns_for_dimensions:
-            sheet.column_dimensions[letter].width = 15
-
+            values = list(row)
+            for column in (1, 2):
+                if values[column] == 0:
+                    values[column] = None
+            row_styles = [styles.CENTERED] * len(values)
+            row_styles[3] = styles.PERCENT if sheet.conditional_formatting else styles.percent(values[3], 0.90)
+            sheet.append(values, row_styles)
+        if sheet.conditional_formatting:
+            styles.percent_rules(sheet, 3, 0.90, first_row=3)
+
+        sheet.auto_filter("A2:D2")
+        sheet.merge("A1:D1")
+
+    @metrics.timed()
     def save_file(
         self,
         data: dict,
@@ -757,15 +810,42 @@ class CheckIdentificator:
         for key, value in data.items():
             to_excel.append([key] + value)
         
-        wb_indicator = Workbook()
-        sheet_indicator = wb_indicator.active
-        sheet_indicator.title = name_sheet
+        wb_indicator = ReportBook()
+        sheet_indicator = wb_indicator.create_sheet(name_sheet)
         header_indicator = [f"{header_sheet} с {date_min} по {dete_max}"]
         title_indicator = self.title_indicator()
         self.data_in_sheet(sheet_indicator, header_indicator, title_indicator, to_excel)
         wb_indicator.save(f"{file_name} на {now()}.xlsx")
 
 
+class IndicatorAggregator:
+    """Считает несколько индикаторов (пары indicator, check_indicator) за один проход.
+
+    Столбцы индикаторов собираются вместе со столбцами свода при загрузке файла,
+    а суммы по отделениям всех пар считаются одной групповой редукцией.
+    """
+    def __init__(self, identificators: list) -> None:
+        self.identificators = list(identificators)
+
+    @metrics.timed()
+    def processing(self) -> list:
+        """Возвращает таблицы индикаторов в порядке переданных объектов."""
+        table = EmkDataFromFile.table
+        indexes = []
+        for identificator in self.identificators:
+            identificator.validate_date()
+            indexes.extend((identificator.indicator_index, identificator.check_indicator_index))
+        first = self.identificators[0]
+        departments = table.categorical(first.department).categories
+        period = table.categorical(first.date_out).categories
+        sums = table.group_sums(indexes, first.department)
+        results = []
+        for number, identificator in enumerate(self.identificators):
+            identificator.period.update(period)
+            results.append(identificator.summary(departments, sums[2 * number], sums[2 * number + 1]))
+        return results
+
+
 class LisIdentificator(CheckIdentificator):
     """Обрабатывает и сохраняет отчет по ЛИС."""
     def __init__(self, indicator: str = None, check_indicator: str = None) -> None:
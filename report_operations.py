@@ -1,17 +1,21 @@
 import datetime
 import os
 import sys
-from typing import Optional, Tuple, Union
+from typing import Callable, Optional, Tuple, Union
 
-import openpyxl
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Color, Font, NamedStyle, PatternFill
-from openpyxl.styles.borders import Border, Side
 
 from validators import (
     validate_column_with_data,
     validate_for_title,
     validate_numbers)
+from error_log import log_any_error
+from columns import ColumnMap
+import metrics
+import parallel_sheets
+from progress import Progress, tracker
+import report_styles as styles
+from report_writer import ReportBook
+import xlsx_reader
 
 if getattr(sys, "frozen", False):
     BASE_DIR = os.path.dirname(sys.executable)
@@ -33,37 +37,44 @@ HEADINGS = {
     7: "Количество\nопераций",
     8: "Наименова-ние операции",
 }
+TITLE = (
+    "Номер карты",
+    "Фамилия",
+    "Профильное отделение",
+    "Дата поступления",
+    "Дата проведения операции",
+    "Время начала операции",
+    "Тип операции плановая/экстренная",
+    "Код операции",
+    "Наименование операции",
+    "Наличие предоперационного эпикриза",
+    "Наличие протокола операции",
+    "Осложнения",
+    "ФИО хирурга",
+    "Количество операций",
+)
 
 def now():
     return datetime.datetime.now().strftime("%d.%m %H_%M_%S")
 
 
-def log_any_error(any_text):
-    """Функция для записи ошибок в файл."""
-    log = open(rf"{BASE_DIR}\log_any_error.txt", "a+")
-    text = str(any_text)
-    print(f"[{now()}] {text}", file=log)
-    log.close()
-
-
-def check_index(lst: list, column_name: str, class_name: str = None):
-    """Получает название столбца и возвращает индекс."""
+def parse_sheet(filepath: str, sheet_name: str, only_a16: bool) -> list:
+    """Разбор одного листа в отдельном процессе. Возвращает строки без заголовка."""
+    data = [TITLE]
+    wb = xlsx_reader.load_workbook(filepath)
     try:
-        upper_list = [element.upper() if isinstance(element, str) else element for element in lst]
-        index_el = upper_list.index(column_name.upper())
-        return index_el
-    except ValueError:
-        if class_name:
-            log_any_error(f'Не найден столбец "{column_name}" в классе {class_name}')
-            return
-        log_any_error(f'Не найден столбец "{column_name}"')
+        OperationReport(filepath).validate_data_from_file(wb[sheet_name], data, only_a16)
+    finally:
+        wb.close()
+    return data[1:]
 
 
 class OperationReport:
     """Класс для создания отчетов по операия. Принимает путь для файла."""
 
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, workers: int = None):
         self.filepath = filepath
+        self.workers = parallel_sheets.WORKERS if workers is None else workers
         self.kvs_number = None
         self.last_name = None
         self.department = None
@@ -78,37 +89,42 @@ class OperationReport:
     def __str__(self):
         return "OperationReport"
 
-    def validate_data_from_file(self, works_sheet, for_data: list, only_a16: bool = True):
+    def validate_data_from_file(self, works_sheet, for_data: list, only_a16: bool = True, progress: Progress = None):
         """Валидация данных из файла."""
         title_excel_left = []
         title_excel_right = []
-        for row in works_sheet.iter_rows(values_only=True):
+        rows = works_sheet.iter_rows(values_only=True)
+        if progress is not None:
+            rows = progress.rows(rows, lambda: len(for_data) - 1)
+        for row in rows:
             if validate_column_with_data(row, EXPECTED_MIN_COLUMN_VALUES):
                 continue
             if len(title_excel_left) == 0:
                 if validate_for_title(TITLE_VALUES_LEFT, row):
                     title_excel_left.extend(row)
-                    self.kvs_number = check_index(title_excel_left, HEADINGS[0], self)
-                    self.last_name = check_index(title_excel_left, HEADINGS[1], self)
+                    columns = ColumnMap(title_excel_left)
+                    self.kvs_number = columns.index(HEADINGS[0], self)
+                    self.last_name = columns.index(HEADINGS[1], self)
                     continue
                 continue
             if len(title_excel_right) == 0:
                 if validate_for_title(TITLE_VALUES_RIGHT, row):
                     title_excel_right.extend(row)
-                    self.department = check_index(title_excel_right, HEADINGS[2], self)
-                    self.date_host_in = check_index(title_excel_right, HEADINGS[3], self)
-                    self.code_operation = check_index(title_excel_right, HEADINGS[4], self)
-                    self.protocol_operation = check_index(title_excel_right, HEADINGS[5], self)
-                    self.date_operation = check_index(title_excel_right, HEADINGS[6], self)
-                    self.count_operations = check_index(title_excel_right, HEADINGS[7], self)
-                    self.operaion_name = check_index(title_excel_right, HEADINGS[8], self)
+                    columns = ColumnMap(title_excel_right)
+                    self.department = columns.index(HEADINGS[2], self)
+                    self.date_host_in = columns.index(HEADINGS[3], self)
+                    self.code_operation = columns.index(HEADINGS[4], self)
+                    self.protocol_operation = columns.index(HEADINGS[5], self)
+                    self.date_operation = columns.index(HEADINGS[6], self)
+                    self.count_operations = columns.index(HEADINGS[7], self)
+                    self.operaion_name = columns.index(HEADINGS[8], self)
                     self.operation_column = (self.date_operation, self.count_operations)
+                    if None in self.__dict__.values():
+                        raise ValueError("Отсутвует необходимый столбец. Подробности в файле log_any_error.txt")
                     continue
                 continue
             if validate_numbers(row):
                 continue
-            if None in self.__dict__.values():
-                raise ValueError("Отсутвует необходимый столбец. Подробности в файле log_any_error.txt")
             if row[self.code_operation] is not None:
                 if 'вентиляц' in row[self.operaion_name].lower():
                     continue
@@ -145,113 +161,63 @@ class OperationReport:
             log_any_error("Файл с данными пуст!")
             raise ValueError("Файл с данными пуст! Проверьте, что выбрали нужный файл.")
 
-    def open_file_return_data(self, only_a16: bool) -> list:
-        """Открыли файл и вернули истину и данные, либо ложь и ошибку."""
+    @metrics.timed()
+    def open_file_return_data(self, only_a16: bool, on_progress: Callable = None) -> list:
+        """Открыли файл и вернули истину и данные, либо ложь и ошибку. on_progress - см. progress.Progress."""
         try:
-            wb = openpyxl.load_workbook(self.filepath, read_only=True, data_only=True)
+            wb = xlsx_reader.load_workbook(self.filepath)
 
-            data = [
-                (
-                    "Номер карты",
-                    "Фамилия",
-                    "Профильное отделение",
-                    "Дата поступления",
-                    "Дата проведения операции",
-                    "Время начала операции",
-                    "Тип операции плановая/экстренная",
-                    "Код операции",
-                    "Наименование операции",
-                    "Наличие предоперационного эпикриза",
-                    "Наличие протокола операции",
-                    "Осложнения",
-                    "ФИО хирурга",
-                    "Количество операций",
-                ),
-            ]
+            data = [TITLE]
 
             sheets = wb.sheetnames
+            progress = tracker(on_progress, wb.worksheets)
+            workers = parallel_sheets.count_workers(self.filepath, len(sheets), self.workers)
             if len(sheets) == 1:
                 ws = wb.active
-                self.validate_data_from_file(ws, data, only_a16)
+                self.validate_data_from_file(ws, data, only_a16, progress)
+            elif workers > 1:
+                results = parallel_sheets.map_sheets(
+                    parse_sheet, self.filepath, sheets, workers, only_a16)
+                for sheet_data in results:
+                    data.extend(sheet_data)
             else:
                 for sheet in sheets:
                     ws = wb[sheet]
-                    self.validate_data_from_file(ws, data, only_a16)
+                    self.validate_data_from_file(ws, data, only_a16, progress)
+            if progress is not None:
+                progress.finish(len(data) - 1)
             return data
         except TypeError as e:
             log_any_error(f"[ERR] {e}")
             return TypeError("Не удалось открыть файл!")
         finally:
             try:
-                wb._archive.close()
+                wb.close()
             except Exception as e:
                 log_any_error(f"[ERR] Ошибка при закрытии файла. \n{e}")
 
+    @metrics.timed()
     def processing_and_save(self, data):
         """Функция для сохранения отчета."""
-        wb = Workbook()
-        sheet_operations = wb.active
-        sheet_operations.title = "Операции"
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
-        full_date = NamedStyle(name="full_date", number_format="DD/MM/YYYY HH:MM")
-        only_time = NamedStyle(name="only_time", number_format="HH:MM")
-        red_color = Color(rgb="FF0000")
-
-        for row in range(0, len(data)):
-            for column in range(0, len(data[0])):
-                if row == 0:
-                    sheet_operations.cell(row=row + 1, column=column + 1).value = data[
-                        row
-                    ][column]
-                    sheet_operations.cell(
-                        row=row + 1, column=column + 1
-                    ).border = thin_border
-                    continue
-                if column == 2 or column == 3:
-                    sheet_operations.cell(
-                        row=row + 1, column=column + 1
-                    ).style = full_date
-                if column == 4:
-                    sheet_operations.cell(
-                        row=row + 1, column=column + 1
-                    ).style = only_time
-                sheet_operations.cell(row=row + 1, column=column + 1).value = data[row][
-                    column
-                ]
-                sheet_operations.cell(
-                    row=row + 1, column=column + 1
-                ).border = thin_border
-
-        red_fill = PatternFill(patternType="solid", fgColor=red_color)
-        for r in sheet_operations.iter_rows(min_row=2):
-            if r[data[0].index("Наличие протокола операции")].value == "Нет":
-                r[data[0].index("Наличие протокола операции")].fill = red_fill
-
-        sheet_operations.column_dimensions["A"].width = 15
-        sheet_operations.column_dimensions["B"].width = 20
-        sheet_operations.column_dimensions["C"].width = 50
-        sheet_operations.column_dimensions["D"].width = 20
-        sheet_operations.column_dimensions["E"].width = 20
-        sheet_operations.column_dimensions["F"].width = 14
-        sheet_operations.column_dimensions["G"].width = 15
-        sheet_operations.column_dimensions["H"].width = 23
-        sheet_operations.column_dimensions["I"].width = 23
-        sheet_operations.auto_filter.ref = sheet_operations.dimensions
-
-        for r in sheet_operations.iter_rows(max_row=1):
-            for col in r:
-                col.font = Font(bold=True)
-                col.alignment = Alignment(
-                    vertical="center", horizontal="center", wrap_text=True
-                )
+        wb = ReportBook()
+        sheet_operations = wb.create_sheet("Операции", {
+            "A": 15, "B": 20, "C": 50, "D": 20, "E": 20, "F": 14, "G": 15, "H": 23, "I": 23})
+        count_columns = len(data[0])
+        protocol = data[0].index("Наличие протокола операции")
+        row_styles = [styles.BORDERED] * count_columns
+        for column, style in ((2, styles.FULL_DATE), (3, styles.FULL_DATE), (4, styles.ONLY_TIME)):
+            if column < count_columns:
+                row_styles[column] = style
+        sheet_operations.append(data[0], styles.HEADER)
+        for row in data[1:]:
+            cells_styles = row_styles
+            if row[protocol] == "Нет":
+                cells_styles = list(row_styles)
+                cells_styles[protocol] = styles.RED_FLAG
+            sheet_operations.append(row[:count_columns], cells_styles)
+        sheet_operations.auto_filter()
         wb.save(f"Операции на {now()}.xlsx")
 
-
 def test():
     filepath = rf"{BASE_DIR}/files/операции.xlsx"
 
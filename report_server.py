@@ -0,0 +1,379 @@
+"""Локальный HTTP-сервис отчетов: выгрузка загружается в браузере, отчет скачивается.
+
+Только стандартная библиотека. Отчеты формируются в пуле из WORKERS процессов,
+в очереди ждут не более MAX_QUEUED загрузок, остальные получают 503. Загрузки
+хранятся по хэшу содержимого: повторная загрузка того же файла для того же отчета
+возвращает уже созданную задачу, а разбор ЭМК берется из parsed_cache.
+
+Загрузка пишется на диск частями, не держится в памяти целиком, и удаляется,
+когда отчеты по ней сформированы. Готовые задачи с отчетами хранятся
+JOB_TTL_SECONDS; после перезапуска сервера старые задачи недоступны и их
+папки удаляются.
+
+    python report_server.py [--host 127.0.0.1] [--port 8765] [--workers N]
+
+    POST /jobs?kind=EmkReport&name=файл.xlsx   тело - xlsx, kind можно не указывать
+    GET  /jobs/<id>                            состояние задачи (JSON)
+    GET  /jobs/<id>/files/<номер>              готовый отчет
+"""
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import secrets
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import BinaryIO, Callable, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlsplit
+
+import morning_batch
+from error_log import log_any_error
+
+if getattr(sys, "frozen", False):
+    BASE_DIR = os.path.dirname(sys.executable)
+elif __file__:
+    BASE_DIR = os.path.dirname(__file__)
+
+SERVER_DIR = os.path.join(BASE_DIR, "server")
+HOST = "127.0.0.1"
+PORT = 8765
+# Сколько отчетов формируется одновременно.
+WORKERS = 2
+# Сколько загрузок может ждать свободного процесса.
+MAX_QUEUED = 10
+MAX_UPLOAD_SIZE = 200 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Сколько хранится готовая задача с отчетами, секунд.
+JOB_TTL_SECONDS = 24 * 60 * 60
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+PAGE = """<!DOCTYPE html>
+<html lang="ru"><head><meta charset="utf-8"><title>Утренние отчеты</title></head>
+<body>
+<h3>Утренние отчеты</h3>
+<input type="file" id="file" accept=".xlsx">
+<select id="kind"><option value="">Определить по заголовкам</option>{options}</select>
+<button onclick="send()">Сформировать</button>
+<div id="status"></div>
+<script>
+async function send() {{
+  const file = document.getElementById("file").files[0];
+  if (!file) return;
+  const kind = document.getElementById("kind").value;
+  const status = document.getElementById("status");
+  status.textContent = "Загрузка...";
+  let response = await fetch("/jobs?kind=" + kind + "&name=" + encodeURIComponent(file.name),
+                             {{method: "POST", body: file}});
+  let job = await response.json();
+  while (response.ok && (job.status === "queued" || job.status === "running")) {{
+    status.textContent = job.status === "queued" ? "В очереди..." : "Формируется...";
+    await new Promise(resolve => setTimeout(resolve, 1000));
+    response = await fetch("/jobs/" + job.id);
+    job = await response.json();
+  }}
+  if (!response.ok || job.status === "error") {{
+    status.textContent = "Ошибка: " + job.error;
+    return;
+  }}
+  status.innerHTML = job.files.map((name, number) =>
+    '<div><a href="/jobs/' + job.id + '/files/' + number + '">' + name + '</a></div>').join("");
+}}
+</script>
+</body></html>
+"""
+
+
+class QueueFull(Exception):
+    """Все процессы заняты и очередь заполнена."""
+
+
+class ServerJob:
+    """Загрузка и задача отчета по ней."""
+
+    def __init__(self, job_id: str, kind: str, name: str, filepath: str, out_dir: str):
+        self.id = job_id
+        self.kind = kind
+        self.name = name
+        self.filepath = filepath
+        self.out_dir = out_dir
+        self.future = None
+        # Время окончания отчета (clock сервиса), None - еще формируется.
+        self.finished = None
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return "running" if self.future.running() else "queued"
+        if self.future.exception() is not None or self.future.result().error is not None:
+            return "error"
+        return "done"
+
+    @property
+    def files(self) -> list:
+        if self.status != "done":
+            return []
+        return self.future.result().files
+
+    @property
+    def error(self) -> Optional[str]:
+        if not self.future.done():
+            return None
+        if self.future.exception() is not None:
+            return str(self.future.exception())
+        return self.future.result().error
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "name": self.name,
+            "status": self.status,
+            "files": self.files,
+            "error": self.error,
+        }
+
+
+class ReportService:
+    """Очередь отчетов сервера. Методы вызываются из потоков обработчиков запросов."""
+
+    def __init__(
+        self,
+        directory: str = None,
+        workers: int = None,
+        max_queued: int = None,
+        job_ttl: float = None,
+        clock: Callable[[], float] = time.time):
+        self.directory = directory or SERVER_DIR
+        self.workers = workers or WORKERS
+        self.max_queued = MAX_QUEUED if max_queued is None else max_queued
+        self.job_ttl = JOB_TTL_SECONDS if job_ttl is None else job_ttl
+        self.clock = clock
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.lock = threading.Lock()
+        self.jobs = {}
+        # (хэш загрузки, вид отчета) -> задача, для повторных загрузок.
+        self.by_input = {}
+        # Файл загрузки -> число несформированных отчетов по нему.
+        self.uploads = {}
+        for folder in ("uploads", "jobs"):
+            # Задачи прошлого запуска недоступны: их загрузки и отчеты не нужны.
+            shutil.rmtree(os.path.join(self.directory, folder), ignore_errors=True)
+            os.makedirs(os.path.join(self.directory, folder))
+
+    def store_upload(self, stream: BinaryIO, length: int) -> Tuple[str, str]:
+        """Пишет length байт загрузки во временный файл частями. Возвращает (файл, хэш)."""
+        temp_path = os.path.join(self.directory, "uploads", f"{secrets.token_hex(8)}.tmp")
+        # Хэш содержимого - имя загрузки; считается при записи, без повторного чтения.
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            with open(temp_path, "wb") as file:
+                left = length
+                while left:
+                    chunk = stream.read(min(left, UPLOAD_CHUNK_SIZE))
+                    if not chunk:
+                        raise ValueError("Загрузка прервана.")
+                    digest.update(chunk)
+                    file.write(chunk)
+                    left -= len(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return temp_path, digest.hexdigest()
+
+    def submit(self, stream: BinaryIO, length: int, kind: str = None, name: str = "") -> ServerJob:
+        """Ставит отчет в очередь. ValueError - неизвестный отчет, QueueFull - очередь заполнена."""
+        if kind and kind not in morning_batch.RUNNERS:
+            raise ValueError(f'Неизвестный отчет "{kind}". Возможные: {", ".join(morning_batch.RUNNERS)}')
+        temp_path, digest = self.store_upload(stream, length)
+        try:
+            if not kind:
+                try:
+                    kind = morning_batch.detect_kind(temp_path)
+                except Exception as e:
+                    raise ValueError(f"Файл не читается как xlsx: {e}")
+                if kind is None:
+                    raise ValueError("Не удалось определить отчет по заголовкам, укажите его явно.")
+            return self.start(temp_path, digest, kind, name)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def start(self, temp_path: str, digest: str, kind: str, name: str) -> ServerJob:
+        """Задача по загрузке: уже созданная для того же файла и отчета или новая."""
+        filepath = os.path.join(self.directory, "uploads", f"{digest}.xlsx")
+        key = (os.path.basename(filepath), kind)
+        self.expire()
+        with self.lock:
+            job = self.by_input.get(key)
+            if job is not None and job.status != "error":
+                return job
+            active = sum(not job.future.done() for job in self.jobs.values())
+            if active >= self.workers + self.max_queued:
+                raise QueueFull("Сервер занят, повторите позже.")
+            # Файл может быть открыт отчетом другого вида (в Windows его не заменить),
+            # а содержимое по хэшу то же. Под блокировкой: finish не удалит его раньше.
+            if not self.uploads.get(filepath):
+                os.replace(temp_path, filepath)
+            self.uploads[filepath] = self.uploads.get(filepath, 0) + 1
+            job_id = secrets.token_hex(8)
+            job = ServerJob(job_id, kind, name, filepath, os.path.join(self.directory, "jobs", job_id))
+            os.makedirs(job.out_dir)
+            job.future = self.executor.submit(
+                morning_batch.run_job, kind, filepath, job.out_dir, export_name=os.path.basename(name) or None)
+            self.jobs[job_id] = job
+            self.by_input[key] = job
+        job.future.add_done_callback(lambda _: self.finish(job))
+        return job
+
+    def finish(self, job: ServerJob):
+        """Отчет сформирован: загрузка удаляется, когда по ней сформирован последний отчет."""
+        with self.lock:
+            job.finished = self.clock()
+            self.uploads[job.filepath] -= 1
+            if self.uploads[job.filepath]:
+                return
+            del self.uploads[job.filepath]
+            try:
+                os.remove(job.filepath)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log_any_error(f"[ERR] Сервер отчетов: не удалось удалить загрузку {job.filepath}. \n{e}")
+
+    def expire(self):
+        """Удаляет задачи, готовые дольше job_ttl, вместе с их отчетами."""
+        now = self.clock()
+        with self.lock:
+            expired = [
+                job for job in self.jobs.values()
+                if job.finished is not None and now - job.finished > self.job_ttl]
+            for job in expired:
+                del self.jobs[job.id]
+                self.by_input = {key: known for key, known in self.by_input.items() if known is not job}
+        for job in expired:
+            shutil.rmtree(job.out_dir, ignore_errors=True)
+
+    def get(self, job_id: str) -> Optional[ServerJob]:
+        self.expire()
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ReportHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов; self.server.service - ReportService."""
+
+    def send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, text: str):
+        self.send_json(status, {"status": "error", "error": text})
+
+    def do_GET(self):
+        parts = urlsplit(self.path).path.strip("/").split("/")
+        if parts == [""]:
+            options = "".join(
+                f'<option value="{kind}">{html.escape(kind)}</option>' for kind in morning_batch.RUNNERS)
+            body = PAGE.format(options=options).encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if len(parts) < 2 or parts[0] != "jobs":
+            self.send_error_json(HTTPStatus.NOT_FOUND, "Не найдено.")
+            return
+        job = self.server.service.get(parts[1])
+        if job is None:
+            self.send_error_json(HTTPStatus.NOT_FOUND, "Задача не найдена.")
+        elif len(parts) == 2:
+            self.send_json(HTTPStatus.OK, job.to_dict())
+        elif len(parts) == 4 and parts[2] == "files" and parts[3].isdigit() and int(parts[3]) < len(job.files):
+            self.send_file(job, job.files[int(parts[3])])
+        else:
+            self.send_error_json(HTTPStatus.NOT_FOUND, "Файл не найден.")
+
+    def send_file(self, job: ServerJob, name: str):
+        filepath = os.path.join(job.out_dir, name)
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", XLSX_TYPE)
+        self.send_header("Content-Length", str(os.path.getsize(filepath)))
+        self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(name)}")
+        self.end_headers()
+        with open(filepath, "rb") as file:
+            shutil.copyfileobj(file, self.wfile)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            self.send_error_json(HTTPStatus.NOT_FOUND, "Не найдено.")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            self.send_error_json(HTTPStatus.LENGTH_REQUIRED, "Пустая загрузка.")
+            return
+        if length > MAX_UPLOAD_SIZE:
+            self.send_error_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Слишком большой файл.")
+            return
+        query = parse_qs(url.query)
+        kind = query.get("kind", [""])[0]
+        name = query.get("name", [""])[0]
+        try:
+            job = self.server.service.submit(self.rfile, length, kind, name)
+        except ValueError as e:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, str(e))
+        except QueueFull as e:
+            self.send_error_json(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+        except Exception as e:
+            log_any_error(f"[ERR] Сервер отчетов, загрузка {name}: \n{e}")
+            self.send_error_json(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+        else:
+            self.send_json(HTTPStatus.ACCEPTED, job.to_dict())
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} {format % args}", file=sys.stderr, flush=True)
+
+
+def create_server(host: str = None, port: int = None, service: ReportService = None) -> ThreadingHTTPServer:
+    """HTTP-сервер с очередью отчетов. port=0 - любой свободный порт."""
+    server = ThreadingHTTPServer((host or HOST, PORT if port is None else port), ReportHandler)
+    server.service = service or ReportService()
+    return server
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Локальный сервис утренних отчетов.")
+    parser.add_argument("--host", help=f"адрес, по умолчанию {HOST} (0.0.0.0 - доступ из сети)")
+    parser.add_argument("--port", type=int, help=f"порт, по умолчанию {PORT}")
+    parser.add_argument("--workers", type=int, help=f"отчетов одновременно, по умолчанию {WORKERS}")
+    args = parser.parse_args(argv)
+    server = create_server(args.host, args.port, ReportService(workers=args.workers))
+    host, port = server.server_address[:2]
+    print(f"Сервис отчетов: http://{host}:{port}/", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -2,12 +2,8 @@ import datetime
 from copy import deepcopy
 import os
 import sys
-from typing import Any, Optional, Tuple, Union
+from typing import Any, Callable, Optional, Tuple, Union
 
-import openpyxl
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Color, Font, PatternFill
-from openpyxl.styles.borders import Border, Side
 
 from validators import (
     validate_column_with_data,
@@ -15,6 +11,15 @@ from validators import (
     validate_numbers,
     validate_not_pdo,
     ValidateError)
+from error_log import log_any_error
+from jobs import JobCancelled
+from columns import ColumnMap
+import metrics
+import parallel_sheets
+from progress import Progress, tracker
+import report_styles as styles
+from report_writer import ReportBook
+import xlsx_reader
 
 if getattr(sys, "frozen", False):
     BASE_DIR = os.path.dirname(sys.executable)
@@ -41,26 +46,6 @@ def now() -> str:
     return datetime.datetime.now().strftime("%d.%m %H_%M_%S")
 
 
-def log_any_error(any_text):
-    """Функция для записи ошибок в файл."""
-    with open(rf"{BASE_DIR}\log_any_error.txt", "a+", encoding="UTF8") as log:
-        text = str(any_text)
-        print(f"[{now()}] {text}", file=log)
-
-
-def check_index(lst: list, column_name: str, class_name: str = None):
-    """Получает название столбца и возвращает индекс."""
-    try:
-        upper_list = [element.upper() if isinstance(element, str) else element for element in lst]
-        index_el = upper_list.index(column_name.upper())
-        return index_el
-    except ValueError:
-        if class_name:
-            log_any_error(f'Не найден столбец "{column_name}" в классе {class_name}')
-            return
-        log_any_error(f'Не найден столбец "{column_name}"')
-
-
 def date_conversion(date: Union[str, datetime.datetime]) -> str:
     """Преобразует дату к нужному формату."""
     if isinstance(date, datetime.datetime):
@@ -82,12 +67,26 @@ def check_convert_type(variable: Any, type_variable: Any, name_variable: str):
 
 
 
+def parse_sheet(filepath: str, sheet_name: str) -> Tuple[list, dict]:
+    """Разбор одного листа в отдельном процессе. Возвращает строки и индексы столбцов."""
+    data = []
+    report = ServicesReport(filepath)
+    wb = xlsx_reader.load_workbook(filepath)
+    try:
+        report.validate_data_from_file(wb[sheet_name], data)
+    finally:
+        wb.close()
+    return data, report.columns()
+
+
 class ServicesReport:
     """Класс для создания отчетов по услугам. Принимает путь для файла."""
-    period = set()
 
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, workers: int = None):
         self.filepath = filepath
+        # Даты направлений этого отчета; у каждого объекта свои.
+        self.period = set()
+        self.workers = parallel_sheets.WORKERS if workers is None else workers
         self.department = None
         self.doctor = None
         self.date_direct = None
@@ -101,10 +100,19 @@ class ServicesReport:
     def __str__(self):
         return "ServicesReport"
 
-    def validate_data_from_file(self, works_sheet, lst: list):
+    def columns(self) -> dict:
+        """Индексы найденных столбцов."""
+        return {
+            name: value for name, value in self.__dict__.items()
+            if name not in ("filepath", "workers")}
+
+    def validate_data_from_file(self, works_sheet, lst: list, progress: Progress = None):
         """Валидация данных из файла."""
         title_excel = []
-        for row in works_sheet.iter_rows(values_only=True):
+        rows = works_sheet.iter_rows(values_only=True)
+        if progress is not None:
+            rows = progress.rows(rows, lambda: len(lst))
+        for row in rows:
             if validate_column_with_data(row, EXPECTED_MIN_COLUMN_VALUES):
                 continue
             if validate_numbers(row):
@@ -112,15 +120,16 @@ class ServicesReport:
             if len(title_excel) == 0:
                 if validate_for_title(TITLE_VALUES, row):
                     title_excel.extend(row)
-                    self.department = check_index(title_excel, HEADINGS[0], self)
-                    self.doctor = check_index(title_excel, HEADINGS[1], self)
-                    self.date_direct = check_index(title_excel, HEADINGS[2], self)
-                    self.number_direct = check_index(title_excel, HEADINGS[3], self)
-                    self.code_service = check_index(title_excel, HEADINGS[4], self)
-                    self.name_service = check_index(title_excel, HEADINGS[5], self)
-                    self.fio_patient = check_index(title_excel, HEADINGS[6], self)
-                    self.brthday_patient = check_index(title_excel, HEADINGS[7], self)
-                    self.date_complete_service = check_index(title_excel, HEADINGS[8], self)
+                    columns = ColumnMap(title_excel)
+                    self.department = columns.index(HEADINGS[0], self)
+                    self.doctor = columns.index(HEADINGS[1], self)
+                    self.date_direct = columns.index(HEADINGS[2], self)
+                    self.number_direct = columns.index(HEADINGS[3], self)
+                    self.code_service = columns.index(HEADINGS[4], self)
+                    self.name_service = columns.index(HEADINGS[5], self)
+                    self.fio_patient = columns.index(HEADINGS[6], self)
+                    self.brthday_patient = columns.index(HEADINGS[7], self)
+                    self.date_complete_service = columns.index(HEADINGS[8], self)
                     if None in self.__dict__.values():
                         raise ValueError("Отсутвует необходимый столбец. Подробности в файле log_any_error.txt")
                     continue
@@ -130,10 +139,11 @@ class ServicesReport:
             log_any_error(f"Заголовки не были найдены! Ни в одной строке не было: \n{TITLE_VALUES}\n")
             raise ValueError("В файле отсутствуют заголовки! Подробности в файле log_any_error.txt")
 
-    def open_file_return_data(self) -> Tuple[list, list, dict]:
-        """Открыли файл и вернули истину и данные, либо ложь и ошибку."""
+    @metrics.timed()
+    def open_file_return_data(self, on_progress: Callable = None) -> Tuple[list, list, dict]:
+        """Открыли файл и вернули истину и данные, либо ложь и ошибку. on_progress - см. progress.Progress."""
         try:
-            wb = openpyxl.load_workbook(self.filepath, read_only=True, data_only=True)
+            wb = xlsx_reader.load_workbook(self.filepath)
             ws = wb.active
 
             inst_from_excel = []
@@ -144,13 +154,22 @@ class ServicesReport:
                 'laboratory': {}
             }
             sheets = wb.sheetnames
+            progress = tracker(on_progress, wb.worksheets)
+            workers = parallel_sheets.count_workers(self.filepath, len(sheets), self.workers)
             if len(sheets) == 1:
                 ws = wb.active
-                self.validate_data_from_file(ws, data_from_excel)
+                self.validate_data_from_file(ws, data_from_excel, progress)
+            elif workers > 1:
+                results = parallel_sheets.map_sheets(parse_sheet, self.filepath, sheets, workers)
+                for sheet_data, columns in results:
+                    data_from_excel.extend(sheet_data)
+                    self.__dict__.update(columns)
             else:
                 for sheet in sheets:
                     ws = wb[sheet]
-                    self.validate_data_from_file(ws, data_from_excel)
+                    self.validate_data_from_file(ws, data_from_excel, progress)
+            if progress is not None:
+                progress.finish(len(data_from_excel))
             for row in data_from_excel:
                 if row[self.date_complete_service] is not None:
                     if row[self.code_service][:3].upper() in LIS_SERVICERS:
@@ -222,153 +241,90 @@ class ServicesReport:
             data_for_svod['laboratory']['Итого'][2] = data_for_svod[
                 'laboratory']['Итого'][1] / data_for_svod['laboratory']['Итого'][0]
             return inst_from_excel, lis_from_excel, data_for_svod
+        except JobCancelled:
+            # Отмена из on_progress - не ошибка файла.
+            raise
         except TypeError as err:
             raise ValidateError(err) from err
         except Exception as err:
             raise ValidateError(err) from err
         finally:
             try:
-                wb._archive.close()
+                wb.close()
             except Exception as e:
                 log_any_error(f"[ERR] Ошибка при закрытии файла. \n{e}")
 
     def data_at_sheet_payroll(self, sheet, lst: list):
         """Добавляет данные и оформление для списочного листа."""
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
-
-        red_color = Color(rgb="FF0000")
-        red_fill = PatternFill(patternType="solid", fgColor=red_color)
+        row_styles = [styles.BORDERED] * (len(HEADINGS) - 1) + [styles.RED_FLAG]
         if len(self.period) > 1:
             date_min = date_conversion(min(self.period))
             date_max = date_conversion(max(self.period))
         else:
             date_min = date_max = date_conversion(self.period)
-        
-        sheet.cell(row=1, column=1).value = (
-            "Список пациентов, которым выданы направления на услуги "
-            f"{date_min}-{date_max}"
-        )
-        for c in range(1, len(HEADINGS)+1):
-            sheet.cell(row=2, column=c).value = HEADINGS[c-1]
-            sheet.cell(row=2, column=c).border = thin_border
-            sheet.cell(row=2, column=c).font = Font(bold=True)
-            sheet.cell(row=2, column=c).alignment = Alignment(
-                    horizontal="center", vertical="center", wrap_text=True
-                )
-        for r in range(2, len(lst)+2):
-            for c in range(0, len(HEADINGS)):
-                sheet.cell(row=r + 1, column=c + 1).value = lst[r-2][c]
-                sheet.cell(row=r + 1, column=c + 1).border = thin_border
-                if c == len(HEADINGS)-1:
-                    sheet.cell(row=r + 1, column=c + 1).fill= red_fill
-            # sheet.merge_cells(
-            #     start_row=1, start_column=column+1, end_row=1, end_column=column+2
-            # )
-        sheet.auto_filter.ref = "A2:I2"
 
         # Задаю ширину столбцев свода
-        sheet.column_dimensions["A"].width = 25
-        sheet.column_dimensions["B"].width = 15
-        sheet.column_dimensions["C"].width = 15
-        sheet.column_dimensions["D"].width = 10
-        sheet.column_dimensions["E"].width = 15
-        sheet.column_dimensions["F"].width = 15
-        sheet.column_dimensions["G"].width = 25
-        sheet.column_dimensions["H"].width = 15
-
+        sheet.set_widths({"A": 25, "B": 15, "C": 15, "D": 10, "E": 15, "F": 15, "G": 25, "H": 15})
+        sheet.append([
+            "Список пациентов, которым выданы направления на услуги "
+            f"{date_min}-{date_max}"
+        ])
+        sheet.append([HEADINGS[column] for column in range(len(HEADINGS))], styles.HEADER)
+        for row in lst:
+            sheet.append(row[:len(HEADINGS)], row_styles)
+        sheet.auto_filter("A2:I2")
 
     def data_at_sheet_svod(self, data: dict, sheet, type_service: str):
         """Добавляет данные на лист свода."""
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
-
         if len(self.period) > 1:
             date_min = date_conversion(min(self.period))
             date_max = date_conversion(max(self.period))
         else:
             date_min = date_max = date_conversion(self.period)
 
+        sheet.set_widths({"A": 100, "B": 15, "C": 15, "D": 15})
         sheet.append([
             f"Список пациентов, которым выданы направления на {type_service} услуги "
-            f"{date_min}-{date_max}"
-            ])
+            f"{date_min}-{date_max}",
+            None, None, None,
+            ], styles.HEADER_FILLED)
 
         sheet.append([
             "Подразделение",
             f"Количество оформленных направлений на {type_service} услуги",
             f"Количество выполненных направлений на {type_service} услуги",
             "Процент оформленных направлений на выполненные"
-        ])
+        ], styles.HEADER_FILLED)
         for department, values in data.items():
-            sheet.append([department, values[0], values[1], values[2]])
-
-        sheet.auto_filter.ref = "A2:D2"
-        sheet.merge_cells(start_row=1, start_column=1, end_row=1, end_column=4)
-
-        my_color = Color(rgb="AFEEEE")
-        my_fill = PatternFill(patternType="solid", fgColor=my_color)
-        for r in sheet.iter_rows(max_row=2):
-            for column in r:
-                column.border = thin_border
-                column.fill = my_fill
-                column.alignment = Alignment(
-                    horizontal="center", vertical="center", wrap_text=True
-                )
-
-        red_color = Color(rgb="FF0000")
-        red_fill = PatternFill(patternType="solid", fgColor=red_color)
-        green_color = Color(rgb="32CD32")
-        green_fill = PatternFill(patternType="solid", fgColor=green_color)
-        for r in sheet.iter_rows(min_row=3):
-            for column in range(len(r)):
-                r[column].border = thin_border
-                r[column].alignment = Alignment(horizontal="center", vertical="center")
-                if column == 1 or column == 2:
-                    if r[column].value == 0:
-                        r[column].value = None
-                if column == 3:
-                    r[column].fill = (
-                        red_fill if float(r[column].value) < 0.80 else green_fill
-                    )
-                    r[column].number_format = "0%"
-
-        sheet.column_dimensions["A"].width = 100
-        columns_for_dimensions = ["B", "C", "D"]
-        for letter in columns_for_dimensions:
-            sheet.column_dimensions[letter].width = 15
+            row = [department, None if values[0] == 0 else values[0], None if values[1] == 0 else values[1], values[2]]
+            if sheet.conditional_formatting:
+                sheet.append(row, [styles.CENTERED] * 3 + [styles.PERCENT])
+            else:
+                sheet.append(row, [styles.CENTERED] * 3 + [styles.percent(values[2], 0.80)])
+        if sheet.conditional_formatting:
+            styles.percent_rules(sheet, 3, 0.80, first_row=3)
 
+        sheet.auto_filter("A2:D2")
+        sheet.merge("A1:D1")
 
+    @metrics.timed()
     def save_files(self, data_inst: list, data_lis: list, data_svod: dict):
         """Функция для сохранения списочных файлов."""
-        wb_inst = Workbook()
-        sheet_inst= wb_inst.active
-        sheet_inst.title = "Инструм"
+        wb_inst = ReportBook()
+        sheet_inst = wb_inst.create_sheet("Инструм")
         self.data_at_sheet_payroll(sheet_inst, data_inst)
-        wb_inst.create_sheet("Свод инструм")
-        sheet_isnt_svod = wb_inst["Свод инструм"]
+        sheet_isnt_svod = wb_inst.create_sheet("Свод инструм")
         self.data_at_sheet_svod(data_svod['intrumental'], sheet_isnt_svod, "инструм.")
         wb_inst.save(f"Инструм. услуги на {now()}.xlsx")
 
-        wb_lis = Workbook()
-        sheet_lis= wb_lis.active
-        sheet_lis.title = "ЛИС"
+        wb_lis = ReportBook()
+        sheet_lis = wb_lis.create_sheet("ЛИС")
         self.data_at_sheet_payroll(sheet_lis, data_lis)
-        wb_lis.create_sheet("Свод ЛИС")
-        sheet_lis_svod = wb_lis["Свод ЛИС"]
+        sheet_lis_svod = wb_lis.create_sheet("Свод ЛИС")
         self.data_at_sheet_svod(data_svod['laboratory'], sheet_lis_svod, "лабор.")
         wb_lis.save(f"ЛИС услуги на {now()}.xlsx")
 
 
-
 if __name__ == "__main__":
     def test_1():
         # filepath = rf"{BASE_DIR}/files/Список пациентов, которым выданы направления на услуги.xlsx"
@@ -0,0 +1,72 @@
+"""Общие стили отчетов.
+
+Стили создаются один раз при импорте и используются всеми отчетами.
+Книга (report_writer.ReportBook) регистрирует каждый стиль один раз, дальше
+ячейки ссылаются на его индексы в таблицах стилей.
+"""
+from openpyxl.styles import Alignment, Color, Font, PatternFill
+from openpyxl.styles.borders import Border, Side
+
+from report_writer import Style
+
+THIN_BORDER = Border(
+    left=Side(style="thin"),
+    right=Side(style="thin"),
+    top=Side(style="thin"),
+    bottom=Side(style="thin"),
+)
+RED_FILL = PatternFill(patternType="solid", fgColor=Color(rgb="FF0000"))
+GREEN_FILL = PatternFill(patternType="solid", fgColor=Color(rgb="32CD32"))
+HEADER_FILL = PatternFill(patternType="solid", fgColor=Color(rgb="AFEEEE"))
+CENTER_WRAP = Alignment(horizontal="center", vertical="center", wrap_text=True)
+CENTER = Alignment(horizontal="center", vertical="center")
+# Заливки для правил условного форматирования: в них Excel берет цвет фона (bgColor).
+RED_RULE_FILL = PatternFill(patternType="solid", fgColor=Color(rgb="FF0000"), bgColor=Color(rgb="FF0000"))
+GREEN_RULE_FILL = PatternFill(patternType="solid", fgColor=Color(rgb="32CD32"), bgColor=Color(rgb="32CD32"))
+
+# Ячейка таблицы в рамке.
+BORDERED = Style(border=THIN_BORDER)
+# Заголовок таблицы: жирный, по центру с переносом.
+HEADER = BORDERED + Style(font=Font(bold=True), alignment=CENTER_WRAP)
+# Заголовок списка ЭМК: по центру с переносом, не жирный.
+HEADER_PLAIN = BORDERED + Style(alignment=CENTER_WRAP)
+# Шапка сводов индикаторов и услуг: заливка, по центру с переносом.
+HEADER_FILLED = BORDERED + Style(fill=HEADER_FILL, alignment=CENTER_WRAP)
+# Название блока свода ЭМК.
+HEADING = BORDERED + Style(font=Font(bold=True), fill=HEADER_FILL)
+# Текст с переносом по словам (длинные названия отделений).
+WRAPPED = BORDERED + Style(alignment=Alignment(wrap_text=True))
+CENTERED = BORDERED + Style(alignment=CENTER)
+RED_FLAG = BORDERED + Style(fill=RED_FILL)
+GREEN_OK = BORDERED + Style(fill=GREEN_FILL)
+# Отрицательное число: белым по красному.
+NEGATIVE = RED_FLAG + Style(font=Font(color="FFFFFF"))
+PERCENT = CENTERED + Style(number_format="0%")
+PERCENT_RED = PERCENT + Style(fill=RED_FILL)
+PERCENT_GREEN = PERCENT + Style(fill=GREEN_FILL)
+FULL_DATE = BORDERED + Style(number_format="DD/MM/YYYY HH:MM")
+ONLY_TIME = BORDERED + Style(number_format="HH:MM")
+# Оформление, которое добавляют правила условного форматирования.
+RED_RULE = Style(fill=RED_RULE_FILL)
+GREEN_RULE = Style(fill=GREEN_RULE_FILL)
+
+
+def flag(ok: bool) -> Style:
+    """Зеленая или красная ячейка."""
+    return GREEN_OK if ok else RED_FLAG
+
+
+def percent(value, limit: float) -> Style:
+    """Процент: красный ниже limit, иначе зеленый."""
+    return PERCENT_RED if float(value) < limit else PERCENT_GREEN
+
+
+def flag_rules(sheet, column: int, failed: str, *columns: int, first_row: int = 2):
+    """Правила вместо flag() на весь столбец: красный, если формула failed истинна, иначе зеленый."""
+    sheet.add_rule(column, failed, RED_RULE, *columns, first_row=first_row)
+    sheet.add_rule(column, f"NOT({failed})", GREEN_RULE, *columns, first_row=first_row)
+
+
+def percent_rules(sheet, column: int, limit: float, first_row: int = 2):
+    """Правила вместо percent() на весь столбец."""
+    flag_rules(sheet, column, f"{{0}}<{limit}", first_row=first_row)
@@ -0,0 +1,174 @@
+"""Потоковая запись отчетов в Excel (режим write_only openpyxl).
+
+Каждая строка записывается один раз сразу со значениями и оформлением, без
+повторного прохода по листу. Строки не хранятся в памяти книги, поэтому
+память не растет с размером отчета. Ширина столбцов задается до первой
+строки, автофильтр и объединения ячеек - в любой момент до сохранения.
+
+При CONDITIONAL_FORMATTING цвета проверок задаются правилами условного
+форматирования на столбец, а не оформлением каждой ячейки: файл меньше,
+сохранение быстрее, цвета пересчитываются при правке ячеек в Excel.
+"""
+from typing import Dict, Iterable, Optional, Sequence, Union
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import TIME_FORMATS
+from openpyxl.formatting.rule import Rule
+from openpyxl.styles.differential import DifferentialStyle
+from openpyxl.utils import get_column_letter
+
+import metrics
+
+# Цвета проверок правилами условного форматирования (см. ReportSheet.add_rule).
+CONDITIONAL_FORMATTING = False
+
+
+class Style:
+    """Оформление ячейки. Не указанные части остаются по умолчанию."""
+    __slots__ = ("font", "fill", "border", "alignment", "number_format")
+
+    def __init__(self, font=None, fill=None, border=None, alignment=None, number_format: str = None):
+        self.font = font
+        self.fill = fill
+        self.border = border
+        self.alignment = alignment
+        self.number_format = number_format
+
+    def __add__(self, other: "Style") -> "Style":
+        """Новый стиль: заданные части other заменяют части self."""
+        return Style(*(
+            getattr(self, name) if getattr(other, name) is None else getattr(other, name)
+            for name in self.__slots__))
+
+
+class ReportBook:
+    """Книга отчета в режиме write_only."""
+
+    def __init__(self, conditional_formatting: bool = None):
+        self.workbook = Workbook(write_only=True)
+        if conditional_formatting is None:
+            conditional_formatting = CONDITIONAL_FORMATTING
+        self.conditional_formatting = conditional_formatting
+        # (id(стиль), тип значения-даты) -> (стиль, индексы в таблицах стилей книги).
+        self.style_arrays = {}
+
+    def create_sheet(self, title: str, widths: Dict[str, float] = None) -> "ReportSheet":
+        return ReportSheet(self, self.workbook.create_sheet(title), widths)
+
+    def style_array(self, style: Style, worksheet, time_type: type = None):
+        """Индексы стиля в книге. Регистрируется один раз на объект стиля.
+
+        Для дат и времени без своего формата берется формат openpyxl по умолчанию,
+        как при обычной записи значения в ячейку.
+        """
+        key = (id(style), time_type)
+        known = self.style_arrays.get(key)
+        if known is not None:
+            return known[1]
+        cell = WriteOnlyCell(worksheet)
+        for name in Style.__slots__:
+            value = getattr(style, name)
+            if value is not None:
+                setattr(cell, name, value)
+        if time_type is not None and style.number_format is None:
+            cell.number_format = TIME_FORMATS[time_type]
+        # Массив индексов общий для всех ячеек стиля: ячейки write_only после записи не меняются.
+        self.style_arrays[key] = (style, cell._style)
+        return cell._style
+
+    def save(self, filename: str):
+        with metrics.stage("wb.save"):
+            self.workbook.save(filename)
+
+
+class ReportSheet:
+    """Лист, в который строки дописываются по одной."""
+
+    def __init__(self, book: ReportBook, worksheet, widths: Dict[str, float] = None):
+        self.book = book
+        self.worksheet = worksheet
+        self.max_row = 0
+        self.max_column = 0
+        self.set_widths(widths or {})
+
+    def set_widths(self, widths: Dict[str, float]):
+        """Ширина столбцов по буквам. Только до первой записанной строки."""
+        for letter, width in widths.items():
+            self.worksheet.column_dimensions[letter].width = width
+
+    def cell(self, value, style: Optional[Style] = None):
+        """Ячейка со значением и оформлением. Без стиля возвращается само значение."""
+        if style is None:
+            return value
+        time_type = type(value) if type(value) in TIME_FORMATS else None
+        cell = WriteOnlyCell(self.worksheet, value)
+        cell._style = self.book.style_array(style, self.worksheet, time_type)
+        return cell
+
+    def append(self, values: Sequence, styles: Union[Style, Sequence[Optional[Style]], None] = None):
+        """Дописывает строку. styles - один стиль на всю строку или стиль для каждого столбца."""
+        if styles is None:
+            row = list(values)
+        elif isinstance(styles, Style):
+            row = [self.cell(value, styles) for value in values]
+        else:
+            row = [self.cell(value, style) for value, style in zip(values, styles)]
+        self.worksheet.append(row)
+        self.max_row += 1
+        self.max_column = max(self.max_column, len(row))
+
+    def append_rows(self, rows: Iterable[Sequence], styles: Union[Style, Sequence[Optional[Style]], None] = None):
+        for values in rows:
+            self.append(values, styles)
+
+    def append_grid(self, cells: Dict[tuple, tuple]):
+        """Записывает ячейки {(строка, столбец): (значение, стиль)} (нумерация с 1) построчно."""
+        if not cells:
+            return
+        count_rows = max(row for row, _ in cells)
+        count_columns = max(column for _, column in cells)
+        for row in range(1, count_rows + 1):
+            values = [None] * count_columns
+            styles = [None] * count_columns
+            for column in range(1, count_columns + 1):
+                value, style = cells.get((row, column), (None, None))
+                values[column - 1] = value
+                styles[column - 1] = style
+            self.append(values, styles)
+
+    @property
+    def conditional_formatting(self) -> bool:
+        """Цвета проверок задаются правилами, а не оформлением ячеек."""
+        return self.book.conditional_formatting
+
+    def add_rule(self, column: int, formula: str, style: Style, *columns: int, first_row: int = 2):
+        """Правило условного форматирования на столбец column (с 0) от first_row до последней строки.
+
+        formula пишется для первой ячейки диапазона: {0} заменяется ее адресом,
+        {1}, {2}... - адресами ячеек той же строки в столбцах columns.
+        Вызывается после записи строк.
+        """
+        if self.max_row < first_row:
+            return
+        refs = [f"{get_column_letter(index + 1)}{first_row}" for index in (column,) + columns]
+        letter = get_column_letter(column + 1)
+        rule = Rule(
+            type="expression",
+            formula=[formula.format(*refs)],
+            dxf=DifferentialStyle(font=style.font, fill=style.fill, border=style.border))
+        self.worksheet.conditional_formatting.add(f"{letter}{first_row}:{letter}{self.max_row}", rule)
+
+    @property
+    def dimensions(self) -> str:
+        """Диапазон записанных ячеек, как Worksheet.dimensions."""
+        if not self.max_row or not self.max_column:
+            return "A1:A1"
+        return f"A1:{get_column_letter(self.max_column)}{self.max_row}"
+
+    def auto_filter(self, ref: str = None):
+        """Автофильтр на диапазон ref, по умолчанию на все записанные ячейки."""
+        self.worksheet.auto_filter.ref = ref or self.dimensions
+
+    def merge(self, ref: str):
+        self.worksheet.merged_cells.add(ref)
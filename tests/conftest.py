@@ -0,0 +1,29 @@
+import pytest
+
+import bunk_history
+import metrics
+import parsed_cache
+
+
+@pytest.fixture(autouse=True)
+def history_file(tmp_path, monkeypatch):
+    """История коек каждого теста - во временной папке, а не рядом с программой."""
+    filepath = str(tmp_path / "bunk_history.sqlite3")
+    monkeypatch.setattr(bunk_history, "HISTORY_FILE", filepath)
+    return filepath
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Кэш разобранных выгрузок каждого теста - во временной папке."""
+    directory = str(tmp_path / "cache")
+    monkeypatch.setattr(parsed_cache, "CACHE_DIR", directory)
+    return directory
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(tmp_path, monkeypatch):
+    """Замеры и профили, если тест их включит, - во временной папке."""
+    monkeypatch.setattr(metrics, "METRICS_FILE", str(tmp_path / "metrics.jsonl"))
+    monkeypatch.setattr(metrics, "PROFILE_DIR", str(tmp_path / "profiles"))
+    return tmp_path
@@ -0,0 +1,93 @@
+"""Тесты истории коечного фонда."""
+import datetime
+import os
+
+import openpyxl
+import pytest
+from openpyxl import Workbook
+
+import bunk_history
+import report_bunk_50
+from validators import ValidateError
+
+MONDAY = datetime.date(2024, 5, 20)
+
+
+class TestBunkHistory:
+
+    def test_save_and_period(self, history_file):
+        history = bunk_history.BunkHistory()
+        history.save(MONDAY, [("Хирургия", False, 50, 40, 10), ("Хирургия ДС", True, 10, 2, 8)], "1.xlsx")
+        history.save(MONDAY + datetime.timedelta(days=1), [("Хирургия", False, 50, 55, -5)])
+        # Повторный отчет за день обновляет запись отделения.
+        history.save(MONDAY, [("Хирургия", False, 50, 45, 5)], "2.xlsx")
+
+        snapshots = bunk_history.BunkHistory(history_file).period(MONDAY, MONDAY + datetime.timedelta(days=6))
+        assert snapshots == [
+            bunk_history.Snapshot(MONDAY, "Хирургия", False, 50, 45, 5),
+            bunk_history.Snapshot(MONDAY + datetime.timedelta(days=1), "Хирургия", False, 50, 55, -5),
+            bunk_history.Snapshot(MONDAY, "Хирургия ДС", True, 10, 2, 8),
+        ]
+        assert len(history.last_weeks(1, MONDAY)) == 2
+        assert history.last_weeks(1, MONDAY - datetime.timedelta(days=1)) == []
+
+    def test_snapshot_date(self):
+        stamp = int(datetime.datetime(2024, 5, 20, 9).timestamp())
+        assert bunk_history.snapshot_date(f"/выгрузки/{stamp}_hosp_EvnSection_List_pg.xlsx") == MONDAY
+        assert bunk_history.snapshot_date("койки.xlsx") is None
+
+    def test_record_errors(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(bunk_history, "HISTORY_FILE", str(tmp_path / "нет папки" / "история.sqlite3"))
+        assert bunk_history.record("1716188400_hosp_EvnSection_List_pg.xlsx", [("Хирургия", False, 50, 40, 10)]) is None
+        monkeypatch.setattr(bunk_history, "ENABLED", False)
+        assert bunk_history.record("койки.xlsx", []) is None
+
+
+class TestBunkDynamics:
+
+    @pytest.fixture
+    def bunks_file(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(report_bunk_50, "BASE_DIR", str(tmp_path))
+        monkeypatch.chdir(tmp_path)
+        wb = Workbook()
+        wb.active.append(["Отделение из отчета", "Количество коек"])
+        wb.active.append(["1025. Гинекологическое отделение", 50])
+        wb.active.append(["2001. Хирургическое отделение ДС", 10])
+        wb.save(tmp_path / "Отделения и койки.xlsx")
+
+    def test_saved_report_records_history(self, bunks_file, tmp_path):
+        for day, counts in ((MONDAY, (40, 3)), (MONDAY + datetime.timedelta(days=2), (52, 4))):
+            stamp = int(datetime.datetime.combine(day, datetime.time(9)).timestamp())
+            report = report_bunk_50.BunkReport(str(tmp_path / f"{stamp}_hosp_EvnSection_List_pg.xlsx"))
+            data = report.processing({
+                "1025. Гинекологическое отделение": counts[0],
+                "2001. Хирургическое отделение ДС": counts[1],
+                "Нет в файле коек": 1}, [])
+            # Обработка только строит таблицы, история пишется при сохранении.
+            assert not bunk_history.BunkHistory().period(day, day)
+            report.save_in_files(*data)
+
+        report = report_bunk_50.BunkReport(None)
+        free_kc, occupied_kc, free_dc, occupied_dc = report.processing_dynamics(1, MONDAY + datetime.timedelta(days=6))
+        assert free_kc == [
+            ["Отделение", "Коечный фонд", "20.05", "22.05"],
+            ["1025. Гинекологическое отделение", 50, 10, -2],
+        ]
+        assert occupied_kc[1] == ["1025. Гинекологическое отделение", 50, 40, 52]
+        assert free_dc[1] == ["2001. Хирургическое отделение ДС", 10, 7, 6]
+        assert occupied_dc[1][2:] == [3, 4]
+
+        report.save_dynamics(free_kc, occupied_kc, free_dc, occupied_dc)
+        saved, = tmp_path.glob("Динамика за период на *.xlsx")
+        wb = openpyxl.load_workbook(saved)
+        assert wb.sheetnames == ["Свободные койки", "Госпитализированные", "Свободные койки ДС", "Госпитализированные ДС"]
+        assert wb["Свободные койки"]["D2"].value == -2
+
+    def test_no_date_in_file_name(self, bunks_file, tmp_path, history_file):
+        report = report_bunk_50.BunkReport(str(tmp_path / "койки.xlsx"))
+        report.save_in_files(*report.processing({"1025. Гинекологическое отделение": 40}, []))
+        assert not os.path.exists(history_file)
+
+    def test_empty_history(self):
+        with pytest.raises(ValidateError):
+            report_bunk_50.BunkReport(None).processing_dynamics(4)
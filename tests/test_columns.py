@@ -0,0 +1,40 @@
+"""Тесты карты столбцов и поиска строки заголовков."""
+import pytest
+
+from columns import ColumnMap
+from validators import validate_for_title
+
+
+class TestColumnMap:
+    title = ("№ п/п", None, "Отделение", 12, "Кол-во \nк/дней", "ОТДЕЛЕНИЕ")
+
+    def test_index(self):
+        columns = ColumnMap(self.title)
+        assert columns.index("отделение") == 2
+        assert columns.index("Кол-во \nК/дней") == 4
+        assert "№ П/П" in columns
+        assert len(columns) == len(self.title)
+
+    def test_missing_column(self, monkeypatch):
+        messages = []
+        monkeypatch.setattr("columns.log_any_error", messages.append)
+        assert ColumnMap(self.title).index("Номер истории болезни", "BunkReport") is None
+        assert messages == ['Не найден столбец "Номер истории болезни" в классе BunkReport']
+
+    def test_immutable(self):
+        columns = ColumnMap(self.title)
+        with pytest.raises(AttributeError):
+            columns.title = ()
+        with pytest.raises(TypeError):
+            columns.indexes["НОВЫЙ"] = 1
+
+
+class TestValidateForTitle:
+
+    def test_first_value_only(self):
+        row = ("МОКБ", None, "фио пациента", 5)
+        assert validate_for_title(["ФИО пациента"], row)
+        assert validate_for_title(["ФИО пациента", "Нет такого"], row)
+        assert not validate_for_title(["Нет такого", "ФИО пациента"], row)
+        assert not validate_for_title(["ФИО"], row)
+        assert validate_for_title([5], row)
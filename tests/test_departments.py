@@ -0,0 +1,65 @@
+"""Тесты справочника отделений КС/ДС."""
+import json
+
+import pytest
+
+import departments
+from departments import DepartmentRegistry
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry(monkeypatch):
+    monkeypatch.setattr(departments, "REGISTRY", None)
+
+
+class TestDepartmentRegistry:
+
+    @pytest.mark.parametrize("department, expected", [
+        ("2001. Хирургическое отделение ДС", True),
+        ("2002. Дневной стационар терапии", True),
+        ("2003. Терапия (дн.стац.)", True),
+        ("2004. Терапия дн. стац.", True),
+        ("1025. Гинекологическое отделение", False),
+        ("1026. Отделение дс", False),
+    ])
+    def test_default_markers(self, department, expected):
+        assert DepartmentRegistry().is_day_stay(department) is expected
+
+    def test_classified_once(self, monkeypatch):
+        registry = DepartmentRegistry()
+        calls = []
+        classify = registry.classify
+        monkeypatch.setattr(registry, "classify", lambda name: calls.append(name) or classify(name))
+        for _ in range(3):
+            registry.is_day_stay("2001. Хирургия ДС")
+            registry.is_day_stay("1025. Гинекология")
+        assert calls == ["2001. Хирургия ДС", "1025. Гинекология"]
+
+    def test_split_keeps_order(self):
+        rows = [("Хирургия ДС", 1), ("Терапия", 2), ("Дневной стационар", 3), ("Терапия", 4)]
+        assert DepartmentRegistry().split(rows) == (
+            [("Терапия", 2), ("Терапия", 4)], [("Хирургия ДС", 1), ("Дневной стационар", 3)])
+
+    def test_config_file(self, tmp_path, monkeypatch):
+        config = tmp_path / "departments.json"
+        config.write_text(json.dumps({
+            "markers_lower": ["дневн"],
+            "day_stay": ["Центр амбулаторной хирургии"],
+            "round_the_clock": ["Отделение ДС-реанимации"],
+        }), encoding="utf-8")
+        monkeypatch.setattr(departments, "CONFIG_FILE", str(config))
+
+        assert departments.is_day_stay("Центр амбулаторной хирургии")
+        assert not departments.is_day_stay("Отделение ДС-реанимации")
+        assert departments.is_day_stay("Хирургия ДС")
+        assert not departments.is_day_stay("Терапия дн.стац.")
+
+    def test_broken_config(self, tmp_path, monkeypatch):
+        config = tmp_path / "departments.json"
+        config.write_text("{", encoding="utf-8")
+        messages = []
+        monkeypatch.setattr(departments, "log_any_error", messages.append)
+
+        registry = DepartmentRegistry.from_file(str(config))
+        assert registry.is_day_stay("Терапия дн.стац.")
+        assert len(messages) == 1
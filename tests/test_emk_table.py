@@ -0,0 +1,83 @@
+"""Тесты столбцового представления данных ЭМК (с NumPy и без)."""
+import datetime
+
+import pytest
+
+import emk_table
+
+DAY = datetime.datetime(2024, 5, 20)
+RECORDS = [
+    ("КВС1", DAY, "Хирургия", 2, None),
+    ("КВС2", DAY, "Терапия ДС", 0, "Да"),
+    ("КВС3", DAY + datetime.timedelta(days=1), "Хирургия", 3, "Нет"),
+    ("КВС4", DAY, "Неврология", 5, None),
+    ("КВС5", DAY, "Терапия ДС", 1, "Да"),
+]
+
+
+@pytest.fixture(params=["numpy", "array"])
+def table(request, monkeypatch):
+    if request.param == "array":
+        monkeypatch.setattr(emk_table, "numpy", None)
+    elif emk_table.numpy is None:
+        pytest.skip("NumPy не установлен")
+    return emk_table.EmkTable(["КВС", "Дата", "Отделение", "Счетчик", "Отметка"], RECORDS, (1, 2))
+
+
+class TestEmkTable:
+
+    def test_categorical_order(self, table):
+        departments = table.categorical(2)
+        assert departments.categories == ["Хирургия", "Терапия ДС", "Неврология"]
+        assert list(departments.codes) == [0, 1, 0, 2, 1]
+
+    def test_rows(self, table):
+        assert table.rows(lambda value: value is None, 4) == [0, 3]
+        assert table.rows(lambda value: "ДС" in value, 2, [1, 2, 3, 4]) == [1, 4]
+        assert table.rows() == [0, 1, 2, 3, 4]
+        assert table.categories_in(1, [0, 2]) == {DAY, DAY + datetime.timedelta(days=1)}
+
+    def test_check_called_once_per_value(self, table):
+        calls = []
+        table.rows(lambda value: calls.append(value) or True, 2)
+        assert sorted(calls) == ["Неврология", "Терапия ДС", "Хирургия"]
+
+    def test_group_sum(self, table):
+        sums = table.group_sum(3, 2)
+        assert sums == [5, 1, 5]
+        assert all(type(value) is int for value in sums)
+
+    def test_group_sum_not_int(self, table):
+        records = [("a", 1.5), ("b", 2), ("a", 0)]
+        mixed = emk_table.EmkTable(["Отделение", "Счетчик"], records, (0,))
+        assert mixed.group_sum(1, 0) == [1.5, 2]
+
+    def test_group_sums_one_reduction(self, table):
+        records = [("a", 1, 10), ("b", 2, 20), ("a", 3, 30)]
+        counters = emk_table.EmkTable(["Отделение", "Первый", "Второй"], records, (0,), (1, 2))
+        assert counters.group_sums([1, 2, 1], 0) == [[4, 2], [40, 20], [4, 2]]
+
+    def test_index_by(self, table):
+        calls = []
+
+        def day(value):
+            calls.append(value)
+            return value.strftime("%d.%m.%Y")
+
+        groups = table.index_by(1, day)
+        assert groups == {"20.05.2024": [0, 1, 3, 4], "21.05.2024": [2]}
+        assert list(groups) == ["20.05.2024", "21.05.2024"]
+        assert table.index_by(1, day) is groups
+        assert len(calls) == 2
+
+    def test_mapped(self, table):
+        calls = []
+
+        def day(value):
+            calls.append(value)
+            return value.strftime("%d.%m.%Y")
+
+        values = table.mapped(1, day)
+        assert values == ["20.05.2024", "20.05.2024", "21.05.2024", "20.05.2024", "20.05.2024"]
+        assert table.mapped(1, day) is values
+        assert len(calls) == 2
@@ -0,0 +1,42 @@
+"""Тесты журнала ошибок."""
+import error_log
+from tests.test_progress import FakeClock
+
+
+class TestErrorLog:
+
+    def test_repeats_are_counted(self, tmp_path):
+        clock = FakeClock()
+        log = error_log.ErrorLog(str(tmp_path / "log.txt"), dedup_seconds=60, clock=clock)
+        for _ in range(1000):
+            log.put("Не корректное значение номера карты!")
+        log.put("Другая ошибка")
+        clock.now += 61
+        log.put("Не корректное значение номера карты!")
+        log.put("Не корректное значение номера карты!")
+        log.close()
+
+        lines = (tmp_path / "log.txt").read_text(encoding="utf-8").splitlines()
+        texts = [line.split("] ", 1)[1] for line in lines]
+        assert texts == [
+            "Не корректное значение номера карты!",
+            "Другая ошибка",
+            "Повторялось еще 999 раз: Не корректное значение номера карты!",
+            "Не корректное значение номера карты!",
+            "Повторялось еще 1 раз: Не корректное значение номера карты!",
+        ]
+
+    def test_rotation(self, tmp_path):
+        log = error_log.ErrorLog(str(tmp_path / "log.txt"), max_bytes=200, backup_count=2)
+        for number in range(30):
+            log.put(f"Ошибка {number:02} " + "x" * 20)
+            log.flush()
+        log.close()
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["log.txt", "log.txt.1", "log.txt.2"]
+        assert "Ошибка 29" in (tmp_path / "log.txt").read_text(encoding="utf-8")
+
+    def test_log_any_error(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(error_log, "_log", error_log.ErrorLog(str(tmp_path / "log.txt")))
+        error_log.log_any_error("Ошибка в типе", ValueError("abc"))
+        error_log.flush()
+        assert (tmp_path / "log.txt").read_text(encoding="utf-8").endswith("] Ошибка в типе\nabc\n")
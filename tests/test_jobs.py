@@ -0,0 +1,110 @@
+"""Тесты фонового выполнения отчетов."""
+import threading
+
+import pytest
+
+import jobs
+import report_emk
+import report_services
+from benchmarks import synthetic_exports
+
+
+class FakeRoot:
+    """Вместо окна Tk: after() запоминает вызов, run() выполняет опросы до конца задач."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+
+    def run(self):
+        while self.callbacks:
+            self.callbacks.pop(0)()
+
+
+@pytest.fixture
+def runner():
+    runner = jobs.JobRunner(FakeRoot(), workers=2, poll_ms=1)
+    yield runner
+    runner.shutdown()
+
+
+class TestJobRunner:
+
+    def test_progress_and_result(self, runner):
+        events = []
+
+        def task(job):
+            job.step("Чтение")
+            job.step("Сохранение")
+            return 42
+
+        runner.submit("Отчет", task, events.append, lambda result: events.append(("done", result)))
+        runner.root.run()
+        assert events == ["Чтение", "Сохранение", ("done", 42)]
+        assert runner.running() == [] and not runner.polling
+
+    def test_error(self, runner):
+        errors = []
+
+        def task(job):
+            raise ValueError("Нет заголовков")
+
+        runner.submit("Отчет", task, on_error=errors.append)
+        runner.root.run()
+        assert [str(error) for error in errors] == ["Нет заголовков"]
+
+    def test_cancel(self, runner):
+        started = threading.Event()
+        resume = threading.Event()
+        errors = []
+
+        def task(job):
+            job.step("Чтение")
+            started.set()
+            resume.wait(5)
+            job.step("Сохранение")
+            return "сохранено"
+
+        job = runner.submit("Отчет", task, on_done=errors.append, on_error=errors.append)
+        started.wait(5)
+        job.cancel()
+        resume.set()
+        runner.root.run()
+        assert len(errors) == 1 and isinstance(errors[0], jobs.JobCancelled)
+
+    def test_parallel_jobs(self, runner):
+        both_started = threading.Barrier(2, timeout=5)
+        results = []
+
+        def task(job):
+            both_started.wait()
+            return job.name
+
+        runner.submit("ЭМК", task, on_done=results.append)
+        runner.submit("Койки", task, on_done=results.append)
+        runner.root.run()
+        assert sorted(results) == ["Койки", "ЭМК"]
+
+
+class TestCancelParsing:
+    """Отмена во время разбора выгрузки остается отменой, а не ошибкой файла."""
+
+    @pytest.fixture
+    def job(self):
+        job = jobs.Job("тест")
+        job.cancel()
+        return job
+
+    def test_emk(self, job, tmp_path):
+        filepath = str(tmp_path / "emk.xlsx")
+        synthetic_exports.write_emk(filepath, synthetic_exports.ExportOptions(rows=20))
+        with pytest.raises(jobs.JobCancelled):
+            report_emk.EmkReport(filepath).open_file_return_data(job.step)
+
+    def test_services(self, job, tmp_path):
+        filepath = str(tmp_path / "услуги.xlsx")
+        synthetic_exports.write_services(filepath, synthetic_exports.ExportOptions(rows=20))
+        with pytest.raises(jobs.JobCancelled):
+            report_services.ServicesReport(filepath, workers=1).open_file_return_data(job.step)
@@ -0,0 +1,36 @@
+"""Тесты отложенной загрузки модулей."""
+import sys
+import threading
+
+import pytest
+
+import lazy_import
+
+
+@pytest.fixture
+def module_file(tmp_path, monkeypatch):
+    (tmp_path / "lazy_sample.py").write_text("COUNT_DAYS = 50\nLOADS = []\nLOADS.append(1)\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(lazy_import, "TIMINGS", [])
+    yield "lazy_sample"
+    sys.modules.pop("lazy_sample", None)
+
+
+class TestLazyModule:
+
+    def test_load_on_access(self, module_file):
+        module = lazy_import.LazyModule(module_file)
+        assert not module.loaded and module_file not in sys.modules
+        assert module.COUNT_DAYS == 50
+        assert module.loaded and module.LOADS == [1]
+        module.COUNT_DAYS = 30
+        assert sys.modules[module_file].COUNT_DAYS == 30
+        assert [stage for stage, _ in lazy_import.TIMINGS] == [f"import {module_file}"]
+
+    def test_warm_up(self, module_file):
+        done = threading.Event()
+        modules = [lazy_import.LazyModule(module_file), lazy_import.LazyModule("no_such_module_for_test")]
+        lazy_import.warm_up(modules, done.set).join(5)
+        assert done.is_set() and modules[0].loaded and not modules[1].loaded
+        text = lazy_import.report("2.1.0")
+        assert "v2.1.0" in text and f"import {module_file}" in text and "фоновая загрузка модулей" in text
@@ -0,0 +1,97 @@
+"""Тесты замеров этапов отчетов."""
+import json
+import threading
+import time
+
+import pytest
+
+import metrics
+import report_phone_adress
+from tests.test_parallel_sheets import create_phone_file
+
+
+@pytest.fixture
+def metrics_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+
+    def records():
+        with open(tmp_path / "metrics.jsonl", encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+    return records
+
+
+class Report:
+
+    @metrics.timed()
+    def open_file_return_data(self):
+        with metrics.stage("load_workbook"):
+            pass
+        return ([1, 2, 3], {"a": 1})
+
+
+class TestMetrics:
+
+    def test_stages(self, metrics_file):
+        Report().open_file_return_data()
+        inner, outer = metrics_file()
+        assert (inner["report"], inner["stage"], inner["parent"]) == ("Report", "load_workbook", "open_file_return_data")
+        assert (outer["report"], outer["stage"], outer["parent"], outer["rows"]) == ("Report", "open_file_return_data", None, 4)
+        assert outer["seconds"] >= inner["seconds"] >= 0
+        assert "profile" not in outer
+        # Пик всего процесса, а не этапа - поле названо так, чтобы не путать.
+        assert outer["process_peak_rss_mb"] > 0 and "peak_rss_mb" not in outer
+
+    def test_profile(self, metrics_file, monkeypatch, tmp_path):
+        monkeypatch.setattr(metrics, "PROFILE", True)
+        with metrics.stage("processing", "Report") as stage:
+            stage.rows = 10
+            data = [list(range(100)) for _ in range(100)]
+        record = metrics_file()[0]
+        assert record["rows"] == 10 and record["peak_traced_mb"] > 0 and data
+        assert sorted(name.rsplit(".", 1)[1] for name in record["profile"]) == ["prof", "txt"]
+        assert len(list((tmp_path / "profiles").iterdir())) == 2
+
+    def test_disabled(self, metrics_file, monkeypatch, tmp_path):
+        monkeypatch.setattr(metrics, "ENABLED", False)
+        assert Report().open_file_return_data()[0] == [1, 2, 3]
+        assert not (tmp_path / "metrics.jsonl").exists()
+
+    def test_rotation(self, metrics_file, monkeypatch, tmp_path):
+        monkeypatch.setattr(metrics, "MAX_BYTES", 1000)
+        monkeypatch.setattr(metrics, "BACKUP_COUNT", 1)
+        for _ in range(50):
+            Report().open_file_return_data()
+        assert sorted(path.name for path in tmp_path.iterdir() if path.is_file()) == ["metrics.jsonl", "metrics.jsonl.1"]
+        assert all(path.stat().st_size <= 1000 for path in tmp_path.glob("metrics.jsonl*"))
+        assert metrics_file()
+
+    def test_profiled_stages_one_at_a_time(self, metrics_file, monkeypatch):
+        monkeypatch.setattr(metrics, "PROFILE", True)
+        spans = []
+
+        def work():
+            with metrics.stage("processing", "Report"):
+                started = time.perf_counter()
+                time.sleep(0.05)
+                spans.append((started, time.perf_counter()))
+
+        threads = [threading.Thread(target=work) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        first, second = sorted(spans)
+        assert first[1] <= second[0]
+        assert all(record["peak_traced_mb"] is not None for record in metrics_file())
+
+    def test_report_stages(self, metrics_file, monkeypatch, tmp_path):
+        create_phone_file(tmp_path / "телефоны.xlsx")
+        monkeypatch.chdir(tmp_path)
+        report = report_phone_adress.PhoneReport(str(tmp_path / "телефоны.xlsx"), workers=1)
+        report.processing_and_save(*report.open_file_return_data())
+        stages = [(record["stage"], record["parent"], record["report"]) for record in metrics_file()]
+        assert stages == [
+            ("open_file_return_data", None, "PhoneReport"),
+            ("wb.save", "processing_and_save", "PhoneReport"),
+            ("processing_and_save", None, "PhoneReport"),
+        ]
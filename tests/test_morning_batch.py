@@ -0,0 +1,133 @@
+"""Тесты утренних отчетов без окна."""
+import datetime
+import json
+import os
+import re
+
+import openpyxl
+import pytest
+from openpyxl import Workbook
+
+import morning_batch
+import report_bunk_50
+from benchmarks import synthetic_exports
+from tests.test_parallel_sheets import create_bunk_file, create_phone_file
+
+
+def crash(filepath, on_progress=None):
+    """Процесс завершается сразу, как при нехватке памяти."""
+    os._exit(1)
+
+
+def write_export(kind: str, filepath, start: datetime.datetime):
+    """Синтетическая выгрузка с датами за неделю от start."""
+    writer = synthetic_exports.WRITERS[kind][0]
+    saved = synthetic_exports.PERIOD_START
+    synthetic_exports.PERIOD_START = start
+    try:
+        writer(str(filepath), synthetic_exports.ExportOptions(rows=50, dirty=0))
+    finally:
+        synthetic_exports.PERIOD_START = saved
+
+
+def header_months(filepath) -> set:
+    """Месяцы (мм.гггг) из дат периода в первой строке листов отчета."""
+    wb = openpyxl.load_workbook(filepath, read_only=True)
+    months = set()
+    for sheet in wb.worksheets:
+        for row in sheet.iter_rows(max_row=1, values_only=True):
+            for value in row:
+                if isinstance(value, str):
+                    months.update(re.findall(r"\d\d\.(\d\d\.\d{4})", value))
+    wb.close()
+    return months
+
+
+class TestMorningBatch:
+
+    @pytest.fixture
+    def exports(self, tmp_path):
+        directory = tmp_path / "выгрузки"
+        directory.mkdir()
+        create_bunk_file(directory / "койки.xlsx")
+        create_phone_file(directory / "телефоны.xlsx")
+        wb = Workbook()
+        wb.active.append(["Что-то другое"])
+        wb.save(directory / "прочее.xlsx")
+        (directory / "заметки.txt").write_text("не выгрузка", encoding="utf-8")
+        return directory
+
+    def test_find_jobs(self, exports, tmp_path):
+        assert morning_batch.find_jobs(str(exports)) == [
+            ("BunkReport", str(exports / "койки.xlsx")),
+            ("PhoneReport", str(exports / "телефоны.xlsx")),
+        ]
+        manifest = tmp_path / "manifest.json"
+        manifest.write_text(json.dumps({"выгрузки/койки.xlsx": "EmkReport"}), encoding="utf-8")
+        assert morning_batch.find_jobs(str(exports), str(manifest)) == [
+            ("EmkReport", str(tmp_path / "выгрузки" / "койки.xlsx"))]
+        manifest.write_text(json.dumps({"койки.xlsx": "Койки"}), encoding="utf-8")
+        with pytest.raises(ValueError):
+            morning_batch.find_jobs(str(exports), str(manifest))
+
+    def test_run_batch(self, exports, tmp_path, monkeypatch):
+        # Файл коек ищется рядом с программой; процессы пула наследуют подмену (fork).
+        monkeypatch.setattr(report_bunk_50, "BASE_DIR", str(tmp_path))
+        wb = Workbook()
+        wb.active.append(["Отделение из отчета", "Количество коек"])
+        wb.active.append(["1025. Гинекологическое отделение", 50])
+        wb.save(tmp_path / "Отделения и койки.xlsx")
+        out_dir = tmp_path / "отчеты"
+        jobs = morning_batch.find_jobs(str(exports))
+        jobs.append(("EmkReport", str(exports / "телефоны.xlsx")))
+        cwd = os.getcwd()
+        results = morning_batch.run_batch(jobs, str(out_dir), workers=3)
+
+        assert os.getcwd() == cwd
+        assert [result.kind for result in results] == ["BunkReport", "PhoneReport", "EmkReport"]
+        bunk, phone, emk = results
+        assert bunk.error is None and phone.error is None and bunk.files and phone.files
+        assert emk.error is not None and emk.files == []
+        assert sorted(os.listdir(out_dir)) == sorted(bunk.files + phone.files)
+
+        text = morning_batch.summary(results, 1.0)
+        assert "Отчетов: 3, с ошибкой: 1." in text
+        assert "-> " + phone.files[0] in text
+
+    def test_same_kind(self, tmp_path):
+        directory = tmp_path / "выгрузки"
+        directory.mkdir()
+        create_phone_file(directory / "телефоны 1.xlsx")
+        create_phone_file(directory / "телефоны 2.xlsx")
+        out_dir = tmp_path / "отчеты"
+        results = morning_batch.run_batch(morning_batch.find_jobs(str(directory)), str(out_dir), workers=2)
+
+        assert [result.error for result in results] == [None, None]
+        files = results[0].files + results[1].files
+        assert len(files) == 2 and len(set(files)) == 2
+        # Временные папки задач удалены, оба отчета на месте.
+        assert sorted(os.listdir(out_dir)) == sorted(files)
+
+    def test_crashed_job(self, exports, tmp_path, monkeypatch):
+        monkeypatch.setitem(morning_batch.RUNNERS, "PhoneReport", crash)
+        jobs = [("PhoneReport", str(exports / "телефоны.xlsx")), ("BunkReport", str(exports / "койки.xlsx"))]
+        results = morning_batch.run_batch(jobs, str(tmp_path / "отчеты"), workers=2)
+        assert [result.kind for result in results] == ["PhoneReport", "BunkReport"]
+        assert results[0].error.startswith("BrokenProcessPool")
+        assert "Отчетов: 2" in morning_batch.summary(results, 1.0)
+
+    def test_reserve_name(self, tmp_path):
+        assert morning_batch.reserve_name(str(tmp_path), "Свод.xlsx") == "Свод.xlsx"
+        assert morning_batch.reserve_name(str(tmp_path), "Свод.xlsx") == "Свод (2).xlsx"
+        assert morning_batch.reserve_name(str(tmp_path), "Свод.xlsx") == "Свод (3).xlsx"
+
+    @pytest.mark.parametrize("kind", ["EmkReport", "ServicesReport"])
+    def test_period_of_each_job(self, kind, tmp_path):
+        # Процесс пула переиспользуется: период второй выгрузки не должен включать даты первой.
+        write_export(kind, tmp_path / "май.xlsx", datetime.datetime(2024, 5, 20))
+        write_export(kind, tmp_path / "июль.xlsx", datetime.datetime(2024, 7, 1))
+        for name, month in (("май", "05.2024"), ("июль", "07.2024")):
+            result = morning_batch.run_job(kind, str(tmp_path / f"{name}.xlsx"), str(tmp_path / name))
+            assert result.error is None and result.files
+            for filename in result.files:
+                assert header_months(tmp_path / name / filename) == {month}
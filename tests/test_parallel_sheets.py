@@ -0,0 +1,79 @@
+"""Тесты параллельного разбора листов: результат как при последовательном разборе."""
+import pytest
+from openpyxl import Workbook
+
+import parallel_sheets
+import report_bunk_50
+import report_phone_adress
+
+BUNK_TITLE = ["№ п/п", "Отделение", "ФИО пациента", "Дата рождения", "Номер истории болезни", "Кол-во \nк/дней"]
+PHONE_TITLE_UP = [
+    "№ \nп/п", "Ф.И.О. пациента", "Номер карты", "Возраст", "Пол", "Дата", None,
+    "Адрес проживания/ регистрации", "Телефон", "Документ"]
+PHONE_TITLE_DOWN = [None, None, "Кем доставлен", "Кем направлен", "Тип", "Диагноз", "Отделение", "Врач", "Профиль", "Палата"]
+DEPARTMENTS = ["1025. Гинекологическое отделение", "2001. Хирургическое отделение ДС", "3001. Неврология"]
+
+
+def create_bunk_file(filepath):
+    wb = Workbook()
+    wb.remove(wb.active)
+    number = 0
+    for sheet_number in range(3):
+        sheet = wb.create_sheet(f"Лист{sheet_number}")
+        sheet.append(BUNK_TITLE)
+        sheet.append([str(column) for column in range(1, 7)])
+        for row in range(20):
+            number += 1
+            department = DEPARTMENTS[(row + sheet_number) % len(DEPARTMENTS)]
+            sheet.append([number, department, "Иванов И.И.", "01.01.1950", f"И-{number}", number % 70])
+    wb.save(filepath)
+
+
+def create_phone_file(filepath):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for sheet_number in range(3):
+        sheet = wb.create_sheet(f"Лист{sheet_number}")
+        sheet.append(PHONE_TITLE_UP)
+        sheet.append(PHONE_TITLE_DOWN)
+        for row in range(10):
+            adress = "г. Мытищи, ул. Мира, д. 1" if row % 2 else None
+            phone = "+79001234567" if row % 3 else None
+            sheet.append([
+                row, "Ф.И.О.", f"К{sheet_number}-{row}", 30, "м", "д", DEPARTMENTS[row % 3], adress, phone, "п"])
+    wb.save(filepath)
+
+
+class TestParallelSheets:
+
+    @pytest.fixture(autouse=True)
+    def small_files(self, monkeypatch):
+        monkeypatch.setattr(parallel_sheets, "MIN_FILE_SIZE", 0)
+
+    def test_count_workers(self, tmp_path):
+        filepath = tmp_path / "file.xlsx"
+        filepath.write_bytes(b"0" * 10)
+        assert parallel_sheets.count_workers(str(filepath), 1, 4) == 1
+        assert parallel_sheets.count_workers(str(filepath), 3, 1) == 1
+        assert parallel_sheets.count_workers(str(filepath), 3, 4) == 3
+        parallel_sheets.MIN_FILE_SIZE = 100
+        assert parallel_sheets.count_workers(str(filepath), 3, 4) == 1
+
+    def test_bunk_report(self, tmp_path):
+        filepath = str(tmp_path / "bunk.xlsx")
+        create_bunk_file(filepath)
+
+        serial = report_bunk_50.BunkReport(filepath, workers=1).open_file_return_data()
+        parallel = report_bunk_50.BunkReport(filepath, workers=2).open_file_return_data()
+        assert parallel == serial
+        assert list(parallel[0]) == list(serial[0])
+        assert sum(parallel[0].values()) == 60
+
+    def test_phone_report(self, tmp_path):
+        filepath = str(tmp_path / "phone.xlsx")
+        create_phone_file(filepath)
+
+        serial = report_phone_adress.PhoneReport(filepath, workers=1).open_file_return_data()
+        parallel = report_phone_adress.PhoneReport(filepath, workers=3).open_file_return_data()
+        assert parallel == serial
+        assert [row[1] for row in parallel[0]][:2] == ["К0-0", "К0-3"]
@@ -0,0 +1,164 @@
+"""Тесты кэша разобранных выгрузок."""
+import datetime
+import os
+import time
+
+import pytest
+from openpyxl import Workbook
+
+import parsed_cache
+import report_emk
+
+
+def create_emk_file(filepath, count_rows: int = 5):
+    wb = Workbook()
+    sheet = wb.active
+    sheet.append(["Наименование Медицинской организации"] + list(report_emk.HEADINGS.values()))
+    for number in range(count_rows):
+        date = datetime.datetime(2024, 5, 20, 10) + datetime.timedelta(days=number)
+        department = "3001. Приемное отделение" if number == 0 else "1025. Гинекологическое отделение"
+        sheet.append(
+            ["МОКБ", f"КВС{number}", date, date, 40, "Да", "Да", "Да", "РФ", department]
+            + [1] * 16)
+    wb.save(filepath)
+
+
+class TestParsedCache:
+
+    def test_get_put(self, tmp_path):
+        source = tmp_path / "source.xlsx"
+        source.write_bytes(b"content")
+        cache = parsed_cache.ParsedCache(str(tmp_path / "cache"))
+
+        assert cache.get(str(source), ("a", 1)) is None
+        cache.put(str(source), ("a", 1), [("row", 1, None)])
+        again = parsed_cache.ParsedCache(str(tmp_path / "cache"))
+        assert again.get(str(source), ("a", 1)) == [("row", 1, None)]
+        assert again.get(str(source), ("a", 2)) is None
+
+    def test_changed_content(self, tmp_path):
+        source = tmp_path / "source.xlsx"
+        source.write_bytes(b"old")
+        cache = parsed_cache.ParsedCache(str(tmp_path / "cache"))
+        cache.put(str(source), (), "old")
+        stat = os.stat(source)
+
+        source.write_bytes(b"new")
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        # Размер и время те же, поэтому хэш берется из индекса.
+        assert cache.get(str(source), ()) == "old"
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert cache.get(str(source), ()) is None
+
+    def test_evict_least_recently_used(self, tmp_path):
+        cache = parsed_cache.ParsedCache(str(tmp_path / "cache"))
+        sources = []
+        for number in range(3):
+            source = tmp_path / f"source{number}.xlsx"
+            source.write_bytes(bytes([number]))
+            sources.append(str(source))
+            cache.put(str(source), (), str(number))
+        entries = cache.index["entries"]
+        entries[cache.key(sources[0], ())][1] += 10
+        cache.max_size = sum(size for size, _ in entries.values()) - 1
+        cache.evict()
+
+        assert cache.get(sources[1], ()) is None
+        assert cache.get(sources[0], ()) == "0"
+        assert cache.get(sources[2], ()) == "2"
+        assert len(os.listdir(tmp_path / "cache")) == 3
+
+    def test_two_processes_share_index(self, tmp_path):
+        directory = str(tmp_path / "cache")
+        first = parsed_cache.ParsedCache(directory)
+        second = parsed_cache.ParsedCache(directory)
+        sources = []
+        for number, cache in enumerate((first, second)):
+            source = tmp_path / f"source{number}.xlsx"
+            source.write_bytes(bytes([number]))
+            sources.append(str(source))
+            cache.put(str(source), (), str(number))
+
+        # Индекс второго процесса прочитан до записи первого, но запись не потеряна.
+        again = parsed_cache.ParsedCache(directory)
+        assert len(again.index["entries"]) == 2
+        assert first.get(sources[1], ()) == "1"
+        assert not [name for name in os.listdir(directory) if not name.endswith((".bin", ".json"))]
+
+    def test_evict_files_missing_from_index(self, tmp_path):
+        directory = tmp_path / "cache"
+        directory.mkdir()
+        orphan = directory / "0123-abcd.bin"
+        orphan.write_bytes(b"x" * 1000)
+        os.utime(orphan, (1, 1))
+        (directory / "index.json.123.tmp").write_bytes(b"{}")
+        os.utime(directory / "index.json.123.tmp", (1, 1))
+        source = tmp_path / "source.xlsx"
+        source.write_bytes(b"content")
+
+        cache = parsed_cache.ParsedCache(str(directory), max_size=500)
+        cache.put(str(source), (), "data")
+        assert sorted(os.listdir(directory)) == sorted(["index.json", f"{cache.key(str(source), ())}.bin"])
+        assert cache.get(str(source), ()) == "data"
+
+    def test_stale_lock(self, tmp_path, monkeypatch):
+        directory = tmp_path / "cache"
+        directory.mkdir()
+        lock = directory / parsed_cache.LOCK_NAME
+        lock.write_bytes(b"")
+        source = tmp_path / "source.xlsx"
+        source.write_bytes(b"content")
+        monkeypatch.setattr(parsed_cache, "LOCK_TIMEOUT", 0.05)
+        cache = parsed_cache.ParsedCache(str(directory))
+
+        # Живая блокировка: запись не ждет дольше LOCK_TIMEOUT и не ломает отчет.
+        cache.put(str(source), (), "data")
+        assert parsed_cache.ParsedCache(str(directory)).get(str(source), ()) is None
+        # Блокировка упавшего процесса снимается.
+        os.utime(lock, (1, 1))
+        cache.put(str(source), (), "data")
+        assert parsed_cache.ParsedCache(str(directory)).get(str(source), ()) == "data"
+        assert not lock.exists()
+
+    def test_lock_of_crashed_process_is_not_waited(self, tmp_path):
+        directory = tmp_path / "cache"
+        directory.mkdir()
+        lock = directory / parsed_cache.LOCK_NAME
+        lock.write_bytes(b"")
+        moment = time.time() - parsed_cache.LOCK_STALE_SECONDS - 1
+        os.utime(lock, (moment, moment))
+        source = tmp_path / "source.xlsx"
+        source.write_bytes(b"content")
+
+        started = time.monotonic()
+        parsed_cache.ParsedCache(str(directory)).put(str(source), (), "data")
+        assert time.monotonic() - started < parsed_cache.LOCK_TIMEOUT / 2
+        assert parsed_cache.ParsedCache(str(directory)).get(str(source), ()) == "data"
+
+    def test_get_when_index_is_busy(self, tmp_path, monkeypatch):
+        source = tmp_path / "source.xlsx"
+        source.write_bytes(b"content")
+        cache = parsed_cache.ParsedCache(str(tmp_path / "cache"))
+        cache.put(str(source), (), "data")
+        (tmp_path / "cache" / parsed_cache.LOCK_NAME).write_bytes(b"")
+        monkeypatch.setattr(parsed_cache, "LOCK_TIMEOUT", 0.05)
+
+        # Время использования не записать, но данные из кэша отдаются.
+        assert cache.get(str(source), ()) == "data"
+        assert cache.key(str(source), ()) in cache.index["entries"]
+
+    def test_emk_report_uses_cache(self, tmp_path, monkeypatch):
+        filepath = str(tmp_path / "emk.xlsx")
+        create_emk_file(filepath)
+
+        first = report_emk.EmkReport(filepath)
+        data = first.open_file_return_data()
+        assert len(data) == 4
+        # Повторный разбор книги при попадании в кэш не нужен.
+        monkeypatch.setattr(report_emk.xlsx_reader, "load_workbook", None)
+        second = report_emk.EmkReport(filepath)
+        assert second.open_file_return_data() == data
+        assert vars(second) == vars(first)
+
+        with pytest.raises(report_emk.ValidateError):
+            report_emk.EmkReport(filepath, need_pdo=True).open_file_return_data()
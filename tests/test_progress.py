@@ -0,0 +1,56 @@
+"""Тесты хода разбора."""
+import pytest
+
+import progress
+
+
+class FakeClock:
+    """Часы, которые переводит тест."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestProgress:
+
+    def test_rate_limited(self, monkeypatch):
+        monkeypatch.setattr(progress, "CHUNK_ROWS", 10)
+        infos = []
+        accepted = []
+        clock = FakeClock()
+        tracker = progress.Progress(infos.append, sheets=2, total=100, interval=2.5, clock=clock)
+        for row in tracker.rows(range(60), lambda: len(accepted)):
+            clock.now += 0.125
+            if row % 2:
+                accepted.append(row)
+        for row in tracker.rows(range(40)):
+            clock.now += 0.125
+        tracker.finish(len(accepted))
+
+        assert len(infos) == 6
+        assert [info.sheet for info in infos] == [1, 1, 1, 2, 2, 2]
+        assert infos[0].rows == 20 and infos[0].accepted == 10
+        assert infos[0].fraction == pytest.approx(0.2)
+        assert infos[0].rows_per_sec == pytest.approx(8)
+        assert infos[0].eta == pytest.approx(10)
+        last = infos[-1]
+        assert last.done and last.rows == 100 and last.accepted == 30 and last.fraction == 1.0
+        assert "Лист 2/2: 100 из 100 строк, отобрано 30" in str(last)
+
+    def test_tracker(self, capsys):
+        assert progress.tracker(None, []) is None
+
+        class Sheet:
+            def __init__(self, max_row):
+                self.max_row = max_row
+
+        assert progress.tracker(print, [Sheet(10), Sheet(5)]).total == 15
+        assert progress.tracker(print, [Sheet(10), Sheet(1)]).total is None
+
+        tracker = progress.tracker(progress.printer(), [Sheet(3)])
+        list(tracker.rows([1, 2, 3]))
+        tracker.finish(3)
+        assert "Лист 1/1: 3 из 3 строк, отобрано 3" in capsys.readouterr().err
@@ -0,0 +1,168 @@
+"""Тесты разбора выгрузки ЭМК."""
+import datetime
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import report_emk
+import report_writer
+
+
+def create_wide_emk_file(filepath):
+    """Столбцы ЭМК в другом порядке и лишние столбцы между ними."""
+    headings = list(report_emk.HEADINGS.values())
+    wb = Workbook()
+    sheet = wb.active
+    sheet.append(["lpu_name"])
+    sheet.append(
+        ["Наименование Медицинской организации", "Лишний 1"] + headings[8:] + ["Лишний 2"] + headings[:8])
+    for number, department in enumerate(["1025. Гинекология", "3001. Приемное отделение", "2001. Хирургия ДС"]):
+        date = datetime.datetime(2024, 5, 20 + number, 10)
+        values = [department, "Да", 5, 4, "Да", "опер", 1, 1, "Да"] + [number] * 8
+        sheet.append(
+            ["МОКБ", f"лишнее {number}"] + values + [f"лишнее {number}"]
+            + [f"КВС{number}", date, date, 40, "Да", "Нет", "Да", "РФ"])
+    wb.save(filepath)
+
+
+class TestEmkProjection:
+
+    def test_rows_in_headings_order(self, tmp_path):
+        filepath = str(tmp_path / "emk.xlsx")
+        create_wide_emk_file(filepath)
+
+        report = report_emk.EmkReport(filepath)
+        data = report.open_file_return_data()
+        assert [record[report.kvs_number] for record in data] == ["КВС0", "КВС2"]
+        assert all(len(record) == len(report_emk.HEADINGS) for record in data)
+        assert data[0][:9] == (
+            "КВС0", datetime.datetime(2024, 5, 20, 10), datetime.datetime(2024, 5, 20, 10),
+            40, "Да", "Нет", "Да", "РФ", "1025. Гинекология")
+        assert report_emk.EmkDataFromFile.title == list(report_emk.HEADINGS.values())
+        assert [getattr(report, name) for name in report_emk.COLUMN_ATTRIBUTES] == list(range(25))
+
+    def test_need_pdo(self, tmp_path):
+        filepath = str(tmp_path / "emk.xlsx")
+        create_wide_emk_file(filepath)
+
+        data = report_emk.EmkReport(filepath, need_pdo=True).open_file_return_data()
+        assert [record[8] for record in data][1] == "3001. Приемное отделение"
+        assert len(data) == 3
+
+    def test_indicator_uses_projected_title(self, tmp_path):
+        filepath = str(tmp_path / "emk.xlsx")
+        create_wide_emk_file(filepath)
+        report_emk.EmkReport(filepath).open_file_return_data()
+
+        lis = report_emk.LisIdentificator(report_emk.HEADINGS[17], report_emk.HEADINGS[18])
+        researches = lis.processing()
+        assert researches["Итого"] == [2, 2, 1.0]
+
+    def test_progress(self, tmp_path):
+        filepath = str(tmp_path / "emk.xlsx")
+        create_wide_emk_file(filepath)
+        infos = []
+        data = report_emk.EmkReport(filepath).open_file_return_data(infos.append)
+
+        assert infos[-1].done and infos[-1].rows == 5
+        assert infos[-1].accepted == len(data) == 2
+
+    def test_processing_report(self, tmp_path):
+        filepath = str(tmp_path / "emk.xlsx")
+        create_wide_emk_file(filepath)
+        report = report_emk.EmkReport(filepath)
+        data = report.open_file_return_data()
+
+        summary_kc, summary_dc, personal_kc, personal_dc = report.processing_report(data)
+        assert [row[0] for row in personal_kc[1:]] == ["КВС0"]
+        assert [row[0] for row in personal_dc[1:]] == ["КВС2"]
+        assert personal_kc[1][1:3] == ["20.05.2024", "20.05.2024"]
+        assert [personal_kc[1][index] for index in report_emk.PERSONAL_COUNT_COLUMNS] == [5, 4, 1, 1, 0, 0, 0, 0]
+        assert summary_kc["Не указаны перс.данные"] == {"1025. Гинекология": {"КВС0": 1}}
+        assert summary_dc["Не указаны перс.данные"] == {"2001. Хирургия ДС": {"КВС2": 1}}
+
+        summary_kc, summary_dc, personal_kc, personal_dc = report.processing_report(data, "22.05.2024")
+        assert len(personal_kc) == 1
+        assert [row[0] for row in personal_dc[1:]] == ["КВС2"]
+
+    def test_indicator_aggregator(self, tmp_path):
+        filepath = str(tmp_path / "emk.xlsx")
+        create_wide_emk_file(filepath)
+        report_emk.EmkReport(filepath).open_file_return_data()
+        pairs = [(17, 18), (19, 20), (21, 22)]
+
+        separately = [
+            report_emk.CheckIdentificator(report_emk.HEADINGS[a], report_emk.HEADINGS[b]).processing()
+            for a, b in pairs]
+        together = report_emk.IndicatorAggregator([
+            report_emk.CheckIdentificator(report_emk.HEADINGS[a], report_emk.HEADINGS[b])
+            for a, b in pairs]).processing()
+        assert together == separately
+        assert list(together[0]) == ["1025. Гинекология", "2001. Хирургия ДС", "Итого"]
+
+    def test_day_index(self, tmp_path):
+        filepath = str(tmp_path / "emk.xlsx")
+        create_wide_emk_file(filepath)
+        report = report_emk.EmkReport(filepath)
+        data = report.open_file_return_data()
+
+        table = report.table_for(data)
+        assert report.day_index(table) == {"20.05.2024": [0], "22.05.2024": [1]}
+        assert report.available_days() == [datetime.date(2024, 5, 20), datetime.date(2024, 5, 22)]
+
+        summary_kc, summary_dc, personal_kc, personal_dc = report.processing_report(data, "21.05.2024")
+        assert len(personal_kc) == len(personal_dc) == 1
+
+    def test_discharge_days(self, tmp_path):
+        filepath = str(tmp_path / "emk.xlsx")
+        create_wide_emk_file(filepath)
+        report_emk.EmkDataFromFile.data = loaded = [["строка другого отчета"]]
+        days = report_emk.EmkReport(filepath).discharge_days()
+        assert days == [datetime.date(2024, 5, 20), datetime.date(2024, 5, 22)]
+        # Данные отчета, который может идти в другом потоке, не заменены.
+        assert report_emk.EmkDataFromFile.data is loaded
+
+    def test_processing_by_days(self, tmp_path):
+        filepath = str(tmp_path / "emk.xlsx")
+        create_wide_emk_file(filepath)
+        report = report_emk.EmkReport(filepath)
+        data = report.open_file_return_data()
+
+        days = report.processing_by_days(data)
+        assert list(days) == ["20.05.2024", "22.05.2024"]
+        for day, datas in days.items():
+            assert datas == report.processing_report(data, day)
+
+    @pytest.mark.parametrize("separate_files, workers", [(False, None), (True, 1), (True, 2)])
+    def test_save_days(self, tmp_path, monkeypatch, separate_files, workers):
+        filepath = str(tmp_path / "emk.xlsx")
+        create_wide_emk_file(filepath)
+        report = report_emk.EmkReport(filepath)
+        data = report.open_file_return_data()
+        monkeypatch.chdir(tmp_path)
+
+        files = report.save_days(report.processing_by_days(data), separate_files, workers)
+        sheetnames = [load_workbook(file_name).sheetnames for file_name in files]
+        if separate_files:
+            assert [file_name.split(" на ")[0] for file_name in files] == ["Свод за 20.05.2024", "Свод за 22.05.2024"]
+            assert sheetnames[1] == ["Свод", "Наполнение КВС", "Свод ДС", "Наполнение КВС ДС"]
+        else:
+            assert len(files) == 1
+            assert sheetnames[0][:4] == [
+                "Свод 20.05.2024", "Наполнение КВС 20.05.2024", "Свод ДС 20.05.2024", "Наполнение КВС ДС 20.05.2024"]
+            assert len(sheetnames[0]) == 8
+
+    def test_conditional_formatting(self, tmp_path, monkeypatch):
+        filepath = str(tmp_path / "emk.xlsx")
+        create_wide_emk_file(filepath)
+        report = report_emk.EmkReport(filepath)
+        data = report.open_file_return_data()
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(report_writer, "CONDITIONAL_FORMATTING", True)
+
+        report.save_files(*report.processing_report(data), file_name="Свод.xlsx")
+        ws = load_workbook("Свод.xlsx")["Наполнение КВС"]
+        columns = {str(cf.sqref).split(":")[0] for cf in ws.conditional_formatting}
+        assert len(columns) == 9
+        assert all(column.endswith("2") for column in columns)
+        assert {cell.fill.fgColor.rgb for cell in ws[2]} == {"00000000"}
@@ -0,0 +1,177 @@
+"""Тесты локального сервиса отчетов."""
+import datetime
+import io
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+from openpyxl import Workbook
+
+import bunk_history
+import report_bunk_50
+import report_server
+from tests.test_morning_batch import header_months, write_export
+from tests.test_parallel_sheets import create_bunk_file, create_phone_file
+
+
+@pytest.fixture
+def server(tmp_path):
+    service = report_server.ReportService(str(tmp_path / "server"), workers=1)
+    server = report_server.create_server("127.0.0.1", 0, service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def wait(job):
+    for _ in range(100):
+        if job.future.done() and job.finished is not None:
+            return
+        time.sleep(0.1)
+
+
+def request(server, path, data=None):
+    host, port = server.server_address[:2]
+    with urllib.request.urlopen(f"http://{host}:{port}{path}", data=data, timeout=10) as response:
+        return response.status, response.headers, response.read()
+
+
+class TestReportServer:
+
+    def test_upload_and_download(self, server, tmp_path):
+        create_phone_file(tmp_path / "телефоны.xlsx")
+        data = (tmp_path / "телефоны.xlsx").read_bytes()
+        status, _, body = request(server, "/jobs?name=t.xlsx", data)
+        job = json.loads(body)
+        assert status == 202 and job["kind"] == "PhoneReport"
+
+        for _ in range(100):
+            job = json.loads(request(server, f"/jobs/{job['id']}")[2])
+            if job["status"] not in ("queued", "running"):
+                break
+            time.sleep(0.1)
+        assert job["status"] == "done" and len(job["files"]) == 1
+
+        status, headers, body = request(server, f"/jobs/{job['id']}/files/0")
+        assert status == 200 and body[:2] == b"PK"
+        assert headers["Content-Type"] == report_server.XLSX_TYPE
+        # Тот же файл - та же задача, отчет не формируется заново.
+        again = json.loads(request(server, "/jobs?kind=PhoneReport", data)[2])
+        assert again["id"] == job["id"]
+
+    def test_errors(self, server):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            request(server, "/jobs", b"not xlsx")
+        assert error.value.code == 400
+        with pytest.raises(urllib.error.HTTPError) as error:
+            request(server, "/jobs?kind=Unknown", b"not xlsx")
+        assert error.value.code == 400
+        with pytest.raises(urllib.error.HTTPError) as error:
+            request(server, "/jobs/nothing")
+        assert error.value.code == 404
+        assert b"EmkReport" in request(server, "/")[2]
+
+    def test_upload_in_chunks(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(report_server, "UPLOAD_CHUNK_SIZE", 3)
+        service = report_server.ReportService(str(tmp_path / "server"), workers=1)
+        try:
+            temp_path, digest = service.store_upload(io.BytesIO(b"0123456789"), 10)
+            with open(temp_path, "rb") as file:
+                assert file.read() == b"0123456789"
+            with pytest.raises(ValueError):
+                service.store_upload(io.BytesIO(b"01234"), 10)
+            assert os.listdir(tmp_path / "server" / "uploads") == [os.path.basename(temp_path)]
+        finally:
+            service.close()
+
+    def test_retention(self, tmp_path):
+        (tmp_path / "server" / "jobs" / "прошлый запуск").mkdir(parents=True)
+        now = [1000.0]
+        service = report_server.ReportService(str(tmp_path / "server"), workers=1, job_ttl=60, clock=lambda: now[0])
+        try:
+            assert os.listdir(tmp_path / "server" / "jobs") == []
+            create_phone_file(tmp_path / "телефоны.xlsx")
+            data = (tmp_path / "телефоны.xlsx").read_bytes()
+            job = service.submit(io.BytesIO(data), len(data), "PhoneReport")
+            wait(job)
+            assert job.status == "done"
+            # Загрузка удалена после отчета, отчеты доступны до истечения срока.
+            assert os.listdir(tmp_path / "server" / "uploads") == []
+            now[0] += 30
+            assert service.get(job.id) is job and os.listdir(job.out_dir)
+
+            now[0] += 31
+            assert service.get(job.id) is None
+            assert not os.path.exists(job.out_dir)
+            # Истекшая задача не возвращается для той же загрузки.
+            again = service.submit(io.BytesIO(data), len(data), "PhoneReport")
+            assert again.id != job.id
+            wait(again)
+        finally:
+            service.close()
+
+    def test_one_upload_for_two_reports(self, tmp_path, monkeypatch):
+        service = report_server.ReportService(str(tmp_path / "server"), workers=1)
+        replaced = []
+        original = os.replace
+        monkeypatch.setattr(report_server.os, "replace", lambda *args: replaced.append(args) or original(*args))
+        try:
+            create_phone_file(tmp_path / "телефоны.xlsx")
+            data = (tmp_path / "телефоны.xlsx").read_bytes()
+            first = service.submit(io.BytesIO(data), len(data), "PhoneReport")
+            second = service.submit(io.BytesIO(data), len(data), "OperationReport")
+            assert first.filepath == second.filepath
+            if not first.future.done():
+                # Пока первый отчет не готов, загрузка не заменяется и не удаляется.
+                assert len(replaced) == 1 and os.path.exists(first.filepath)
+            wait(first)
+            wait(second)
+            assert first.status == "done"
+            assert service.uploads == {} and os.listdir(tmp_path / "server" / "uploads") == []
+        finally:
+            service.close()
+
+    def test_period_of_each_upload(self, tmp_path):
+        # Один процесс формирует обе выгрузки по очереди.
+        service = report_server.ReportService(str(tmp_path / "server"), workers=1)
+        try:
+            jobs = []
+            for name, start in (("май", datetime.datetime(2024, 5, 20)), ("июль", datetime.datetime(2024, 7, 1))):
+                write_export("EmkReport", tmp_path / f"{name}.xlsx", start)
+                data = (tmp_path / f"{name}.xlsx").read_bytes()
+                jobs.append(service.submit(io.BytesIO(data), len(data), "EmkReport"))
+            for job, month in zip(jobs, ("05.2024", "07.2024")):
+                wait(job)
+                assert job.status == "done"
+                for filename in job.files:
+                    assert header_months(os.path.join(job.out_dir, filename)) == {month}
+        finally:
+            service.close()
+
+    def test_bunk_history_by_upload_name(self, tmp_path, monkeypatch, history_file):
+        # Файл коек ищется рядом с программой; процессы пула наследуют подмену (fork).
+        monkeypatch.setattr(report_bunk_50, "BASE_DIR", str(tmp_path))
+        wb = Workbook()
+        wb.active.append(["Отделение из отчета", "Количество коек"])
+        wb.active.append(["1025. Гинекологическое отделение", 50])
+        wb.save(tmp_path / "Отделения и койки.xlsx")
+        create_bunk_file(tmp_path / "койки.xlsx")
+        data = (tmp_path / "койки.xlsx").read_bytes()
+        service = report_server.ReportService(str(tmp_path / "server"), workers=1)
+        try:
+            # Загрузка хранится под хэшем, дата выгрузки - из исходного имени.
+            job = service.submit(io.BytesIO(data), len(data), "BunkReport", "1716188400_hosp_EvnSection_List_pg.xlsx")
+            wait(job)
+        finally:
+            service.close()
+        assert job.status == "done"
+        day = datetime.date.fromtimestamp(1716188400)
+        assert [row.department for row in bunk_history.BunkHistory(history_file).period(day, day)] == [
+            "1025. Гинекологическое отделение"]
@@ -0,0 +1,93 @@
+"""Тесты потоковой записи отчетов."""
+import datetime
+
+from openpyxl import load_workbook
+from openpyxl.styles import Font, PatternFill
+
+import report_styles
+from report_writer import ReportBook, Style
+
+BOLD = Style(font=Font(bold=True))
+RED = Style(fill=PatternFill(patternType="solid", fgColor="FF0000"))
+
+
+class TestReportWriter:
+
+    def test_values_and_styles(self, tmp_path):
+        filepath = str(tmp_path / "report.xlsx")
+        book = ReportBook()
+        sheet = book.create_sheet("Лист", {"A": 40})
+        sheet.append(["Отделение", "Число"], BOLD)
+        sheet.append(["Хирургия", -1], [None, BOLD + RED])
+        sheet.append(["Терапия", None, datetime.datetime(2024, 5, 20, 10)], [None, RED, BOLD])
+        sheet.auto_filter()
+        sheet.merge("D1:E1")
+        book.save(filepath)
+
+        ws = load_workbook(filepath)["Лист"]
+        assert [[cell.value for cell in row] for row in ws.iter_rows(max_col=3)] == [
+            ["Отделение", "Число", None],
+            ["Хирургия", -1, None],
+            ["Терапия", None, datetime.datetime(2024, 5, 20, 10)],
+        ]
+        assert ws["A1"].font.b and not ws["A2"].font.b
+        assert ws["B2"].font.b and ws["B2"].fill.fgColor.rgb == "00FF0000"
+        assert ws["B3"].fill.fgColor.rgb == "00FF0000"
+        assert ws["C3"].font.b and ws["C3"].number_format == "yyyy-mm-dd h:mm:ss"
+        assert ws.column_dimensions["A"].width == 40
+        assert ws.auto_filter.ref == "A1:C3"
+        assert [str(ref) for ref in ws.merged_cells.ranges] == ["D1:E1"]
+
+    def test_style_registered_once(self, tmp_path):
+        book = ReportBook()
+        sheet = book.create_sheet("Лист")
+        for number in range(10):
+            sheet.append([number, number], BOLD)
+        book.save(str(tmp_path / "report.xlsx"))
+        assert len(book.style_arrays) == 1
+        assert sheet.dimensions == "A1:B10"
+
+    def test_grid(self, tmp_path):
+        filepath = str(tmp_path / "report.xlsx")
+        book = ReportBook()
+        sheet = book.create_sheet("Свод")
+        sheet.append_grid({(1, 1): ("Свод", BOLD), (2, 3): (5, None)})
+        book.save(filepath)
+
+        ws = load_workbook(filepath)["Свод"]
+        assert [[cell.value for cell in row] for row in ws.iter_rows()] == [["Свод", None, None], [None, None, 5]]
+        assert sheet.dimensions == "A1:C2"
+
+    def test_conditional_rules(self, tmp_path):
+        filepath = str(tmp_path / "report.xlsx")
+        book = ReportBook(conditional_formatting=True)
+        sheet = book.create_sheet("Лист")
+        sheet.append(["Нужно", "Сделано"], BOLD)
+        sheet.add_rule(1, "{0}<{1}", RED, 0)
+        sheet.append_rows([[2, 1], [1, 1]])
+        sheet.add_rule(1, "--{0}<--{1}", RED, 0)
+        book.save(filepath)
+
+        ws = load_workbook(filepath)["Лист"]
+        rules = [(str(cf.sqref), rule.formula) for cf in ws.conditional_formatting for rule in cf.rules]
+        assert sheet.conditional_formatting
+        assert rules == [("B2:B3", ["--B2<--A2"])]
+        assert ws["B2"].fill.fgColor.rgb != "00FF0000"
+
+
+class TestReportStyles:
+
+    def test_shared_styles(self, tmp_path):
+        book = ReportBook()
+        for title in ("КС", "ДС"):
+            sheet = book.create_sheet(title)
+            sheet.append(["Отделение", "Процент"], report_styles.HEADER)
+            for value in (0.5, 0.95):
+                sheet.append(["Хирургия", value], [report_styles.BORDERED, report_styles.percent(value, 0.90)])
+        book.save(str(tmp_path / "report.xlsx"))
+        assert len(book.style_arrays) == 4
+
+    def test_flag(self):
+        assert report_styles.flag(True) is report_styles.GREEN_OK
+        assert report_styles.flag(False) is report_styles.RED_FLAG
+        assert report_styles.percent("0.8", 0.80) is report_styles.PERCENT_GREEN
@@ -0,0 +1,58 @@
+"""Тесты замеров отчетов."""
+from benchmarks import run_benchmarks
+
+
+def record(report, stage, seconds, parent=None, rss=50.0):
+    return {"report": report, "stage": stage, "parent": parent, "seconds": seconds, "process_peak_rss_mb": rss}
+
+
+class TestRunBenchmarks:
+
+    def test_phases(self):
+        records = [
+            record("PhoneReport", "load_workbook", 0.5, "open_file_return_data"),
+            record("PhoneReport", "open_file_return_data", 1.0),
+            record("PhoneReport", "wb.save", 0.25, "processing_and_save", rss=70.0),
+            record("PhoneReport", "processing_and_save", 1.0, rss=70.0),
+            record("EmkReport", "wb.save", 0.5, "save_files"),
+            record("EmkReport", "save_files", 2.0),
+        ]
+        assert run_benchmarks.phases(records) == {
+            "PhoneReport": {
+                "ingest": {"seconds": 1.0, "peak_rss_mb": 50.0},
+                "process": {"seconds": 0.75, "peak_rss_mb": 70.0},
+                "write": {"seconds": 0.25, "peak_rss_mb": 70.0},
+            },
+            "EmkReport": {"write": {"seconds": 2.0, "peak_rss_mb": 50.0}},
+        }
+
+    def test_compare(self):
+        def results(seconds, rss):
+            return {"results": {"BunkReport": {"1000": {"ingest": {"seconds": seconds, "peak_rss_mb": rss}}}}}
+
+        baseline = results(1.0, 100.0)
+        assert run_benchmarks.compare(results(1.2, 110.0), baseline) == []
+        assert len(run_benchmarks.compare(results(1.5, 100.0), baseline)) == 1
+        assert len(run_benchmarks.compare(results(1.5, 200.0), baseline)) == 2
+        # Малые абсолютные разницы - шум.
+        assert run_benchmarks.compare(results(0.02, 1.0), results(0.01, 1.0)) == []
+        assert run_benchmarks.compare(results(1.5, 100.0), {"results": {}}) == []
+
+    def test_run(self, tmp_path):
+        current = run_benchmarks.run([50], ["PhoneReport"], repeat=1, data_dir=str(tmp_path))
+        phases = current["results"]["PhoneReport"]["50"]
+        assert sorted(phases) == ["ingest", "process", "write"]
+        assert all(values["seconds"] >= 0 and values["peak_rss_mb"] for values in phases.values())
+        assert run_benchmarks.compare(current, current) == []
+        assert "PhoneReport" in run_benchmarks.table(current)
+
+    def test_main_without_baseline(self, tmp_path, monkeypatch):
+        current = {"results": {"PhoneReport": {"50": {"ingest": {"seconds": 1.0, "peak_rss_mb": 50.0, "rows_per_sec": 50}}}}}
+        monkeypatch.setattr(run_benchmarks, "run", lambda *args: current)
+        missing = str(tmp_path / "baseline.json")
+        assert run_benchmarks.main(["--baseline", missing]) == 0
+        assert run_benchmarks.main(["--baseline", missing, "--require-baseline"]) == 2
+        assert run_benchmarks.main(["--baseline", missing, "--save-baseline"]) == 0
+        assert run_benchmarks.main(["--baseline", missing, "--require-baseline"]) == 0
+        current["results"]["PhoneReport"]["50"]["ingest"]["seconds"] = 2.0
+        assert run_benchmarks.main(["--baseline", missing, "--require-baseline"]) == 1
@@ -0,0 +1,43 @@
+"""Тесты генератора синтетических выгрузок."""
+import openpyxl
+
+import morning_batch
+import report_bunk_50
+from benchmarks import synthetic_exports
+
+
+def read_rows(filepath):
+    wb = openpyxl.load_workbook(filepath, read_only=True)
+    rows = [row for sheet in wb.worksheets for row in sheet.iter_rows(values_only=True)]
+    wb.close()
+    return rows
+
+
+class TestSyntheticExports:
+
+    def test_sheet_sizes(self, monkeypatch):
+        assert synthetic_exports.sheet_sizes(10, 3) == [4, 3, 3]
+        monkeypatch.setattr(synthetic_exports, "MAX_SHEET_ROWS", 4)
+        assert synthetic_exports.sheet_sizes(10, 1) == [4, 3, 3]
+
+    def test_same_seed_same_file(self, tmp_path):
+        options = synthetic_exports.ExportOptions(rows=50, departments=5, dirty=0.2, sheets=2)
+        synthetic_exports.write_bunk(str(tmp_path / "1.xlsx"), options)
+        synthetic_exports.write_bunk(str(tmp_path / "2.xlsx"), options)
+        synthetic_exports.write_bunk(str(tmp_path / "3.xlsx"), options._replace(seed=2))
+        first = read_rows(tmp_path / "1.xlsx")
+        assert len(first) == 50 + 2 * 3
+        assert first == read_rows(tmp_path / "2.xlsx") != read_rows(tmp_path / "3.xlsx")
+
+    def test_reports(self, tmp_path, monkeypatch):
+        directory = tmp_path / "выгрузки"
+        options = synthetic_exports.ExportOptions(rows=300, departments=15, dirty=0.1, sheets=2)
+        paths = synthetic_exports.write_all(str(directory), options)
+        # Файл коек ищется рядом с программой; процессы пула наследуют подмену (fork).
+        monkeypatch.setattr(report_bunk_50, "BASE_DIR", str(directory))
+
+        jobs = morning_batch.find_jobs(str(directory))
+        assert sorted(jobs) == sorted(zip(synthetic_exports.WRITERS, paths))
+        results = morning_batch.run_batch(jobs, str(tmp_path / "отчеты"), workers=2)
+        assert [(result.kind, result.error) for result in results] == [(kind, None) for kind, _ in jobs]
+        assert all(result.files for result in results)
@@ -0,0 +1,108 @@
+"""Тесты наблюдения за папкой выгрузок."""
+import datetime
+import os
+
+import pytest
+
+import watch_folder
+from tests.test_morning_batch import header_months, write_export
+from tests.test_parallel_sheets import create_phone_file
+from tests.test_progress import FakeClock
+
+
+class TestFolderWatcher:
+
+    @pytest.fixture
+    def watcher(self, tmp_path):
+        directory = tmp_path / "выгрузки"
+        directory.mkdir()
+        (directory / "старая.xlsx").write_bytes(b"")
+        watcher = watch_folder.FolderWatcher(
+            str(directory), str(tmp_path / "отчеты"), workers=1, settle=10, clock=FakeClock())
+        yield watcher
+        watcher.close()
+
+    def test_route(self, tmp_path):
+        assert watch_folder.route("/x/1696599179_hosp_EvnSection_List_pg.xlsx") == "BunkReport"
+        filepath = tmp_path / "телефоны.xlsx"
+        create_phone_file(filepath)
+        assert watch_folder.route(str(filepath)) == "PhoneReport"
+
+    def test_scan_waits_for_complete_file(self, watcher):
+        filepath = os.path.join(watcher.directory, "1696599142_han_evnps_timelist_new_pg.xlsx")
+        with open(filepath, "wb") as file:
+            file.write(b"PK\x03\x04")
+        assert watcher.scan() == []
+        watcher.clock.now += 20
+        # Размер не менялся, но архив не дописан.
+        assert watcher.scan() == []
+
+        create_phone_file(filepath)
+        assert watcher.scan() == []
+        watcher.clock.now += 5
+        assert watcher.scan() == []
+        watcher.clock.now += 5
+        assert watcher.scan() == [filepath]
+        watcher.clock.now += 20
+        assert watcher.scan() == []
+
+    def test_poll(self, watcher, tmp_path):
+        filepath = os.path.join(watcher.directory, "телефоны.xlsx")
+        create_phone_file(filepath)
+        assert watcher.poll() == []
+        watcher.clock.now += 10
+        assert watcher.poll() == [("PhoneReport", filepath)]
+        results = watcher.wait()
+        assert len(results) == 1 and results[0].error is None
+        assert os.listdir(tmp_path / "отчеты") == results[0].files
+        assert watcher.poll() == []
+
+    def test_same_kind_together(self, tmp_path):
+        directory = tmp_path / "выгрузки"
+        directory.mkdir()
+        watcher = watch_folder.FolderWatcher(
+            str(directory), str(tmp_path / "отчеты"), workers=2, settle=10, clock=FakeClock())
+        try:
+            for name in ("1696599142_han_evnps_timelist_new_pg.xlsx", "1696599143_han_evnps_timelist_new_pg.xlsx"):
+                create_phone_file(directory / name)
+            watcher.poll()
+            watcher.clock.now += 10
+            assert [kind for kind, _ in watcher.poll()] == ["PhoneReport", "PhoneReport"]
+            results = watcher.wait()
+        finally:
+            watcher.close()
+        assert [result.error for result in results] == [None, None]
+        files = sorted(results[0].files + results[1].files)
+        assert len(set(files)) == 2 and sorted(os.listdir(tmp_path / "отчеты")) == files
+
+    def test_forget_removed_files(self, watcher):
+        filepath = os.path.join(watcher.directory, "телефоны.xlsx")
+        create_phone_file(filepath)
+        watcher.scan()
+        watcher.clock.now += 10
+        assert watcher.scan() == [filepath]
+        assert len(watcher.handled) == 2
+        os.remove(filepath)
+        os.remove(os.path.join(watcher.directory, "старая.xlsx"))
+        assert watcher.scan() == [] and watcher.handled == set()
+
+    def test_period_of_each_export(self, tmp_path):
+        # Один процесс пула формирует обе выгрузки по очереди.
+        directory = tmp_path / "выгрузки"
+        directory.mkdir()
+        watcher = watch_folder.FolderWatcher(
+            str(directory), str(tmp_path / "отчеты"), workers=1, settle=10, clock=FakeClock())
+        try:
+            results = []
+            for name, start in (("май", datetime.datetime(2024, 5, 20)), ("июль", datetime.datetime(2024, 7, 1))):
+                write_export("EmkReport", directory / f"{name}.xlsx", start)
+                watcher.poll()
+                watcher.clock.now += 10
+                assert [kind for kind, _ in watcher.poll()] == ["EmkReport"]
+                results.extend(watcher.wait())
+        finally:
+            watcher.close()
+        for result, month in zip(results, ("05.2024", "07.2024")):
+            assert result.error is None
+            for filename in result.files:
+                assert header_months(tmp_path / "отчеты" / filename) == {month}
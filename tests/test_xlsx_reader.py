@@ -0,0 +1,165 @@
+"""Тесты потокового чтения xlsx. Результат должен совпадать с openpyxl."""
+import datetime
+import zipfile
+
+import openpyxl
+from openpyxl import Workbook
+
+import xlsx_reader
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '</Types>'
+)
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<x:workbook xmlns:x="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<x:sheets><x:sheet name="Лист1" sheetId="1" r:id="rId1"/></x:sheets></x:workbook>'
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>'
+    '</Relationships>'
+)
+SHARED_STRINGS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<x:sst xmlns:x="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<x:si><x:t>Номер КВС</x:t></x:si>'
+    '<x:si><x:r><x:t>Кол-во \n</x:t></x:r><x:r><x:rPr><x:b/></x:rPr><x:t>к/дней</x:t></x:r></x:si>'
+    '<x:si><x:t>Отделение &amp; ДС</x:t></x:si>'
+    '</x:sst>'
+)
+SHEET = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<x:worksheet xmlns:x="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<x:sheetData>'
+    '<x:row r="1"><x:c r="A1" t="s"><x:v>0</x:v></x:c><x:c r="C1" t="s"><x:v>1</x:v></x:c></x:row>'
+    '<x:row r="2"/>'
+    '<x:row r="4"><x:c r="A4"><x:v>12</x:v></x:c><x:c r="B4" t="str"><x:f>A4&amp;"x"</x:f>'
+    '<x:v>12 &lt;x&gt;</x:v></x:c><x:c r="C4" t="s"><x:v>2</x:v></x:c></x:row>'
+    '<x:row><x:c><x:v>1.5</x:v></x:c><x:c t="b"><x:v>1</x:v></x:c></x:row>'
+    '</x:sheetData></x:worksheet>'
+)
+
+
+def read_openpyxl(filepath) -> dict:
+    # openpyxl отдает пропущенные строки списком, а не кортежем.
+    wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        return {
+            name: [tuple(row) for row in wb[name].iter_rows(values_only=True)]
+            for name in wb.sheetnames}
+    finally:
+        wb.close()
+
+
+def read_stream(filepath) -> dict:
+    with xlsx_reader.XlsxReader(filepath) as wb:
+        return {name: list(wb[name].iter_rows(values_only=True)) for name in wb.sheetnames}
+
+
+class TestXlsxReader:
+
+    def test_same_as_openpyxl(self, tmp_path):
+        filepath = tmp_path / "book.xlsx"
+        wb = Workbook()
+        sheet = wb.active
+        sheet.title = "Данные"
+        sheet.append(["lpu_name"])
+        sheet.append([])
+        sheet.append(["Наименование Медицинской организации", "Номер КВС", None, "Отделение & <ДС>"])
+        for number in range(50):
+            sheet.append([
+                "МОКБ",
+                number,
+                number / 3,
+                datetime.datetime(2024, 5, 20, 10, 30) + datetime.timedelta(hours=number),
+                number % 2 == 0,
+                None,
+                "  пробелы  ",
+            ])
+        sheet["K70"] = "далеко"
+        second = wb.create_sheet("Второй")
+        second.append([1, "2"])
+        wb.create_sheet("Пустой")
+        wb.save(filepath)
+
+        assert read_stream(filepath) == read_openpyxl(filepath)
+
+    def test_durations_as_openpyxl(self, tmp_path):
+        filepath = tmp_path / "book.xlsx"
+        wb = Workbook()
+        sheet = wb.active
+        sheet.append([datetime.timedelta(hours=30, minutes=5), 0.25, 0.25, datetime.time(10, 30), 1.5])
+        sheet["B1"].number_format = "[mm]:ss"
+        sheet["C1"].number_format = "h:mm"
+        sheet["E1"].number_format = "[h]:mm:ss"
+        wb.save(filepath)
+
+        rows = read_stream(filepath)
+        assert rows == read_openpyxl(filepath)
+        assert rows["Sheet"][0][:2] == (datetime.datetime(1900, 1, 1, 6, 5), datetime.time(6, 0))
+
+    def test_fallback_while_reading_rows(self, tmp_path, monkeypatch):
+        filepath = tmp_path / "book.xlsx"
+        wb = Workbook()
+        for number in range(10):
+            wb.active.append([number, f"строка {number}"])
+        wb.save(filepath)
+        row_from_text = xlsx_reader.XlsxReader.row_from_text
+
+        def broken(self, body, *args):
+            if ">5<" in body:
+                raise xlsx_reader.XlsxReadError("неожиданная структура строки")
+            return row_from_text(self, body, *args)
+
+        # Общие строки в теле строки не видны, поэтому ломается шестая строка (число 5).
+        monkeypatch.setattr(xlsx_reader.XlsxReader, "row_from_text", broken)
+        book = xlsx_reader.load_workbook(filepath)
+        try:
+            assert list(book.active.iter_rows(values_only=True)) == read_openpyxl(filepath)["Sheet"]
+        finally:
+            book.close()
+
+    def test_shared_strings_and_prefixes(self, tmp_path):
+        filepath = tmp_path / "his.xlsx"
+        with zipfile.ZipFile(filepath, "w") as archive:
+            archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+            archive.writestr("_rels/.rels", ROOT_RELS)
+            archive.writestr("xl/workbook.xml", WORKBOOK)
+            archive.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+            archive.writestr("xl/sharedStrings.xml", SHARED_STRINGS)
+            archive.writestr("xl/worksheets/sheet1.xml", SHEET)
+
+        rows = read_stream(filepath)
+        assert rows == read_openpyxl(filepath)
+        assert rows["Лист1"][0] == ("Номер КВС", None, "Кол-во \nк/дней")
+        assert rows["Лист1"][3] == (12, "12 <x>", "Отделение & ДС")
+
+    def test_workbook_interface(self, tmp_path):
+        filepath = tmp_path / "book.xlsx"
+        wb = Workbook()
+        wb.create_sheet("Второй")
+        wb.active = 1
+        wb.save(filepath)
+
+        book = xlsx_reader.load_workbook(filepath)
+        assert isinstance(book, xlsx_reader.XlsxReader)
+        assert book.sheetnames == ["Sheet", "Второй"]
+        assert book.active.title == "Второй"
+        book.close()
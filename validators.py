@@ -1,30 +1,11 @@
 """Валидаторы для внутренних функций."""
-import datetime
-import os
-import sys
-
-if getattr(sys, "frozen", False):
-    BASE_DIR = os.path.dirname(sys.executable)
-elif __file__:
-    BASE_DIR = os.path.dirname(__file__)
+from error_log import log_any_error
 
 
 class ValidateError(Exception):
     pass
 
 
-def now():
-    return datetime.datetime.now().strftime("%d.%m %H_%M_%S")
-
-
-def log_any_error(any_text):
-    """Функция для записи ошибок в файл."""
-    log = open(rf"{BASE_DIR}\log_any_error.txt", "a+")
-    text = str(any_text)
-    print(f"[{now()}] {text}", file=log)
-    log.close()
-
-
 def validate_column_with_data(row: list, expected_values: int) -> bool:
     """Пропускает строку, если количество "None" в списке/строке больше ожидаемого."""
     count_values = len(row) - row.count(None)
@@ -80,18 +61,15 @@ def validate_bunks_from_file(value, department, BUNKS):
 
 
 def validate_for_title(target_values: list, row: list):
-    """Является ли строка заголовком."""
-    if len(target_values) == 1:
-        search = target_values[0].upper()
-        if search in set([element.upper() if type(element) is str else element for element in row if element is not None]):
-            return True
-        return False
-    
-    values = [value.upper() if type(value) is str else value for value in target_values]
-    for value in values:
-        if value in set([element.upper() if type(element) is str else element for element in row if element is not None]):
-            return True
+    """Является ли строка заголовком. Проверяется первое искомое значение."""
+    search = target_values[0]
+    if type(search) is str:
+        search = search.upper()
+        for element in row:
+            if type(element) is str and element.upper() == search:
+                return True
         return False
+    return any(element is not None and element == search for element in row)
 
 
 def validate_numbers(row: list):
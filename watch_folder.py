@@ -0,0 +1,220 @@
+"""Наблюдение за папкой выгрузок: новые файлы обрабатываются сами.
+
+Папка опрашивается раз в POLL_SECONDS секунд (без внешних зависимостей,
+работает и на сетевых дисках). Файл берется в работу, когда его размер и время
+изменения не меняются SETTLE_SECONDS секунд и он читается как zip-архив, то есть
+выгрузка дописана до конца. Вид отчета определяется по имени выгрузки МИС
+(NAME_PATTERNS), а для прочих имен - по заголовкам, как в morning_batch.
+Отчеты формируются в отдельных процессах и сохраняются в "Отчеты дд.мм.гггг".
+
+    python watch_folder.py <папка> [--out папка] [--workers N] [--existing]
+"""
+import argparse
+import datetime
+import fnmatch
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+import morning_batch
+from error_log import log_any_error
+
+# Период опроса папки, с.
+POLL_SECONDS = 5.0
+# Сколько секунд файл не должен меняться, чтобы считаться записанным.
+SETTLE_SECONDS = 10.0
+# Сколько отчетов может формироваться одновременно.
+WORKERS = 2
+# Имя выгрузки МИС -> вид отчета. Остальные файлы определяются по заголовкам.
+NAME_PATTERNS = (
+    ("*_hosp_EvnSection_List_pg.xlsx", "BunkReport"),
+    ("*_han_evnps_timelist_new_pg.xlsx", "PhoneReport"),
+    ("*_pan_SpisokDirection_Usluga_pg.xlsx", "ServicesReport"),
+)
+
+
+def route(filepath: str) -> Optional[str]:
+    """Вид отчета по имени выгрузки, иначе по заголовкам. None - не выгрузка."""
+    filename = os.path.basename(filepath)
+    for pattern, kind in NAME_PATTERNS:
+        if fnmatch.fnmatch(filename, pattern):
+            return kind
+    return morning_batch.detect_kind(filepath)
+
+
+def is_complete(filepath: str) -> bool:
+    """Выгрузка дописана: архив xlsx читается целиком (оглавление в конце файла)."""
+    try:
+        with zipfile.ZipFile(filepath) as archive:
+            return "[Content_Types].xml" in archive.namelist()
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def log(text: str):
+    print(f"{datetime.datetime.now():%H:%M:%S} {text}", file=sys.stderr, flush=True)
+
+
+class FolderWatcher:
+    """Опрос папки и запуск отчетов по новым выгрузкам.
+
+    out_dir - папка отчетов; по умолчанию "Отчеты дд.мм.гггг" в наблюдаемой
+    папке на дату обработки. existing - обработать и файлы, лежавшие в папке до запуска.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        out_dir: str = None,
+        workers: int = None,
+        existing: bool = False,
+        settle: float = None,
+        clock: Callable[[], float] = time.monotonic):
+        self.directory = os.path.abspath(directory)
+        self.out_dir = out_dir
+        self.workers = workers or WORKERS
+        self.settle = SETTLE_SECONDS if settle is None else settle
+        self.clock = clock
+        # Путь -> (размер, время изменения, с какого момента не меняется).
+        self.pending = {}
+        # (путь, размер, время изменения) уже обработанных или пропущенных выгрузок,
+        # которые еще лежат в папке.
+        self.handled = set()
+        self.executor = None
+        # Future -> путь выгрузки.
+        self.running = {}
+        if not existing:
+            for filepath, stat in self.listing():
+                self.handled.add((filepath, stat.st_size, stat.st_mtime))
+
+    def listing(self) -> list:
+        """(путь, os.stat) для xlsx-файлов папки, без временных файлов Excel."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith("~$") or not entry.name.lower().endswith(".xlsx"):
+                continue
+            try:
+                if entry.is_file():
+                    files.append((entry.path, entry.stat()))
+            except OSError:
+                continue
+        return sorted(files)
+
+    def scan(self) -> List[str]:
+        """Выгрузки, которые дописаны и еще не обработаны."""
+        now = self.clock()
+        ready = []
+        present = set()
+        keys = set()
+        for filepath, stat in self.listing():
+            present.add(filepath)
+            key = (filepath, stat.st_size, stat.st_mtime)
+            keys.add(key)
+            if key in self.handled:
+                self.pending.pop(filepath, None)
+                continue
+            size, mtime, since = self.pending.get(filepath, (None, None, now))
+            if (size, mtime) != (stat.st_size, stat.st_mtime):
+                self.pending[filepath] = (stat.st_size, stat.st_mtime, now)
+                continue
+            if now - since < self.settle or not is_complete(filepath):
+                continue
+            del self.pending[filepath]
+            self.handled.add(key)
+            ready.append(filepath)
+        for filepath in set(self.pending) - present:
+            del self.pending[filepath]
+        # Удаленные и измененные файлы забываются, иначе множество растет все время работы.
+        self.handled &= keys
+        return ready
+
+    def output_dir(self) -> str:
+        if self.out_dir is not None:
+            return os.path.abspath(self.out_dir)
+        return os.path.join(self.directory, f"Отчеты {datetime.date.today().strftime('%d.%m.%Y')}")
+
+    def poll(self) -> list:
+        """Один опрос: запускает отчеты по новым выгрузкам. Возвращает [(вид, путь)]."""
+        self.collect()
+        started = []
+        for filepath in self.scan():
+            try:
+                kind = route(filepath)
+            except Exception as e:
+                log_any_error(f'[ERR] Не удалось прочитать "{filepath}" при определении отчета. \n{e}')
+                kind = None
+            if kind is None:
+                log(f"Пропущен (неизвестная выгрузка): {os.path.basename(filepath)}")
+                continue
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            out_dir = self.output_dir()
+            os.makedirs(out_dir, exist_ok=True)
+            future = self.executor.submit(morning_batch.run_job, kind, filepath, out_dir)
+            self.running[future] = filepath
+            log(f"{kind}: начат {os.path.basename(filepath)}")
+            started.append((kind, filepath))
+        return started
+
+    def collect(self) -> list:
+        """Итоги завершившихся отчетов (morning_batch.JobResult)."""
+        results = []
+        for future in [future for future in self.running if future.done()]:
+            filepath = self.running.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                log_any_error(f'[ERR] Наблюдение за папкой, "{filepath}": \n{e}')
+                log(f"Ошибка процесса: {os.path.basename(filepath)}: {e}")
+                continue
+            if result.error is None:
+                log(f"{result.kind}: готово за {result.seconds:.1f} с: {', '.join(result.files)}")
+            else:
+                log(f"{result.kind}: ошибка {result.error}")
+            results.append(result)
+        return results
+
+    def wait(self) -> list:
+        """Ждет завершения запущенных отчетов."""
+        for future in list(self.running):
+            future.exception()
+        return self.collect()
+
+    def run(self, interval: float = None):
+        """Опрашивает папку до Ctrl+C."""
+        interval = POLL_SECONDS if interval is None else interval
+        log(f"Наблюдение за {self.directory}")
+        try:
+            while True:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            log("Остановка: ожидание запущенных отчетов...")
+            self.wait()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Обработка новых выгрузок в папке.")
+    parser.add_argument("directory", help="папка, куда сохраняются выгрузки")
+    parser.add_argument("--out", help='папка для отчетов, по умолчанию "Отчеты дд.мм.гггг" в наблюдаемой папке')
+    parser.add_argument("--workers", type=int, help=f"отчетов одновременно, по умолчанию {WORKERS}")
+    parser.add_argument("--existing", action="store_true", help="обработать и уже лежащие в папке файлы")
+    parser.add_argument("--interval", type=float, help=f"период опроса, с, по умолчанию {POLL_SECONDS}")
+    args = parser.parse_args(argv)
+    FolderWatcher(args.directory, args.out, args.workers, args.existing).run(args.interval)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,509 @@
+"""Потоковое чтение xlsx без создания объектов ячеек openpyxl.
+
+Значения совпадают с openpyxl.load_workbook(read_only=True, data_only=True).
+Если книгу не удалось открыть - она открывается через openpyxl; если лист
+не удалось дочитать - оставшиеся строки листа читаются через openpyxl.
+"""
+import posixpath
+import re
+import zipfile
+from html import unescape
+from xml.etree.ElementTree import XML, ParseError, iterparse
+
+import openpyxl
+from openpyxl.styles.numbers import BUILTIN_FORMATS, BUILTIN_FORMATS_MAX_SIZE, is_date_format
+from openpyxl.utils.datetime import (
+    CALENDAR_MAC_1904,
+    CALENDAR_WINDOWS_1900,
+    from_excel,
+    from_ISO8601)
+
+from error_log import log_any_error
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+ROW_TAG = f"{MAIN_NS}row"
+CELL_TAG = f"{MAIN_NS}c"
+VALUE_TAG = f"{MAIN_NS}v"
+INLINE_TAG = f"{MAIN_NS}is"
+TEXT_TAG = f"{MAIN_NS}t"
+RUN_TAG = f"{MAIN_NS}r"
+SHARED_STRING_TAG = f"{MAIN_NS}si"
+DIMENSION_TAG = f"{MAIN_NS}dimension"
+SHEET_DATA_TAG = f"{MAIN_NS}sheetData"
+
+ROOT_RE = re.compile(rb"<([A-Za-z_][\w.:-]*)(?:\s[^>]*)?>")
+ROW_NUMBER_RE = re.compile(r'\br="(\d+)"')
+SHEET_DATA_RE = re.compile(rb"<((?:[A-Za-z_][\w.-]*:)?)sheetData\b[^>]*?(/?)>")
+CHUNK_SIZE = 1024 * 1024
+
+OFFICE_DOCUMENT = "officeDocument"
+SHARED_STRINGS = "sharedStrings"
+STYLES = "styles"
+
+
+class XlsxReadError(Exception):
+    pass
+
+
+def column_index(letters: str) -> int:
+    """Переводит буквы столбца (A, B, ..., AA) в номер, начиная с 1."""
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - 64
+    return index
+
+
+def split_coordinate(coordinate: str):
+    """Делит координату 'AB12' на номер столбца и номер строки."""
+    for position, char in enumerate(coordinate):
+        if char.isdigit():
+            return column_index(coordinate[:position]), int(coordinate[position:])
+    return column_index(coordinate), None
+
+
+def text_content(element) -> str:
+    """Текст строки без форматирования (обычный текст и все runs)."""
+    snippets = []
+    for child in element:
+        if child.tag == TEXT_TAG:
+            snippets.append(child.text or "")
+        elif child.tag == RUN_TAG:
+            text = child.find(TEXT_TAG)
+            if text is not None:
+                snippets.append(text.text or "")
+    return "".join(snippets)
+
+
+class XlsxSheet:
+    """Лист книги. Повторяет iter_rows(values_only=True) из openpyxl."""
+
+    def __init__(self, reader, title: str, path: str):
+        self.reader = reader
+        self.title = title
+        self.path = path
+        self._dimensions = False
+
+    def __repr__(self):
+        return f'<XlsxSheet "{self.title}">'
+
+    @property
+    def dimensions(self):
+        """Границы листа из тега dimension: (min_col, min_row, max_col, max_row)."""
+        if self._dimensions is False:
+            self._dimensions = self.reader.read_dimensions(self.path)
+        return self._dimensions
+
+    @property
+    def max_row(self):
+        return self.dimensions[3] if self.dimensions else None
+
+    @property
+    def max_column(self):
+        return self.dimensions[2] if self.dimensions else None
+
+    def iter_rows(self, values_only: bool = True):
+        """Отдает строки листа кортежами значений."""
+        if not values_only:
+            raise XlsxReadError("Потоковое чтение отдает только значения ячеек.")
+        return self.rows_with_fallback()
+
+    def rows_with_fallback(self):
+        """Строки листа; если разбор оборвался, остаток листа читается через openpyxl."""
+        count = 0
+        try:
+            for row in self.reader.iter_sheet_rows(self.path, self.max_column):
+                yield row
+                count += 1
+        except (XlsxReadError, ParseError, KeyError, IndexError, ValueError, zipfile.BadZipFile) as e:
+            log_any_error(
+                f"[ERR] Лист {self.title} файла {self.reader.filepath} не разобран потоково "
+                f"после строки {count}, дочитывается через openpyxl. \n{e}")
+            yield from self.reader.openpyxl_rows(self.title, count)
+
+
+class XlsxReader:
+    """Книга xlsx, которая читается напрямую из zip архива."""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._archive = zipfile.ZipFile(filepath)
+        try:
+            self._names = set(self._archive.namelist())
+            workbook_path = self._find_workbook()
+            relations = self._read_relations(workbook_path)
+            self._sheets, self._active, self.epoch = self._read_workbook(workbook_path, relations)
+            self._shared_strings = self._read_shared_strings(relations.get(SHARED_STRINGS))
+            self._date_styles = self._read_styles(relations.get(STYLES))
+        except (KeyError, ParseError, ValueError) as e:
+            self._archive.close()
+            raise XlsxReadError(f"Не удалось разобрать структуру книги: {e}") from e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getitem__(self, name: str) -> XlsxSheet:
+        for sheet in self._sheets:
+            if sheet.title == name:
+                return sheet
+        raise KeyError(f"Лист {name} не найден в книге.")
+
+    @property
+    def sheetnames(self) -> list:
+        return [sheet.title for sheet in self._sheets]
+
+    @property
+    def worksheets(self) -> list:
+        return list(self._sheets)
+
+    @property
+    def active(self) -> XlsxSheet:
+        if 0 <= self._active < len(self._sheets):
+            return self._sheets[self._active]
+        return self._sheets[0]
+
+    def close(self):
+        self._archive.close()
+
+    def openpyxl_rows(self, title: str, skip: int = 0):
+        """Строки листа через openpyxl, начиная с номера skip (с нуля)."""
+        wb = openpyxl.load_workbook(self.filepath, read_only=True, data_only=True)
+        try:
+            for number, row in enumerate(wb[title].iter_rows(values_only=True)):
+                if number >= skip:
+                    yield tuple(row)
+        finally:
+            wb.close()
+
+    def _find_workbook(self) -> str:
+        """Путь к workbook.xml из корневого _rels/.rels."""
+        if "_rels/.rels" in self._names:
+            with self._archive.open("_rels/.rels") as src:
+                for _, element in iterparse(src):
+                    if (element.tag == f"{PKG_REL_NS}Relationship"
+                            and element.get("Type", "").endswith(OFFICE_DOCUMENT)):
+                        return element.get("Target").lstrip("/")
+        return "xl/workbook.xml"
+
+    def _read_relations(self, workbook_path: str) -> dict:
+        """Связи книги: id -> путь, а также пути общих строк и стилей."""
+        folder, name = posixpath.split(workbook_path)
+        rels_path = posixpath.join(folder, "_rels", f"{name}.rels")
+        relations = {}
+        with self._archive.open(rels_path) as src:
+            for _, element in iterparse(src):
+                if element.tag != f"{PKG_REL_NS}Relationship":
+                    continue
+                target = element.get("Target")
+                if target.startswith("/"):
+                    path = target.lstrip("/")
+                else:
+                    path = posixpath.normpath(posixpath.join(folder, target))
+                relations[element.get("Id")] = path
+                rel_type = element.get("Type", "")
+                if rel_type.endswith(SHARED_STRINGS):
+                    relations[SHARED_STRINGS] = path
+                elif rel_type.endswith(STYLES):
+                    relations[STYLES] = path
+        return relations
+
+    def _read_workbook(self, workbook_path: str, relations: dict):
+        """Список листов, активный лист и эпоха дат."""
+        sheets = []
+        active = 0
+        epoch = CALENDAR_WINDOWS_1900
+        with self._archive.open(workbook_path) as src:
+            for _, element in iterparse(src):
+                if element.tag == f"{MAIN_NS}sheet":
+                    path = relations[element.get(f"{REL_NS}id")]
+                    sheets.append(XlsxSheet(self, element.get("name"), path))
+                elif element.tag == f"{MAIN_NS}workbookView":
+                    active = int(element.get("activeTab", 0))
+                elif element.tag == f"{MAIN_NS}workbookPr":
+                    if element.get("date1904") in ("1", "true"):
+                        epoch = CALENDAR_MAC_1904
+        return sheets, active, epoch
+
+    def _read_shared_strings(self, path: str) -> list:
+        """Таблица общих строк."""
+        strings = []
+        if path is None or path not in self._names:
+            return strings
+        with self._archive.open(path) as src:
+            for _, element in iterparse(src):
+                if element.tag == SHARED_STRING_TAG:
+                    strings.append(text_content(element).replace("x005F_", ""))
+                    element.clear()
+        return strings
+
+    def _read_styles(self, path: str) -> set:
+        """
+        Номера стилей ячеек (строками, как в xml), в которых хранятся даты.
+
+        Длительности ([h]:mm и т.п.) - тоже даты: openpyxl в read_only отдает
+        их как datetime/time, а не timedelta.
+        """
+        date_styles = set()
+        if path is None or path not in self._names:
+            return date_styles
+        custom_formats = {}
+        with self._archive.open(path) as src:
+            for _, element in iterparse(src):
+                if element.tag == f"{MAIN_NS}numFmt":
+                    custom_formats[int(element.get("numFmtId"))] = element.get("formatCode")
+                elif element.tag == f"{MAIN_NS}cellXfs":
+                    for style_id, xf in enumerate(element.iter(f"{MAIN_NS}xf")):
+                        format_id = int(xf.get("numFmtId", 0))
+                        if format_id < BUILTIN_FORMATS_MAX_SIZE:
+                            fmt = BUILTIN_FORMATS.get(format_id)
+                        else:
+                            fmt = custom_formats.get(format_id)
+                        if is_date_format(fmt):
+                            date_styles.add(str(style_id))
+                    break
+        return date_styles
+
+    def read_dimensions(self, path: str):
+        """Читает тег dimension в начале листа, не разбирая данные."""
+        with self._archive.open(path) as src:
+            for _, element in iterparse(src):
+                if element.tag == DIMENSION_TAG:
+                    ref = element.get("ref", "")
+                    first, _, last = ref.partition(":")
+                    min_col, min_row = split_coordinate(first)
+                    max_col, max_row = split_coordinate(last or first)
+                    if min_row is None or max_row is None:
+                        return None
+                    return min_col, min_row, max_col, max_row
+                if element.tag in (SHEET_DATA_TAG, ROW_TAG):
+                    return None
+
+    def iter_row_chunks(self, path: str):
+        """
+        Отдает данные листа пачками целых строк.
+
+        Распакованный xml читается кусками по CHUNK_SIZE и режется по
+        закрывающему тегу строки, поэтому память не зависит от размера листа.
+        Вместе с пачкой отдается обертка (корневой тег), чтобы при
+        необходимости пачку можно было разобрать обычным xml парсером.
+        """
+        with self._archive.open(path) as src:
+            buffer = b""
+            while True:
+                match = SHEET_DATA_RE.search(buffer)
+                root = ROOT_RE.search(buffer)
+                if match is not None and root is not None:
+                    break
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                buffer += chunk
+            if match.group(2):
+                return
+            prefix = match.group(1)
+            wrapper = SheetWrapper(prefix, root.group(0), b"</" + root.group(1) + b">")
+            row_end = b"</" + prefix + b"row>"
+            data_end = b"</" + prefix + b"sheetData>"
+            buffer = buffer[match.end():]
+
+            while True:
+                finish = buffer.find(data_end)
+                if finish != -1:
+                    yield wrapper, buffer[:finish]
+                    return
+                cut = buffer.rfind(row_end)
+                if cut != -1:
+                    cut += len(row_end)
+                    yield wrapper, buffer[:cut]
+                    buffer = buffer[cut:]
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    raise XlsxReadError(f"Лист {path} оборван, нет конца данных.")
+                buffer += chunk
+
+    def convert_value(self, data_type: str, value: str, style_id: str):
+        """Приводит текст значения ячейки к типу, как это делает openpyxl."""
+        if data_type == "n":
+            if isinstance(value, str):
+                if "." in value or "E" in value or "e" in value:
+                    value = float(value)
+                else:
+                    value = int(value)
+            if style_id in self._date_styles:
+                try:
+                    return from_excel(value, self.epoch)
+                except (OverflowError, ValueError):
+                    return "#VALUE!"
+            return value
+        if data_type == "s":
+            return self._shared_strings[int(value)]
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "d":
+            return from_ISO8601(value)
+        return value
+
+    def row_from_element(self, element, columns: dict, width: int) -> list:
+        """Значения строки, разобранной xml парсером (медленный путь)."""
+        row = [None] * width
+        column = 0
+        for cell in element:
+            if cell.tag != CELL_TAG:
+                continue
+            coordinate = cell.get("r")
+            if coordinate:
+                letters = coordinate.rstrip("0123456789")
+                column = columns.get(letters)
+                if column is None:
+                    column = columns[letters] = column_index(letters)
+            else:
+                column += 1
+            data_type = cell.get("t", "n")
+            if data_type == "inlineStr":
+                inline = cell.find(INLINE_TAG)
+                value = text_content(inline) if inline is not None else None
+            else:
+                value = cell.findtext(VALUE_TAG) or None
+                if value is None:
+                    continue
+                value = self.convert_value(data_type, value, cell.get("s"))
+            if column > len(row):
+                row.extend([None] * (column - len(row)))
+            row[column - 1] = value
+        return row
+
+    def row_from_text(self, body: str, patterns, columns: dict, width: int):
+        """
+        Значения строки, разобранной регулярным выражением (быстрый путь).
+
+        Возвращает None, если в строке есть что-то кроме простых ячеек
+        (формулы, форматированный текст и т.п.) - тогда строка разбирается
+        xml парсером.
+        """
+        matches = patterns.cell.findall(body)
+        if len(matches) != body.count(patterns.cell_open):
+            return None
+        shared_strings = self._shared_strings
+        date_styles = self._date_styles
+        if matches:
+            last = matches[-1][0]
+            if last not in columns:
+                columns[last] = column_index(last)
+            width = max(width, columns[last])
+        row = [None] * width
+        for letters, style_id, data_type, value, inline in matches:
+            try:
+                column = columns[letters]
+            except KeyError:
+                column = columns[letters] = column_index(letters)
+            if inline:
+                # Группа захватывает ">" перед текстом, чтобы отличить пустую строку
+                # от отсутствующей.
+                value = inline[1:]
+                if "&" in value:
+                    value = unescape(value)
+            elif not value:
+                continue
+            elif not data_type or data_type == "n":
+                if "." in value or "E" in value or "e" in value:
+                    value = float(value)
+                else:
+                    value = int(value)
+                if style_id in date_styles:
+                    value = self.convert_value("n", value, style_id)
+            elif data_type == "s":
+                value = shared_strings[int(value)]
+            else:
+                if "&" in value:
+                    value = unescape(value)
+                value = self.convert_value(data_type, value, style_id)
+            try:
+                row[column - 1] = value
+            except IndexError:
+                row.extend([None] * (column - len(row)))
+                row[column - 1] = value
+        return row
+
+    def iter_sheet_rows(self, path: str, max_column: int = None):
+        """
+        Генератор строк листа. Пропущенные строки отдаются пустыми.
+
+        Как и в openpyxl, строки дополняются до ширины листа из тега dimension,
+        а если его нет - до последней заполненной ячейки строки.
+        """
+        columns = {}
+        width = max_column or 0
+        empty_row = (None,) * width
+        counter = 0
+        patterns = None
+
+        for wrapper, chunk in self.iter_row_chunks(path):
+            if patterns is None:
+                patterns = RowPatterns(wrapper.prefix.decode())
+            text = chunk.decode("utf-8")
+            position = 0
+            while True:
+                match = patterns.row_open.search(text, position)
+                if match is None:
+                    break
+                attributes, closed = match.groups()
+                if closed:
+                    body = ""
+                    position = match.end()
+                else:
+                    position = text.find(patterns.row_close, match.end())
+                    body = text[match.end():position]
+                    position += len(patterns.row_close)
+                number = ROW_NUMBER_RE.search(attributes)
+                number = int(number.group(1)) if number else counter + 1
+                if body:
+                    row = self.row_from_text(body, patterns, columns, width)
+                    if row is None:
+                        raw = text[match.start():position].encode("utf-8")
+                        row = self.row_from_element(
+                            XML(wrapper.start + raw + wrapper.end)[0], columns, width)
+                    row = tuple(row)
+                else:
+                    row = empty_row
+
+                while counter + 1 < number:
+                    counter += 1
+                    yield empty_row
+                counter = number
+                yield row
+
+
+class SheetWrapper:
+    """Корневой тег листа и префикс пространства имен для разбора пачек строк."""
+
+    def __init__(self, prefix: bytes, start: bytes, end: bytes):
+        self.prefix = prefix
+        self.start = start
+        self.end = end
+
+
+class RowPatterns:
+    """Регулярные выражения строки и простой ячейки для префикса листа."""
+
+    def __init__(self, prefix: str):
+        p = re.escape(prefix)
+        self.cell_open = f"<{prefix}c"
+        self.row_open = re.compile(rf"<{p}row\b([^>]*?)(/?)>")
+        self.row_close = f"</{prefix}row>"
+        self.cell = re.compile(
+            rf'<{p}c r="([A-Z]+)\d+"(?: s="(\d+)")?(?: t="(\w+)")?\s*'
+            rf"(?:/>|>(?:<{p}v>([^<]*)</{p}v>"
+            rf'|<{p}is><{p}t(?: xml:space="preserve")?(>[^<]*)</{p}t></{p}is>)?</{p}c>)')
+
+
+def load_workbook(filepath: str):
+    """Открывает книгу потоково, а если не вышло - через openpyxl в read_only."""
+    try:
+        return XlsxReader(filepath)
+    except (XlsxReadError, zipfile.BadZipFile):
+        return openpyxl.load_workbook(filepath, read_only=True, data_only=True)